@@ -0,0 +1,10 @@
+# flake8: noqa
+from .build import AsyncBuildApiMixin
+from .container import AsyncContainerApiMixin
+from .daemon import AsyncDaemonApiMixin
+from .exec_api import AsyncExecApiMixin
+from .image import AsyncImageApiMixin
+from .network import AsyncNetworkApiMixin
+from .service import AsyncServiceApiMixin
+from .swarm import AsyncSwarmApiMixin
+from .volume import AsyncVolumeApiMixin
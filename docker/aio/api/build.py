@@ -0,0 +1,92 @@
+import asyncio
+from functools import partial
+
+from ... import errors
+from ... import utils
+from ...api.build import BuildApiMixin
+from ...transfers import unique_images
+from ..connection import iterate_in_executor
+
+
+class AsyncBuildApiMixin(object):
+    _build_request = BuildApiMixin._build_request
+    _set_auth_headers = BuildApiMixin._set_auth_headers
+
+    async def build(self, path=None, tag=None, quiet=False, fileobj=None,
+                    nocache=False, rm=False, stream=True, timeout=None,
+                    custom_context=False, encoding=None, pull=False,
+                    forcerm=False, dockerfile=None, container_limits=None,
+                    decode=False, buildargs=None, gzip=False,
+                    stream_context=False, context_workers=None,
+                    context_cache=None, minimal_context=False,
+                    gzip_level=None, gzip_workers=None, cache_from=None,
+                    pull_cache_from=False):
+        """Async generator of build output. Building the context archive
+        reads the whole directory, so it is done in the loop's default
+        executor; with `stream_context`, each block of the archive is
+        built there while the previous ones are sent."""
+        loop = asyncio.get_event_loop()
+        context, params, headers, _ = await loop.run_in_executor(
+            None, partial(
+                self._build_request,
+                path=path, tag=tag, quiet=quiet, fileobj=fileobj,
+                nocache=nocache, rm=rm, stream=stream,
+                custom_context=custom_context, encoding=encoding, pull=pull,
+                forcerm=forcerm, dockerfile=dockerfile,
+                container_limits=container_limits, buildargs=buildargs,
+                gzip=gzip, stream_context=stream_context,
+                context_workers=context_workers, context_cache=context_cache,
+                minimal_context=minimal_context, gzip_level=gzip_level,
+                gzip_workers=gzip_workers, cache_from=cache_from
+            )
+        )
+        if cache_from and pull_cache_from:
+            await self.pull_cache_images(cache_from)
+
+        body = context
+        if stream_context and context is not None and (
+                fileobj is None or isinstance(fileobj, dict)):
+            body = iterate_in_executor(loop, context)
+
+        try:
+            response = await self._post(
+                self._url('/build'),
+                data=body,
+                params=params,
+                headers=headers,
+                timeout=timeout,
+            )
+        finally:
+            if context is not None and not custom_context:
+                context.close()
+
+        async for data in self._stream_helper(response, decode=decode):
+            yield data
+
+    async def pull_cache_images(self, images, workers=4):
+        """Pull the images given as `cache_from` to a build, `workers` at a
+        time. Returns a dict of the images which couldn't be pulled to
+        their error messages."""
+        semaphore = asyncio.Semaphore(workers)
+        images = unique_images(images)
+
+        async def pull(image):
+            async with semaphore:
+                return await self._pull_cache_image(image)
+
+        results = await asyncio.gather(*[pull(image) for image in images])
+        return dict(
+            (image, error) for image, error in zip(images, results)
+            if error is not None
+        )
+
+    async def _pull_cache_image(self, image):
+        repository, tag = utils.parse_repository_tag(image)
+        try:
+            async for message in self.pull(repository, tag=tag or 'latest',
+                                           stream=True, decode=True):
+                if 'error' in message:
+                    return message['error']
+        except errors.APIError as e:
+            return str(e)
+        return None
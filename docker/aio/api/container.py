@@ -0,0 +1,397 @@
+import warnings
+
+from ... import errors
+from ... import utils
+from ...api.container import ContainerApiMixin
+
+
+class AsyncContainerApiMixin(object):
+    create_container_config = ContainerApiMixin.create_container_config
+    create_host_config = ContainerApiMixin.create_host_config
+    create_networking_config = ContainerApiMixin.create_networking_config
+    create_endpoint_config = ContainerApiMixin.create_endpoint_config
+    _logs_params = ContainerApiMixin._logs_params
+    _start_config = ContainerApiMixin._start_config
+
+    @utils.check_resource
+    def attach(self, container, stdout=True, stderr=True,
+               stream=False, logs=False, demux=False):
+        params = {
+            'logs': logs and 1 or 0,
+            'stdout': stdout and 1 or 0,
+            'stderr': stderr and 1 or 0,
+            'stream': stream and 1 or 0
+        }
+        if stream:
+            return self._attach_stream(container, params, demux)
+        return self._attach(container, params, demux)
+
+    async def _attach_response(self, container, params):
+        headers = {
+            'Connection': 'Upgrade',
+            'Upgrade': 'tcp'
+        }
+        u = self._url("/containers/{0}/attach", container)
+        response = await self._post(u, headers=headers, params=params)
+        await self._raise_for_status(response)
+        return response
+
+    async def _attach(self, container, params, demux):
+        response = await self._attach_response(container, params)
+        return await self._demultiplexed_body(response, demux)
+
+    async def _attach_stream(self, container, params, demux):
+        response = await self._attach_response(container, params)
+        async for data in self._demultiplexed_stream(
+                self._multiplexed_response_stream_helper(response), demux):
+            yield data
+
+    @utils.check_resource
+    async def commit(self, container, repository=None, tag=None,
+                     message=None, author=None, changes=None, conf=None):
+        params = {
+            'container': container,
+            'repo': repository,
+            'tag': tag,
+            'comment': message,
+            'author': author,
+            'changes': changes
+        }
+        u = self._url("/commit")
+        return await self._result(
+            await self._post_json(u, data=conf, params=params), json=True
+        )
+
+    async def containers(self, quiet=False, all=False, trunc=False,
+                         latest=False, since=None, before=None, limit=-1,
+                         size=False, filters=None):
+        params = {
+            'limit': 1 if latest else limit,
+            'all': 1 if all else 0,
+            'size': 1 if size else 0,
+            'trunc_cmd': 1 if trunc else 0,
+            'since': since,
+            'before': before
+        }
+        if filters:
+            params['filters'] = utils.convert_filters(filters)
+        u = self._url("/containers/json")
+        res = await self._result(await self._get(u, params=params), True)
+
+        if quiet:
+            return [{'Id': x['Id']} for x in res]
+        if trunc:
+            for x in res:
+                x['Id'] = x['Id'][:12]
+        return res
+
+    async def create_container(self, image, command=None, hostname=None,
+                               user=None, detach=False, stdin_open=False,
+                               tty=False, mem_limit=None, ports=None,
+                               environment=None, dns=None, volumes=None,
+                               volumes_from=None, network_disabled=False,
+                               name=None, entrypoint=None, cpu_shares=None,
+                               working_dir=None, domainname=None,
+                               memswap_limit=None, cpuset=None,
+                               host_config=None, mac_address=None,
+                               labels=None, volume_driver=None,
+                               stop_signal=None, networking_config=None):
+
+        if isinstance(volumes, str):
+            volumes = [volumes, ]
+
+        if host_config and not self._supports('host_config'):
+            raise errors.InvalidVersion(
+                'host_config is not supported in API < 1.15'
+            )
+
+        config = self.create_container_config(
+            image, command, hostname, user, detach, stdin_open,
+            tty, mem_limit, ports, environment, dns, volumes, volumes_from,
+            network_disabled, entrypoint, cpu_shares, working_dir, domainname,
+            memswap_limit, cpuset, host_config, mac_address, labels,
+            volume_driver, stop_signal, networking_config,
+        )
+        return await self.create_container_from_config(config, name)
+
+    async def create_container_from_config(self, config, name=None):
+        u = self._url("/containers/create")
+        params = {
+            'name': name
+        }
+        res = await self._post_json(u, data=config, params=params)
+        return await self._result(res, True)
+
+    @utils.check_resource
+    async def diff(self, container):
+        return await self._result(
+            await self._get(self._url("/containers/{0}/changes", container)),
+            True
+        )
+
+    @utils.check_resource
+    async def export(self, container):
+        res = await self._get(self._url("/containers/{0}/export", container))
+        await self._raise_for_status(res)
+        return self._raw_response_stream_helper(res)
+
+    @utils.check_resource
+    @utils.minimum_version('1.20')
+    async def get_archive(self, container, path):
+        params = {
+            'path': path
+        }
+        url = self._url('/containers/{0}/archive', container)
+        res = await self._get(url, params=params)
+        await self._raise_for_status(res)
+        encoded_stat = res.headers.get('x-docker-container-path-stat')
+        return (
+            self._raw_response_stream_helper(res),
+            utils.decode_json_header(encoded_stat) if encoded_stat else None
+        )
+
+    @utils.check_resource
+    async def inspect_container(self, container):
+        return await self._result(
+            await self._get(self._url("/containers/{0}/json", container)),
+            True
+        )
+
+    @utils.check_resource
+    async def kill(self, container, signal=None):
+        url = self._url("/containers/{0}/kill", container)
+        params = {}
+        if signal is not None:
+            if not isinstance(signal, str):
+                signal = int(signal)
+            params['signal'] = signal
+        res = await self._post(url, params=params)
+
+        await self._result(res)
+
+    @utils.check_resource
+    def logs(self, container, stdout=True, stderr=True, stream=False,
+             timestamps=False, tail='all', since=None, follow=None,
+             demux=False, tty=None):
+        """Return the container's logs. With `stream=True`, this returns an
+        async generator of log blocks; otherwise a coroutine resolving to
+        the full output as bytes. With `demux=True`, blocks and output are
+        `(stdout, stderr)` tuples instead."""
+        if not self._supports('logs'):
+            return self.attach(
+                container, stdout=stdout, stderr=stderr, stream=stream,
+                logs=True, demux=demux
+            )
+        params = self._logs_params(
+            stdout, stderr, stream, timestamps, tail, since, follow
+        )
+        if stream:
+            return self._logs_stream(container, params, demux, tty)
+        return self._logs(container, params, demux, tty)
+
+    async def _logs_response(self, container, params, stream, demux, tty):
+        if tty is None:
+            tty = await self._container_tty(container)
+        url = self._url("/containers/{0}/logs", container)
+        res = await self._get(
+            url, params=params, timeout=None if stream else self.timeout
+        )
+        return await self._get_result_tty(stream, res, tty, demux)
+
+    async def _logs(self, container, params, demux, tty):
+        return await self._logs_response(
+            container, params, False, demux, tty
+        )
+
+    async def _logs_stream(self, container, params, demux, tty):
+        output = await self._logs_response(
+            container, params, True, demux, tty
+        )
+        async for data in output:
+            yield data
+
+    @utils.check_resource
+    async def pause(self, container):
+        url = self._url('/containers/{0}/pause', container)
+        res = await self._post(url)
+        await self._result(res)
+
+    @utils.check_resource
+    async def port(self, container, private_port):
+        json_ = await self._result(
+            await self._get(self._url("/containers/{0}/json", container)),
+            True
+        )
+        private_port = str(private_port)
+        h_ports = None
+
+        # Port settings is None when the container is running with
+        # network_mode=host.
+        port_settings = json_.get('NetworkSettings', {}).get('Ports')
+        if port_settings is None:
+            return None
+
+        if '/' in private_port:
+            return port_settings.get(private_port)
+
+        h_ports = port_settings.get(private_port + '/tcp')
+        if h_ports is None:
+            h_ports = port_settings.get(private_port + '/udp')
+
+        return h_ports
+
+    @utils.check_resource
+    @utils.minimum_version('1.20')
+    async def put_archive(self, container, path, data):
+        params = {'path': path}
+        url = self._url('/containers/{0}/archive', container)
+        res = await self._put(url, params=params, data=data)
+        await self._result(res)
+        return res.status_code == 200
+
+    @utils.check_resource
+    async def remove_container(self, container, v=False, link=False,
+                               force=False):
+        params = {'v': v, 'link': link, 'force': force}
+        res = await self._delete(
+            self._url("/containers/{0}", container), params=params
+        )
+        await self._result(res)
+        self._forget_container(container)
+
+    @utils.minimum_version('1.17')
+    @utils.check_resource
+    async def rename(self, container, name):
+        url = self._url("/containers/{0}/rename", container)
+        params = {'name': name}
+        res = await self._post(url, params=params)
+        await self._result(res)
+
+    @utils.check_resource
+    async def resize(self, container, height, width):
+        params = {'h': height, 'w': width}
+        url = self._url("/containers/{0}/resize", container)
+        res = await self._post(url, params=params)
+        await self._result(res)
+
+    @utils.check_resource
+    async def restart(self, container, timeout=10):
+        params = {'t': timeout}
+        url = self._url("/containers/{0}/restart", container)
+        res = await self._post(url, params=params)
+        await self._result(res)
+
+    @utils.check_resource
+    async def start(self, container, **kwargs):
+        start_config = self._start_config(**kwargs)
+        url = self._url("/containers/{0}/start", container)
+        res = await self._post_json(url, data=start_config)
+        await self._result(res)
+
+    @utils.minimum_version('1.17')
+    @utils.check_resource
+    def stats(self, container, decode=None, stream=True):
+        """With `stream=True` (the default), return an async generator of
+        stats samples; otherwise a coroutine resolving to a single one."""
+        url = self._url("/containers/{0}/stats", container)
+        if stream:
+            return self._stats_stream(url, decode)
+        return self._stats(url)
+
+    async def _stats(self, url):
+        return await self._result(
+            await self._get(url, params={'stream': False}), json=True
+        )
+
+    async def _stats_stream(self, url, decode):
+        response = await self._get(url, timeout=None)
+        async for data in self._stream_helper(response, decode=decode):
+            yield data
+
+    @utils.check_resource
+    async def stop(self, container, timeout=10):
+        params = {'t': timeout}
+        url = self._url("/containers/{0}/stop", container)
+
+        res = await self._post(url, params=params,
+                               timeout=(timeout + (self.timeout or 0)))
+        await self._result(res)
+
+    @utils.check_resource
+    async def top(self, container, ps_args=None):
+        u = self._url("/containers/{0}/top", container)
+        params = {}
+        if ps_args is not None:
+            params['ps_args'] = ps_args
+        return await self._result(await self._get(u, params=params), True)
+
+    @utils.check_resource
+    async def unpause(self, container):
+        url = self._url('/containers/{0}/unpause', container)
+        res = await self._post(url)
+        await self._result(res)
+
+    @utils.minimum_version('1.22')
+    @utils.check_resource
+    async def update_container(
+        self, container, blkio_weight=None, cpu_period=None, cpu_quota=None,
+        cpu_shares=None, cpuset_cpus=None, cpuset_mems=None, mem_limit=None,
+        mem_reservation=None, memswap_limit=None, kernel_memory=None,
+        restart_policy=None
+    ):
+        url = self._url('/containers/{0}/update', container)
+        data = {}
+        if blkio_weight:
+            data['BlkioWeight'] = blkio_weight
+        if cpu_period:
+            data['CpuPeriod'] = cpu_period
+        if cpu_shares:
+            data['CpuShares'] = cpu_shares
+        if cpu_quota:
+            data['CpuQuota'] = cpu_quota
+        if cpuset_cpus:
+            data['CpusetCpus'] = cpuset_cpus
+        if cpuset_mems:
+            data['CpusetMems'] = cpuset_mems
+        if mem_limit:
+            data['Memory'] = utils.parse_bytes(mem_limit)
+        if mem_reservation:
+            data['MemoryReservation'] = utils.parse_bytes(mem_reservation)
+        if memswap_limit:
+            data['MemorySwap'] = utils.parse_bytes(memswap_limit)
+        if kernel_memory:
+            data['KernelMemory'] = utils.parse_bytes(kernel_memory)
+        if restart_policy:
+            if utils.version_lt(self._version, '1.23'):
+                raise errors.InvalidVersion(
+                    'restart policy update is not supported '
+                    'for API version < 1.23'
+                )
+            data['RestartPolicy'] = restart_policy
+
+        res = await self._post_json(url, data=data)
+        return await self._result(res, True)
+
+    @utils.check_resource
+    async def wait(self, container, timeout=None):
+        url = self._url("/containers/{0}/wait", container)
+        json_ = await self._result(await self._post(url, timeout=timeout),
+                                   True)
+        if 'StatusCode' in json_:
+            return json_['StatusCode']
+        return -1
+
+    @utils.check_resource
+    async def copy(self, container, resource):
+        if utils.version_gte(self._version, '1.20'):
+            warnings.warn(
+                'Client.copy() is deprecated for API version >= 1.20, '
+                'please use get_archive() instead',
+                DeprecationWarning
+            )
+        res = await self._post_json(
+            self._url("/containers/{0}/copy".format(container)),
+            data={"Resource": resource}
+        )
+        await self._raise_for_status(res)
+        return self._raw_response_stream_helper(res)
@@ -0,0 +1,94 @@
+from functools import partial
+
+from ... import errors
+from ... import utils
+
+
+class AsyncExecApiMixin(object):
+    @utils.minimum_version('1.15')
+    @utils.check_resource
+    async def exec_create(self, container, cmd, stdout=True, stderr=True,
+                          stdin=False, tty=False, privileged=False, user=''):
+        if privileged and utils.compare_version('1.19', self._version) < 0:
+            raise errors.InvalidVersion(
+                'Privileged exec is not supported in API < 1.19'
+            )
+        if user and utils.compare_version('1.19', self._version) < 0:
+            raise errors.InvalidVersion(
+                'User-specific exec is not supported in API < 1.19'
+            )
+        if isinstance(cmd, str):
+            cmd = utils.split_command(cmd)
+
+        data = {
+            'Container': container,
+            'User': user,
+            'Privileged': privileged,
+            'Tty': tty,
+            'AttachStdin': stdin,
+            'AttachStdout': stdout,
+            'AttachStderr': stderr,
+            'Cmd': cmd
+        }
+
+        url = self._url('/containers/{0}/exec', container)
+        res = await self._post_json(url, data=data)
+        return await self._result(res, True)
+
+    @utils.minimum_version('1.16')
+    async def exec_inspect(self, exec_id):
+        if isinstance(exec_id, dict):
+            exec_id = exec_id.get('Id')
+        res = await self._get(self._url("/exec/{0}/json", exec_id))
+        return await self._result(res, True)
+
+    @utils.minimum_version('1.15')
+    async def exec_resize(self, exec_id, height=None, width=None):
+        if isinstance(exec_id, dict):
+            exec_id = exec_id.get('Id')
+
+        params = {'h': height, 'w': width}
+        url = self._url("/exec/{0}/resize", exec_id)
+        res = await self._post(url, params=params)
+        await self._result(res)
+
+    @utils.minimum_version('1.15')
+    def exec_start(self, exec_id, detach=False, tty=False, stream=False,
+                   demux=False):
+        """With `stream=True`, return an async generator of output blocks;
+        otherwise a coroutine resolving to the full output as bytes. With
+        `demux=True`, blocks and output are `(stdout, stderr)` tuples
+        instead."""
+        if isinstance(exec_id, dict):
+            exec_id = exec_id.get('Id')
+
+        data = {
+            'Tty': tty,
+            'Detach': detach
+        }
+
+        headers = {} if detach else {
+            'Connection': 'Upgrade',
+            'Upgrade': 'tcp'
+        }
+
+        request = partial(
+            self._post_json,
+            self._url('/exec/{0}/start', exec_id),
+            headers=headers,
+            data=data,
+            timeout=None
+        )
+        if stream:
+            return self._exec_stream(request, tty, demux)
+        return self._exec_result(request, tty, demux)
+
+    async def _exec_result(self, request, tty, demux):
+        response = await request()
+        return await self._get_result_tty(False, response, tty, demux)
+
+    async def _exec_stream(self, request, tty, demux):
+        response = await request()
+        output = await self._get_result_tty(True, response, tty, demux)
+        async for data in output:
+            yield data
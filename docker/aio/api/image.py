@@ -0,0 +1,229 @@
+import logging
+import warnings
+from functools import partial
+
+from ... import errors
+from ... import utils
+from ...api.image import _import_image_params
+from ...auth import auth
+from ...constants import INSECURE_REGISTRY_DEPRECATION_WARNING
+
+log = logging.getLogger(__name__)
+
+
+class AsyncImageApiMixin(object):
+
+    @utils.check_resource
+    async def get_image(self, image):
+        """Returns an async generator of the image tarball's data blocks."""
+        res = await self._get(self._url("/images/{0}/get", image),
+                              timeout=None)
+        await self._raise_for_status(res)
+        return self._raw_response_stream_helper(res)
+
+    @utils.check_resource
+    async def history(self, image):
+        res = await self._get(self._url("/images/{0}/history", image))
+        return await self._result(res, True)
+
+    async def images(self, name=None, quiet=False, all=False, viz=False,
+                     filters=None):
+        if viz:
+            if utils.compare_version('1.7', self._version) >= 0:
+                raise Exception('Viz output is not supported in API >= 1.7!')
+            return await self._result(await self._get(self._url("images/viz")))
+        params = {
+            'filter': name,
+            'only_ids': 1 if quiet else 0,
+            'all': 1 if all else 0,
+        }
+        if filters:
+            params['filters'] = utils.convert_filters(filters)
+        res = await self._result(
+            await self._get(self._url("/images/json"), params=params), True
+        )
+        if quiet:
+            return [x['Id'] for x in res]
+        return res
+
+    async def import_image(self, src=None, repository=None, tag=None,
+                           image=None, changes=None, stream_src=False):
+        if not (src or image):
+            raise errors.DockerException(
+                'Must specify src or image to import from'
+            )
+        u = self._url('/images/create')
+
+        params = _import_image_params(
+            repository, tag, image,
+            src=(src if isinstance(src, str) else None),
+            changes=changes
+        )
+        headers = {'Content-Type': 'application/tar'}
+
+        if image or params.get('fromSrc') != '-':  # from image or URL
+            return await self._result(
+                await self._post(u, data=None, params=params)
+            )
+        elif isinstance(src, str):  # from file path
+            with open(src, 'rb') as f:
+                return await self._result(
+                    await self._post(
+                        u, data=f, params=params, headers=headers,
+                        timeout=None
+                    )
+                )
+        else:  # from raw data
+            return await self._result(
+                await self._post(u, data=src, params=params, headers=headers)
+            )
+
+    async def import_image_from_data(self, data, repository=None, tag=None,
+                                     changes=None):
+        u = self._url('/images/create')
+        params = _import_image_params(
+            repository, tag, src='-', changes=changes
+        )
+        headers = {'Content-Type': 'application/tar'}
+        return await self._result(
+            await self._post(
+                u, data=data, params=params, headers=headers, timeout=None
+            )
+        )
+
+    async def import_image_from_file(self, filename, repository=None,
+                                     tag=None, changes=None):
+        return await self.import_image(
+            src=filename, repository=repository, tag=tag, changes=changes
+        )
+
+    async def import_image_from_stream(self, stream, repository=None,
+                                       tag=None, changes=None):
+        return await self.import_image(
+            src=stream, stream_src=True, repository=repository, tag=tag,
+            changes=changes
+        )
+
+    async def import_image_from_url(self, url, repository=None, tag=None,
+                                    changes=None):
+        return await self.import_image(
+            src=url, repository=repository, tag=tag, changes=changes
+        )
+
+    async def import_image_from_image(self, image, repository=None, tag=None,
+                                      changes=None):
+        return await self.import_image(
+            image=image, repository=repository, tag=tag, changes=changes
+        )
+
+    @utils.check_resource
+    async def inspect_image(self, image):
+        return await self._result(
+            await self._get(self._url("/images/{0}/json", image)), True
+        )
+
+    async def load_image(self, data):
+        res = await self._post(
+            self._url("/images/load"), data=data, timeout=None
+        )
+        await self._result(res)
+
+    def _registry_auth_headers(self, repository, auth_config):
+        registry, repo_name = auth.resolve_repository_name(repository)
+        headers = {}
+        if self._supports('registry_auth'):
+            if auth_config is None:
+                header = auth.get_config_header(self, registry)
+                if header:
+                    headers['X-Registry-Auth'] = header
+            else:
+                log.debug('Sending supplied auth config')
+                headers['X-Registry-Auth'] = auth.encode_header(auth_config)
+        return headers
+
+    def pull(self, repository, tag=None, stream=False,
+             insecure_registry=False, auth_config=None, decode=False):
+        """With `stream=True`, return an async generator of progress
+        messages; otherwise a coroutine resolving to the full output."""
+        if insecure_registry:
+            warnings.warn(
+                INSECURE_REGISTRY_DEPRECATION_WARNING.format('pull()'),
+                DeprecationWarning
+            )
+
+        if not tag:
+            repository, tag = utils.parse_repository_tag(repository)
+
+        params = {
+            'tag': tag,
+            'fromImage': repository
+        }
+        headers = self._registry_auth_headers(repository, auth_config)
+        request = partial(
+            self._post, self._url('/images/create'), params=params,
+            headers=headers, timeout=None
+        )
+        if stream:
+            return self._progress_stream(request, decode)
+        return self._progress_result(request)
+
+    def push(self, repository, tag=None, stream=False,
+             insecure_registry=False, auth_config=None, decode=False):
+        """With `stream=True`, return an async generator of progress
+        messages; otherwise a coroutine resolving to the full output."""
+        if insecure_registry:
+            warnings.warn(
+                INSECURE_REGISTRY_DEPRECATION_WARNING.format('push()'),
+                DeprecationWarning
+            )
+
+        if not tag:
+            repository, tag = utils.parse_repository_tag(repository)
+        u = self._url("/images/{0}/push", repository)
+        params = {
+            'tag': tag
+        }
+        headers = self._registry_auth_headers(repository, auth_config)
+        request = partial(
+            self._post_json, u, None, headers=headers, params=params,
+            timeout=None
+        )
+        if stream:
+            return self._progress_stream(request, decode)
+        return self._progress_result(request)
+
+    async def _progress_result(self, request):
+        return await self._result(await request())
+
+    async def _progress_stream(self, request, decode):
+        response = await request()
+        await self._raise_for_status(response)
+        async for data in self._stream_helper(response, decode=decode):
+            yield data
+
+    @utils.check_resource
+    async def remove_image(self, image, force=False, noprune=False):
+        params = {'force': force, 'noprune': noprune}
+        res = await self._delete(
+            self._url("/images/{0}", image), params=params
+        )
+        await self._result(res)
+
+    async def search(self, term):
+        return await self._result(
+            await self._get(self._url("/images/search"),
+                            params={'term': term}),
+            True
+        )
+
+    @utils.check_resource
+    async def tag(self, image, repository, tag=None, force=False):
+        params = {
+            'tag': tag,
+            'repo': repository,
+            'force': 1 if force else 0
+        }
+        url = self._url("/images/{0}/tag", image)
+        res = await self._post(url, params=params)
+        await self._result(res)
+        return res.status_code == 201
@@ -0,0 +1,106 @@
+from ... import errors
+from ... import utils
+from ...auth import auth
+
+
+class AsyncServiceApiMixin(object):
+    @utils.minimum_version('1.24')
+    async def create_service(
+            self, task_template, name=None, labels=None, mode=None,
+            update_config=None, networks=None, endpoint_config=None
+    ):
+        url = self._url('/services/create')
+        headers = {}
+        image = task_template.get('ContainerSpec', {}).get('Image', None)
+        if image is None:
+            raise errors.DockerException(
+                'Missing mandatory Image key in ContainerSpec'
+            )
+        registry, repo_name = auth.resolve_repository_name(image)
+        auth_header = auth.get_config_header(self, registry)
+        if auth_header:
+            headers['X-Registry-Auth'] = auth_header
+        data = {
+            'Name': name,
+            'Labels': labels,
+            'TaskTemplate': task_template,
+            'Mode': mode,
+            'UpdateConfig': update_config,
+            'Networks': networks,
+            'Endpoint': endpoint_config
+        }
+        return await self._result(
+            await self._post_json(url, data=data, headers=headers), True
+        )
+
+    @utils.minimum_version('1.24')
+    @utils.check_resource
+    async def inspect_service(self, service):
+        url = self._url('/services/{0}', service)
+        return await self._result(await self._get(url), True)
+
+    @utils.minimum_version('1.24')
+    @utils.check_resource
+    async def inspect_task(self, task):
+        url = self._url('/tasks/{0}', task)
+        return await self._result(await self._get(url), True)
+
+    @utils.minimum_version('1.24')
+    @utils.check_resource
+    async def remove_service(self, service):
+        url = self._url('/services/{0}', service)
+        resp = await self._delete(url)
+        await self._result(resp)
+        return True
+
+    @utils.minimum_version('1.24')
+    async def services(self, filters=None):
+        params = {
+            'filters': utils.convert_filters(filters) if filters else None
+        }
+        url = self._url('/services')
+        return await self._result(await self._get(url, params=params), True)
+
+    @utils.minimum_version('1.24')
+    async def tasks(self, filters=None):
+        params = {
+            'filters': utils.convert_filters(filters) if filters else None
+        }
+        url = self._url('/tasks')
+        return await self._result(await self._get(url, params=params), True)
+
+    @utils.minimum_version('1.24')
+    @utils.check_resource
+    async def update_service(self, service, version, task_template=None,
+                             name=None, labels=None, mode=None,
+                             update_config=None, networks=None,
+                             endpoint_config=None):
+        url = self._url('/services/{0}/update', service)
+        data = {}
+        headers = {}
+        if name is not None:
+            data['Name'] = name
+        if labels is not None:
+            data['Labels'] = labels
+        if mode is not None:
+            data['Mode'] = mode
+        if task_template is not None:
+            image = task_template.get('ContainerSpec', {}).get('Image', None)
+            if image is not None:
+                registry, repo_name = auth.resolve_repository_name(image)
+                auth_header = auth.get_config_header(self, registry)
+                if auth_header:
+                    headers['X-Registry-Auth'] = auth_header
+            data['TaskTemplate'] = task_template
+        if update_config is not None:
+            data['UpdateConfig'] = update_config
+        if networks is not None:
+            data['Networks'] = networks
+        if endpoint_config is not None:
+            data['Endpoint'] = endpoint_config
+
+        resp = await self._post_json(
+            url, data=data, params={'version': version}, headers=headers
+        )
+        await self._result(resp)
+        return True
@@ -0,0 +1,83 @@
+from http import client as http_client
+
+from ... import utils
+from ...api.swarm import SwarmApiMixin
+
+
+class AsyncSwarmApiMixin(object):
+    create_swarm_spec = SwarmApiMixin.create_swarm_spec
+
+    @utils.minimum_version('1.24')
+    async def init_swarm(self, advertise_addr=None,
+                         listen_addr='0.0.0.0:2377', force_new_cluster=False,
+                         swarm_spec=None):
+        url = self._url('/swarm/init')
+        if swarm_spec is not None and not isinstance(swarm_spec, dict):
+            raise TypeError('swarm_spec must be a dictionary')
+        data = {
+            'AdvertiseAddr': advertise_addr,
+            'ListenAddr': listen_addr,
+            'ForceNewCluster': force_new_cluster,
+            'Spec': swarm_spec,
+        }
+        response = await self._post_json(url, data=data)
+        await self._result(response)
+        return True
+
+    @utils.minimum_version('1.24')
+    async def inspect_swarm(self):
+        url = self._url('/swarm')
+        return await self._result(await self._get(url), True)
+
+    @utils.check_resource
+    @utils.minimum_version('1.24')
+    async def inspect_node(self, node_id):
+        url = self._url('/nodes/{0}', node_id)
+        return await self._result(await self._get(url), True)
+
+    @utils.minimum_version('1.24')
+    async def join_swarm(self, remote_addrs, join_token, listen_addr=None,
+                         advertise_addr=None):
+        data = {
+            "RemoteAddrs": remote_addrs,
+            "ListenAddr": listen_addr,
+            "JoinToken": join_token,
+            "AdvertiseAddr": advertise_addr,
+        }
+        url = self._url('/swarm/join')
+        response = await self._post_json(url, data=data)
+        await self._result(response)
+        return True
+
+    @utils.minimum_version('1.24')
+    async def leave_swarm(self, force=False):
+        url = self._url('/swarm/leave')
+        response = await self._post(url, params={'force': force})
+        # Ignore "this node is not part of a swarm" error
+        if force and response.status_code == http_client.NOT_ACCEPTABLE:
+            await response.read()
+            return True
+        await self._result(response)
+        return True
+
+    @utils.minimum_version('1.24')
+    async def nodes(self, filters=None):
+        url = self._url('/nodes')
+        params = {}
+        if filters:
+            params['filters'] = utils.convert_filters(filters)
+
+        return await self._result(await self._get(url, params=params), True)
+
+    @utils.minimum_version('1.24')
+    async def update_swarm(self, version, swarm_spec=None,
+                           rotate_worker_token=False,
+                           rotate_manager_token=False):
+        url = self._url('/swarm/update')
+        response = await self._post_json(url, data=swarm_spec, params={
+            'rotateWorkerToken': rotate_worker_token,
+            'rotateManagerToken': rotate_manager_token,
+            'version': version
+        })
+        await self._result(response)
+        return True
@@ -0,0 +1,345 @@
+import json
+import struct
+from functools import partial
+from urllib.parse import quote_plus
+
+import requests.exceptions
+
+from . import api
+from .connection import ConnectionPool, encode_params, ssl_context_from_tls
+from .. import constants
+from .. import errors
+from ..auth import auth
+from ..cache import LRUCache
+from ..client import Client
+from ..utils import utils, kwargs_from_env
+from ..utils.json_stream import JSONStreamDecoder
+from ..utils.socket import STDERR, consume_frames
+
+
+class AsyncClient(
+        api.AsyncBuildApiMixin,
+        api.AsyncContainerApiMixin,
+        api.AsyncDaemonApiMixin,
+        api.AsyncExecApiMixin,
+        api.AsyncImageApiMixin,
+        api.AsyncNetworkApiMixin,
+        api.AsyncServiceApiMixin,
+        api.AsyncSwarmApiMixin,
+        api.AsyncVolumeApiMixin):
+    """An asyncio-native counterpart to `docker.Client`. It speaks HTTP/1.1
+    directly over UNIX sockets or TCP (optionally TLS), so a single event
+    loop can drive many concurrent requests without a thread pool.
+
+    With `version='auto'`, the API version is negotiated when entering the
+    client as an async context manager, or by awaiting
+    `negotiate_version()`.
+    """
+
+    def __init__(self, base_url=None, version=None,
+                 timeout=constants.DEFAULT_TIMEOUT_SECONDS, tls=False,
+                 user_agent=constants.DEFAULT_USER_AGENT,
+                 num_pools=constants.DEFAULT_NUM_POOLS):
+        if tls and not base_url:
+            raise errors.TLSParameterError(
+                'If using TLS, the base_url argument must be provided.'
+            )
+
+        self.timeout = timeout
+        self.headers = {'User-Agent': user_agent}
+        self._auth_configs = auth.load_config()
+        self._tty_cache = LRUCache(constants.TTY_CACHE_SIZE)
+
+        base_url = utils.parse_host(
+            base_url, constants.IS_WINDOWS_PLATFORM, tls=bool(tls)
+        )
+        if base_url.startswith('npipe://'):
+            raise errors.DockerException(
+                'The npipe:// protocol is not supported by AsyncClient'
+            )
+        ssl_context = None
+        if base_url.startswith('https://'):
+            ssl_context = ssl_context_from_tls(tls or True)
+        self.base_url = base_url
+        self._pool = ConnectionPool(
+            base_url, maxsize=num_pools, ssl_context=ssl_context
+        )
+
+        self._api_version = None
+        if version is None:
+            self._api_version = constants.DEFAULT_DOCKER_API_VERSION
+        elif isinstance(version, str):
+            if version.lower() != 'auto':
+                self._api_version = version
+        else:
+            raise errors.DockerException(
+                'Version parameter must be a string or None. Found {0}'.format(
+                    type(version).__name__
+                )
+            )
+
+    @classmethod
+    def from_env(cls, **kwargs):
+        timeout = kwargs.pop('timeout', None)
+        version = kwargs.pop('version', None)
+        return cls(timeout=timeout, version=version,
+                   **kwargs_from_env(**kwargs))
+
+    async def __aenter__(self):
+        if self._api_version is None:
+            await self.negotiate_version()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self._pool.close()
+
+    @property
+    def _version(self):
+        if self._api_version is None:
+            raise errors.DockerException(
+                'API version has not been negotiated yet. Use the client as '
+                'an async context manager or await negotiate_version() first.'
+            )
+        return self._api_version
+
+    @property
+    def api_version(self):
+        return self._version
+
+    def _supports(self, feature):
+        return feature in utils.api_features(self._version)
+
+    async def negotiate_version(self):
+        try:
+            version = await self.version(api_version=False)
+            self._api_version = version['ApiVersion']
+        except KeyError:
+            raise errors.DockerException(
+                'Invalid response from docker daemon: key "ApiVersion"'
+                ' is missing.'
+            )
+        except Exception as e:
+            raise errors.DockerException(
+                'Error while fetching server API version: {0}'.format(e)
+            )
+        return self._api_version
+
+    def _url(self, pathfmt, *args, **kwargs):
+        for arg in args:
+            if not isinstance(arg, str):
+                raise ValueError(
+                    'Expected a string but found {0} ({1}) '
+                    'instead'.format(arg, type(arg))
+                )
+
+        quote_f = partial(quote_plus, safe="/:")
+        args = map(quote_f, args)
+
+        if kwargs.get('versioned_api', True):
+            return '/v{0}{1}'.format(self._version, pathfmt.format(*args))
+        else:
+            return pathfmt.format(*args)
+
+    def _set_request_timeout(self, kwargs):
+        kwargs.setdefault('timeout', self.timeout)
+        return kwargs
+
+    async def _request(self, method, url, params=None, data=None,
+                       headers=None, timeout=None):
+        """Send a request and return an `HTTPResponse` whose status line and
+        headers have been read. `timeout` bounds the time to first byte of
+        the response once the request body has been sent; sending it and
+        reading the response body have no timeout."""
+        query = encode_params(params)
+        if query:
+            url = '{0}?{1}'.format(url, query)
+
+        request_headers = dict(self.headers)
+        if 'HttpHeaders' in self._auth_configs:
+            request_headers.update(self._auth_configs['HttpHeaders'])
+        if headers:
+            request_headers.update(headers)
+
+        connection = await self._pool.acquire()
+        try:
+            return await connection.request(
+                method, url, request_headers, data, timeout=timeout
+            )
+        except BaseException:
+            connection.release(keep_alive=False)
+            raise
+
+    async def _get(self, url, **kwargs):
+        return await self._request('GET', url, **self._set_request_timeout(
+            kwargs
+        ))
+
+    async def _post(self, url, **kwargs):
+        return await self._request('POST', url, **self._set_request_timeout(
+            kwargs
+        ))
+
+    async def _put(self, url, **kwargs):
+        return await self._request('PUT', url, **self._set_request_timeout(
+            kwargs
+        ))
+
+    async def _delete(self, url, **kwargs):
+        return await self._request(
+            'DELETE', url, **self._set_request_timeout(kwargs)
+        )
+
+    async def _post_json(self, url, data, **kwargs):
+        # Go <1.1 can't unserialize null to a string
+        # so we do this disgusting thing here.
+        data2 = {}
+        if data is not None:
+            for k, v in data.items():
+                if v is not None:
+                    data2[k] = v
+
+        headers = kwargs.pop('headers', None) or {}
+        headers['Content-Type'] = 'application/json'
+        return await self._post(
+            url, data=json.dumps(data2), headers=headers, **kwargs
+        )
+
+    async def _raise_for_status(self, response, explanation=None):
+        """Raises :class:`APIError` if the response carries an error status.
+        The response body is read so the daemon's explanation is available.
+        """
+        if response.status_code < 400:
+            return
+        await response.read()
+        message = '{0} {1} Error: {2} for url: {3}'.format(
+            response.status_code,
+            'Client' if response.status_code < 500 else 'Server',
+            response.reason, self.base_url
+        )
+        e = requests.exceptions.HTTPError(message)
+        if response.status_code == 404:
+            raise errors.NotFound(e, response, explanation=explanation)
+        raise errors.APIError(e, response, explanation=explanation)
+
+    async def _result(self, response, json=False, binary=False):
+        assert not (json and binary)
+        await self._raise_for_status(response)
+        await response.read()
+
+        if json:
+            return response.json()
+        if binary:
+            return response.content
+        return response.text
+
+    async def _stream_helper(self, response, decode=False):
+        """Async generator for data coming from a chunked-encoded HTTP
+        response."""
+        try:
+            if not response.chunked:
+                # Response isn't chunked, meaning we probably
+                # encountered an error immediately
+                yield await self._result(response, json=decode)
+                return
+
+            await self._raise_for_status(response)
+            decoder = JSONStreamDecoder() if decode else None
+            while True:
+                data = await response.read_some()
+                if not data:
+                    break
+                if decode:
+                    for obj in decoder.feed(data):
+                        yield obj
+                else:
+                    yield data
+            if decode:
+                for obj in decoder.close():
+                    yield obj
+        finally:
+            response.close()
+
+    async def _multiplexed_response_stream_helper(self, response):
+        """Async generator of multiplexed (stream id, data) frames coming
+        from a response stream."""
+        try:
+            while True:
+                header = await response.readexactly(
+                    constants.STREAM_HEADER_SIZE_BYTES
+                )
+                if len(header) < constants.STREAM_HEADER_SIZE_BYTES:
+                    break
+                stream_id, length = struct.unpack('>BxxxL', header)
+                if not length:
+                    continue
+                data = await response.readexactly(length)
+                if not data:
+                    break
+                yield stream_id, data
+        finally:
+            response.close()
+
+    async def _raw_response_stream_helper(self, response):
+        """Async generator for raw (TTY or pre-1.6) response streams."""
+        try:
+            while True:
+                data = await response.read_some()
+                if not data:
+                    break
+                yield data
+        finally:
+            response.close()
+
+    async def _demultiplexed_body(self, response, demux=False):
+        return consume_frames(
+            [x async for x in self._multiplexed_response_stream_helper(
+                response
+            )],
+            demux
+        )
+
+    async def _demultiplexed_stream(self, frames, demux=False):
+        """Async generator of the data of (stream id, data) frames, or of
+        (stdout, stderr) tuples with `demux`."""
+        async for stream_id, data in frames:
+            if not demux:
+                yield data
+            elif stream_id == STDERR:
+                yield None, data
+            else:
+                yield data, None
+
+    async def _raw_stream(self, response, demux=False):
+        async for data in self._raw_response_stream_helper(response):
+            yield (data, None) if demux else data
+
+    async def _container_tty(self, container):
+        tty = self._tty_cache.get(container)
+        if tty is None:
+            cont = await self.inspect_container(container)
+            tty = cont['Config']['Tty']
+            if cont['Id'].startswith(container):
+                self._tty_cache.set(container, tty)
+        return tty
+
+    _forget_container = Client._forget_container
+
+    async def _get_result_tty(self, stream, response, is_tty, demux=False):
+        # Returns either an async generator (stream=True) or the full
+        # output as bytes, or as a (stdout, stderr) tuple with `demux`.
+        # TTY output has no separate stderr, so it is all reported as
+        # stdout.
+        await self._raise_for_status(response)
+        if is_tty or not self._supports('multiplexed_streams'):
+            if stream:
+                return self._raw_stream(response, demux)
+            output = await self._result(response, binary=True)
+            return (output, b'') if demux else output
+        if stream:
+            return self._demultiplexed_stream(
+                self._multiplexed_response_stream_helper(response), demux
+            )
+        return await self._demultiplexed_body(response, demux)
@@ -0,0 +1,341 @@
+import asyncio
+import collections
+import json
+import ssl
+from functools import partial
+from urllib.parse import urlencode
+
+import requests.structures
+
+from .. import constants
+
+
+STREAM_READ_SIZE = 65536
+
+
+async def iterate_in_executor(loop, iterable):
+    """Async generator of the items of a blocking iterable, each of which
+    is produced in the loop's default executor."""
+    iterator = iter(iterable)
+    while True:
+        item = await loop.run_in_executor(None, next, iterator, None)
+        if item is None:
+            return
+        yield item
+
+
+def encode_params(params):
+    """Encode a query-parameters dict the same way `requests` does: keys
+    with a value of None are dropped and list values are repeated."""
+    if not params:
+        return ''
+    result = []
+    for k, vs in params.items():
+        if isinstance(vs, (str, bytes)) or not hasattr(vs, '__iter__'):
+            vs = [vs]
+        for v in vs:
+            if v is not None:
+                result.append((k, v))
+    return urlencode(result, doseq=True)
+
+
+def ssl_context_from_tls(tls):
+    """Build an `ssl.SSLContext` from a `docker.tls.TLSConfig` (or from
+    `True`, meaning "verify the server against the default CA pool")."""
+    if tls is True:
+        return ssl.create_default_context()
+
+    context = ssl.SSLContext(tls.ssl_version)
+    if tls.verify:
+        context.verify_mode = ssl.CERT_REQUIRED
+        if tls.ca_cert:
+            context.load_verify_locations(cafile=tls.ca_cert)
+        else:
+            context.load_default_certs()
+        context.check_hostname = tls.assert_hostname is not False
+    else:
+        context.check_hostname = False
+        context.verify_mode = ssl.CERT_NONE
+    if tls.cert:
+        context.load_cert_chain(*tls.cert)
+    return context
+
+
+class HTTPResponse(object):
+    """A response read off an `HTTPConnection`. The status line and headers
+    are parsed eagerly; the body is read on demand, either at once with
+    `read()` or incrementally with `read_some()` / `readexactly()`."""
+
+    def __init__(self, connection, status_code, reason, headers, method):
+        self.connection = connection
+        self.status_code = status_code
+        self.reason = reason
+        self.headers = headers
+        self.method = method
+        self.content = None
+        self._buffer = bytearray()
+        self._eof = False
+
+        transfer_encoding = headers.get('Transfer-Encoding', '').lower()
+        self.chunked = 'chunked' in transfer_encoding
+        self.upgraded = status_code == 101
+        self._remaining = None
+        if not self.chunked and 'Content-Length' in headers:
+            self._remaining = int(headers['Content-Length'])
+        if method == 'HEAD' or status_code in (204, 304):
+            self._eof = True
+        elif self._remaining == 0:
+            self._eof = True
+
+    @property
+    def will_close(self):
+        if self.upgraded:
+            return True
+        if self.headers.get('Connection', '').lower() == 'close':
+            return True
+        return not self.chunked and self._remaining is None
+
+    async def _read_chunk(self):
+        reader = self.connection.reader
+        line = await reader.readline()
+        size = int(line.split(b';', 1)[0].strip() or b'0', 16)
+        if size == 0:
+            # Discard the (possibly empty) trailer
+            while True:
+                line = await reader.readline()
+                if line in (b'\r\n', b'\n', b''):
+                    break
+            return b''
+        data = await reader.readexactly(size)
+        await reader.readexactly(2)
+        return data
+
+    async def read_some(self):
+        """Return the next block of body data, or an empty bytes object once
+        the body has been fully consumed. For chunked responses, each call
+        returns exactly one HTTP chunk."""
+        if self._buffer:
+            data = bytes(self._buffer)
+            del self._buffer[:]
+            return data
+        return await self._read_block()
+
+    async def _read_block(self):
+        if self._eof:
+            return b''
+
+        reader = self.connection.reader
+        if self.chunked:
+            data = await self._read_chunk()
+        elif self._remaining is not None:
+            data = await reader.read(min(self._remaining, STREAM_READ_SIZE))
+            self._remaining -= len(data)
+            if self._remaining <= 0:
+                self._eof = True
+        else:
+            data = await reader.read(STREAM_READ_SIZE)
+
+        if not data:
+            self._eof = True
+        return data
+
+    async def readexactly(self, n):
+        """Read exactly `n` bytes of body. Returns fewer bytes only if the
+        body ends first."""
+        while len(self._buffer) < n:
+            data = await self._read_block()
+            if not data:
+                break
+            self._buffer += data
+        data = bytes(self._buffer[:n])
+        del self._buffer[:n]
+        return data
+
+    async def read(self):
+        if self.content is None:
+            parts = []
+            while True:
+                data = await self.read_some()
+                if not data:
+                    break
+                parts.append(data)
+            self.content = b''.join(parts)
+            self.release()
+        return self.content
+
+    @property
+    def text(self):
+        return self.content.decode('utf-8', 'replace')
+
+    def json(self):
+        return json.loads(self.text)
+
+    def release(self):
+        """Hand the connection back to its pool. The connection is only kept
+        alive if the body was fully consumed and the server allows it."""
+        if self.connection is None:
+            return
+        connection, self.connection = self.connection, None
+        connection.release(keep_alive=self._eof and not self.will_close)
+
+    def close(self):
+        if self.connection is None:
+            return
+        connection, self.connection = self.connection, None
+        connection.release(keep_alive=False)
+
+
+class HTTPConnection(object):
+    """A single HTTP/1.1 connection on top of asyncio streams."""
+
+    def __init__(self, pool, reader, writer):
+        self.pool = pool
+        self.reader = reader
+        self.writer = writer
+
+    @property
+    def closed(self):
+        return self.reader.at_eof() or self.writer.is_closing()
+
+    async def _write_chunk(self, data):
+        self.writer.write(
+            '{0:x}\r\n'.format(len(data)).encode() + data + b'\r\n'
+        )
+        await self.writer.drain()
+
+    async def _write_body(self, body):
+        """Write a request body. Byte strings are sent as-is; file-like
+        objects, iterables and async iterables are sent with chunked
+        transfer encoding. Files are read in the loop's default executor."""
+        if body is None:
+            return
+        if hasattr(body, 'read'):
+            body = iterate_in_executor(
+                asyncio.get_event_loop(),
+                iter(partial(body.read, STREAM_READ_SIZE), b'')
+            )
+        if isinstance(body, (bytes, bytearray)):
+            self.writer.write(body)
+        elif hasattr(body, '__aiter__'):
+            async for data in body:
+                if data:
+                    await self._write_chunk(data)
+            self.writer.write(b'0\r\n\r\n')
+        else:
+            for data in body:
+                if data:
+                    await self._write_chunk(data)
+            self.writer.write(b'0\r\n\r\n')
+        await self.writer.drain()
+
+    async def request(self, method, path, headers, body=None, timeout=None):
+        """Send a request and read the status line and headers of its
+        response, waiting at most `timeout` seconds for them once the body
+        has been sent."""
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+
+        lines = ['{0} {1} HTTP/1.1'.format(method, path)]
+        headers = requests.structures.CaseInsensitiveDict(headers)
+        headers.setdefault('Host', self.pool.host)
+        if isinstance(body, (bytes, bytearray)):
+            headers['Content-Length'] = str(len(body))
+        elif body is not None:
+            headers['Transfer-Encoding'] = 'chunked'
+        elif method in ('POST', 'PUT'):
+            headers['Content-Length'] = '0'
+        for k, v in headers.items():
+            lines.append('{0}: {1}'.format(k, v))
+        self.writer.write(
+            ('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1')
+        )
+        await self._write_body(body)
+        return await asyncio.wait_for(self._read_response(method), timeout)
+
+    async def _read_response(self, method):
+        reader = self.reader
+        while True:
+            status_line = await reader.readline()
+            if not status_line:
+                raise ConnectionError('Connection closed by the daemon')
+            _, status, reason = (
+                status_line.decode('latin-1').rstrip('\r\n').split(' ', 2) +
+                ['']
+            )[:3]
+            status = int(status)
+
+            headers = requests.structures.CaseInsensitiveDict()
+            while True:
+                line = await reader.readline()
+                if line in (b'\r\n', b'\n', b''):
+                    break
+                k, v = line.decode('latin-1').split(':', 1)
+                headers[k.strip()] = v.strip()
+            # Skip interim responses such as "100 Continue"
+            if 100 <= status < 200 and status != 101:
+                continue
+            return HTTPResponse(self, status, reason, headers, method)
+
+    def release(self, keep_alive=True):
+        self.pool.release(self, keep_alive)
+
+    def close(self):
+        self.writer.close()
+
+
+class ConnectionPool(object):
+    """A bounded pool of keep-alive `HTTPConnection`s. At most `maxsize`
+    connections exist at any time; extra requests wait for a free one."""
+
+    def __init__(self, base_url, maxsize=constants.DEFAULT_NUM_POOLS,
+                 ssl_context=None):
+        self.maxsize = maxsize
+        self.ssl_context = ssl_context
+        if base_url.startswith('http+unix://'):
+            socket_path = base_url.replace('http+unix://', '')
+            if not socket_path.startswith('/'):
+                socket_path = '/' + socket_path
+            self.socket_path = socket_path
+            self.host = 'localunixsocket'
+            self.port = None
+        else:
+            self.socket_path = None
+            netloc = base_url.split('://', 1)[1].split('/', 1)[0]
+            self.host, port = netloc.rsplit(':', 1)
+            self.port = int(port)
+        self._idle = collections.deque()
+        self._semaphore = None
+
+    async def _connect(self):
+        if self.socket_path:
+            return await asyncio.open_unix_connection(self.socket_path)
+        return await asyncio.open_connection(
+            self.host, self.port, ssl=self.ssl_context
+        )
+
+    async def acquire(self):
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.maxsize)
+        await self._semaphore.acquire()
+        try:
+            while self._idle:
+                connection = self._idle.pop()
+                if not connection.closed:
+                    return connection
+                connection.close()
+            reader, writer = await self._connect()
+        except BaseException:
+            self._semaphore.release()
+            raise
+        return HTTPConnection(self, reader, writer)
+
+    def release(self, connection, keep_alive=True):
+        if keep_alive and not connection.closed:
+            self._idle.append(connection)
+        else:
+            connection.close()
+        self._semaphore.release()
+
+    def close(self):
+        while self._idle:
+            self._idle.pop().close()
@@ -7,6 +7,7 @@ from .. import constants
 from .. import errors
 from .. import auth
 from .. import utils
+from ..buildgraph import DEFAULT_BUILD_WORKERS, BuildGraph, GraphBuild
 
 
 log = logging.getLogger(__name__)
@@ -17,7 +18,61 @@ class BuildApiMixin(object):
               nocache=False, rm=False, stream=False, timeout=None,
               custom_context=False, encoding=None, pull=False,
               forcerm=False, dockerfile=None, container_limits=None,
-              decode=False, buildargs=None, gzip=False):
+              decode=False, buildargs=None, gzip=False,
+              stream_context=False, context_workers=None,
+              context_cache=None, minimal_context=False, gzip_level=None,
+              gzip_workers=None, progress=False, cache_from=None,
+              pull_cache_from=False):
+        context, params, headers, stream = self._build_request(
+            path=path, tag=tag, quiet=quiet, fileobj=fileobj,
+            nocache=nocache, rm=rm, stream=stream,
+            custom_context=custom_context, encoding=encoding, pull=pull,
+            forcerm=forcerm, dockerfile=dockerfile,
+            container_limits=container_limits, buildargs=buildargs, gzip=gzip,
+            stream_context=stream_context, context_workers=context_workers,
+            context_cache=context_cache, minimal_context=minimal_context,
+            gzip_level=gzip_level, gzip_workers=gzip_workers,
+            cache_from=cache_from
+        )
+
+        if cache_from and pull_cache_from:
+            self.pull_cache_images(cache_from)
+
+        response = self._post(
+            self._url('/build'),
+            data=context,
+            params=params,
+            headers=headers,
+            stream=stream or progress,
+            timeout=timeout,
+        )
+
+        if context is not None and not custom_context:
+            context.close()
+
+        if progress:
+            return utils.BuildProgress(
+                self._stream_helper(response, decode=True)
+            )
+        if stream:
+            return self._stream_helper(response, decode=decode)
+        else:
+            output = self._result(response)
+            srch = r'Successfully built ([0-9a-f]+)'
+            match = re.search(srch, output)
+            if not match:
+                return None, output
+            return match.group(1), output
+
+    def _build_request(self, path, tag, quiet, fileobj, nocache, rm, stream,
+                       custom_context, encoding, pull, forcerm, dockerfile,
+                       container_limits, buildargs, gzip,
+                       stream_context=False, context_workers=None,
+                       context_cache=None, minimal_context=False,
+                       gzip_level=None, gzip_workers=None, cache_from=None):
+        """Validate the build parameters and prepare the build context.
+        Returns a `(context, params, headers, stream)` tuple for the
+        `/build` request."""
         remote = context = None
         headers = {}
         container_limits = container_limits or {}
@@ -34,7 +89,18 @@ class BuildApiMixin(object):
                     'Invalid container_limits key {0}'.format(key)
                 )
 
-        if custom_context:
+        if isinstance(fileobj, dict):
+            # The files of the context, held in memory
+            if stream_context:
+                context = utils.memory_tar_stream(
+                    fileobj, gzip=gzip, gzip_level=gzip_level
+                )
+            else:
+                context = utils.memory_tar(
+                    fileobj, gzip=gzip, gzip_level=gzip_level
+                )
+            encoding = 'gzip' if gzip else encoding
+        elif custom_context:
             if not fileobj:
                 raise TypeError("You must specify fileobj with custom_context")
             context = fileobj
@@ -51,23 +117,36 @@ class BuildApiMixin(object):
             if os.path.exists(dockerignore):
                 with open(dockerignore, 'r') as f:
                     exclude = list(filter(bool, f.read().splitlines()))
-            context = utils.tar(
-                path, exclude=exclude, dockerfile=dockerfile, gzip=gzip
-            )
+            sources = None
+            if minimal_context:
+                sources = utils.read_context_sources(path, dockerfile)
+            if stream_context:
+                context = utils.tar_stream(
+                    path, exclude=exclude, dockerfile=dockerfile, gzip=gzip,
+                    workers=context_workers, cache=context_cache,
+                    sources=sources, gzip_level=gzip_level,
+                    gzip_workers=gzip_workers
+                )
+            else:
+                context = utils.tar(
+                    path, exclude=exclude, dockerfile=dockerfile, gzip=gzip,
+                    workers=context_workers, cache=context_cache,
+                    sources=sources, gzip_level=gzip_level,
+                    gzip_workers=gzip_workers
+                )
             encoding = 'gzip' if gzip else encoding
 
-        if utils.compare_version('1.8', self._version) >= 0:
+        if self._supports('build_stream'):
             stream = True
 
-        if dockerfile and utils.compare_version('1.17', self._version) < 0:
+        if dockerfile and not self._supports('build_dockerfile'):
             raise errors.InvalidVersion(
                 'dockerfile was only introduced in API version 1.17'
             )
 
-        if utils.compare_version('1.19', self._version) < 0:
+        if not self._supports('build_pull_bool'):
             pull = 1 if pull else 0
 
-        u = self._url('/build')
         params = {
             't': tag,
             'remote': remote,
@@ -81,43 +160,49 @@ class BuildApiMixin(object):
         params.update(container_limits)
 
         if buildargs:
-            if utils.version_gte(self._version, '1.21'):
+            if self._supports('build_buildargs'):
                 params.update({'buildargs': json.dumps(buildargs)})
             else:
                 raise errors.InvalidVersion(
                     'buildargs was only introduced in API version 1.21'
                 )
 
+        if cache_from:
+            if self._supports('build_cache_from'):
+                params.update({'cachefrom': json.dumps(cache_from)})
+            else:
+                raise errors.InvalidVersion(
+                    'cache_from was only introduced in API version 1.25'
+                )
+
         if context is not None:
             headers = {'Content-Type': 'application/tar'}
             if encoding:
                 headers['Content-Encoding'] = encoding
 
-        if utils.compare_version('1.9', self._version) >= 0:
+        if self._supports('build_registry_config'):
             self._set_auth_headers(headers)
 
-        response = self._post(
-            u,
-            data=context,
-            params=params,
-            headers=headers,
-            stream=stream,
-            timeout=timeout,
+        return context, params, headers, stream
+
+    def build_images(self, specs, workers=DEFAULT_BUILD_WORKERS):
+        """Build several images, given as dicts of `build` arguments with a
+        `tag`, in the order given by the FROM instructions of their
+        Dockerfiles. Returns a `GraphBuild` iterator of their progress."""
+        return GraphBuild(self, BuildGraph(specs), workers)
+
+    def pull_cache_images(self, images, workers=4):
+        """Pull the images given as `cache_from` to a build, `workers` at a
+        time, so that a fresh daemon can use their layers as cache. Images
+        which can't be pulled are left out of the cache by the daemon, so
+        their errors are returned, as a dict of image names to error
+        messages, rather than raised."""
+        transfer = self.pull_images(images, workers=workers)
+        transfer.wait()
+        return dict(
+            (image, str(error)) for image, error in transfer.errors.items()
         )
 
-        if context is not None and not custom_context:
-            context.close()
-
-        if stream:
-            return self._stream_helper(response, decode=decode)
-        else:
-            output = self._result(response)
-            srch = r'Successfully built ([0-9a-f]+)'
-            match = re.search(srch, output)
-            if not match:
-                return None, output
-            return match.group(1), output
-
     def _set_auth_headers(self, headers):
         log.debug('Looking for auth config')
 
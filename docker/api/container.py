@@ -10,7 +10,7 @@ from ..utils.utils import create_networking_config, create_endpoint_config
 class ContainerApiMixin(object):
     @utils.check_resource
     def attach(self, container, stdout=True, stderr=True,
-               stream=False, logs=False):
+               stream=False, logs=False, demux=False):
         params = {
             'logs': logs and 1 or 0,
             'stdout': stdout and 1 or 0,
@@ -26,7 +26,7 @@ class ContainerApiMixin(object):
         u = self._url("/containers/{0}/attach", container)
         response = self._post(u, headers=headers, params=params, stream=stream)
 
-        return self._read_from_socket(response, stream)
+        return self._read_from_socket(response, stream, demux)
 
     @utils.check_resource
     def attach_socket(self, container, params=None, ws=False):
@@ -120,7 +120,7 @@ class ContainerApiMixin(object):
         if isinstance(volumes, six.string_types):
             volumes = [volumes, ]
 
-        if host_config and utils.compare_version('1.15', self._version) < 0:
+        if host_config and not self._supports('host_config'):
             raise errors.InvalidVersion(
                 'host_config is not supported in API < 1.15'
             )
@@ -192,6 +192,7 @@ class ContainerApiMixin(object):
         )
 
     @utils.check_resource
+    @utils.cached_inspect('container')
     def inspect_container(self, container):
         return self._result(
             self._get(self._url("/containers/{0}/json", container)), True
@@ -211,41 +212,52 @@ class ContainerApiMixin(object):
 
     @utils.check_resource
     def logs(self, container, stdout=True, stderr=True, stream=False,
-             timestamps=False, tail='all', since=None, follow=None):
-        if utils.compare_version('1.11', self._version) >= 0:
-            if follow is None:
-                follow = stream
-            params = {'stderr': stderr and 1 or 0,
-                      'stdout': stdout and 1 or 0,
-                      'timestamps': timestamps and 1 or 0,
-                      'follow': follow and 1 or 0,
-                      }
-            if utils.compare_version('1.13', self._version) >= 0:
-                if tail != 'all' and (not isinstance(tail, int) or tail < 0):
-                    tail = 'all'
-                params['tail'] = tail
-
-            if since is not None:
-                if utils.compare_version('1.19', self._version) < 0:
-                    raise errors.InvalidVersion(
-                        'since is not supported in API < 1.19'
-                    )
-                else:
-                    if isinstance(since, datetime):
-                        params['since'] = utils.datetime_to_timestamp(since)
-                    elif (isinstance(since, int) and since > 0):
-                        params['since'] = since
+             timestamps=False, tail='all', since=None, follow=None,
+             demux=False, tty=None):
+        if self._supports('logs'):
+            params = self._logs_params(
+                stdout, stderr, stream, timestamps, tail, since, follow
+            )
             url = self._url("/containers/{0}/logs", container)
             res = self._get(url, params=params, stream=stream)
-            return self._get_result(container, stream, res)
+            if tty is None:
+                return self._get_result(container, stream, res, demux)
+            return self._get_result_tty(stream, res, tty, demux)
         return self.attach(
             container,
             stdout=stdout,
             stderr=stderr,
             stream=stream,
-            logs=True
+            logs=True,
+            demux=demux
         )
 
+    def _logs_params(self, stdout, stderr, stream, timestamps, tail, since,
+                     follow):
+        if follow is None:
+            follow = stream
+        params = {'stderr': stderr and 1 or 0,
+                  'stdout': stdout and 1 or 0,
+                  'timestamps': timestamps and 1 or 0,
+                  'follow': follow and 1 or 0,
+                  }
+        if self._supports('logs_tail'):
+            if tail != 'all' and (not isinstance(tail, int) or tail < 0):
+                tail = 'all'
+            params['tail'] = tail
+
+        if since is not None:
+            if not self._supports('logs_since'):
+                raise errors.InvalidVersion(
+                    'since is not supported in API < 1.19'
+                )
+            else:
+                if isinstance(since, datetime):
+                    params['since'] = utils.datetime_to_timestamp(since)
+                elif (isinstance(since, int) and since > 0):
+                    params['since'] = since
+        return params
+
     @utils.check_resource
     def pause(self, container):
         url = self._url('/containers/{0}/pause', container)
@@ -291,6 +303,7 @@ class ContainerApiMixin(object):
             self._url("/containers/{0}", container), params=params
         )
         self._raise_for_status(res)
+        self._forget_container(container)
 
     @utils.minimum_version('1.17')
     @utils.check_resource
@@ -321,6 +334,28 @@ class ContainerApiMixin(object):
               restart_policy=None, cap_add=None, cap_drop=None, devices=None,
               extra_hosts=None, read_only=None, pid_mode=None, ipc_mode=None,
               security_opt=None, ulimits=None):
+        start_config = self._start_config(
+            binds=binds, port_bindings=port_bindings, lxc_conf=lxc_conf,
+            publish_all_ports=publish_all_ports, links=links, dns=dns,
+            privileged=privileged, dns_search=dns_search, cap_add=cap_add,
+            cap_drop=cap_drop, volumes_from=volumes_from, devices=devices,
+            network_mode=network_mode, restart_policy=restart_policy,
+            extra_hosts=extra_hosts, read_only=read_only, pid_mode=pid_mode,
+            ipc_mode=ipc_mode, security_opt=security_opt, ulimits=ulimits
+        )
+
+        url = self._url("/containers/{0}/start", container)
+        res = self._post_json(url, data=start_config)
+        self._raise_for_status(res)
+
+    def _start_config(self, **start_config_kwargs):
+        dns = start_config_kwargs.get('dns')
+        volumes_from = start_config_kwargs.get('volumes_from')
+        security_opt = start_config_kwargs.get('security_opt')
+        ipc_mode = start_config_kwargs.get('ipc_mode')
+        read_only = start_config_kwargs.get('read_only')
+        pid_mode = start_config_kwargs.get('pid_mode')
+        ulimits = start_config_kwargs.get('ulimits')
 
         if utils.compare_version('1.10', self._version) < 0:
             if dns is not None:
@@ -358,17 +393,6 @@ class ContainerApiMixin(object):
                     'ulimits is only supported for API version >= 1.18'
                 )
 
-        start_config_kwargs = dict(
-            binds=binds, port_bindings=port_bindings, lxc_conf=lxc_conf,
-            publish_all_ports=publish_all_ports, links=links, dns=dns,
-            privileged=privileged, dns_search=dns_search, cap_add=cap_add,
-            cap_drop=cap_drop, volumes_from=volumes_from, devices=devices,
-            network_mode=network_mode, restart_policy=restart_policy,
-            extra_hosts=extra_hosts, read_only=read_only, pid_mode=pid_mode,
-            ipc_mode=ipc_mode, security_opt=security_opt, ulimits=ulimits
-        )
-        start_config = None
-
         if any(v is not None for v in start_config_kwargs.values()):
             if utils.compare_version('1.15', self._version) > 0:
                 warnings.warn(
@@ -376,11 +400,8 @@ class ContainerApiMixin(object):
                     'Please use host_config in create_container instead!',
                     DeprecationWarning
                 )
-            start_config = self.create_host_config(**start_config_kwargs)
-
-        url = self._url("/containers/{0}/start", container)
-        res = self._post_json(url, data=start_config)
-        self._raise_for_status(res)
+            return self.create_host_config(**start_config_kwargs)
+        return None
 
     @utils.minimum_version('1.17')
     @utils.check_resource
@@ -54,7 +54,7 @@ class ExecApiMixin(object):
 
     @utils.minimum_version('1.15')
     def exec_start(self, exec_id, detach=False, tty=False, stream=False,
-                   socket=False):
+                   socket=False, demux=False):
         # we want opened socket if socket == True
         if isinstance(exec_id, dict):
             exec_id = exec_id.get('Id')
@@ -78,4 +78,4 @@ class ExecApiMixin(object):
 
         if socket:
             return self._get_raw_response_socket(res)
-        return self._read_from_socket(res, stream)
+        return self._read_from_socket(res, stream, demux)
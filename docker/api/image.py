@@ -7,12 +7,47 @@ from ..auth import auth
 from ..constants import INSECURE_REGISTRY_DEPRECATION_WARNING
 from .. import utils
 from .. import errors
+from ..transfers import (
+    DEFAULT_TRANSFER_WORKERS, ImageTransfer, unique_images
+)
+from ..utils.json_stream import json_stream
 
 log = logging.getLogger(__name__)
 
 
 class ImageApiMixin(object):
 
+    def ensure_image(self, image, auth_config=None):
+        """Returns the ID of the local image `image` refers to, pulling it
+        first if there is none. Once the client's `enable_image_index()` has
+        been called, images found locally cost no request to the daemon."""
+        image_id = self._local_image_id(image)
+        if image_id is not None:
+            return image_id
+
+        repository, tag = utils.parse_repository_tag(image)
+        for message in self.pull(repository, tag=tag or 'latest',
+                                 stream=True, decode=True,
+                                 auth_config=auth_config):
+            if isinstance(message, dict) and 'error' in message:
+                raise errors.DockerException(message['error'])
+
+        image_id = self._local_image_id(image)
+        if image_id is None:
+            raise errors.DockerException(
+                'Image {0} was not found after pulling it'.format(image)
+            )
+        return image_id
+
+    def _local_image_id(self, image):
+        index = getattr(self, 'image_index', None)
+        if index is not None:
+            return index.resolve(image, lambda: self.images(all=True))
+        try:
+            return self.inspect_image(image)['Id']
+        except errors.NotFound:
+            return None
+
     @utils.check_resource
     def get_image(self, image):
         res = self._get(self._url("/images/{0}/get", image), stream=True)
@@ -128,6 +163,7 @@ class ImageApiMixin(object):
         return self._result(self._post(api_url, params=params))
 
     @utils.check_resource
+    @utils.cached_inspect('image')
     def inspect_image(self, image):
         return self._result(
             self._get(self._url("/images/{0}/json", image)), True
@@ -137,6 +173,22 @@ class ImageApiMixin(object):
         res = self._post(self._url("/images/load"), data=data)
         self._raise_for_status(res)
 
+    def load_image_from_file(self, filename):
+        """Loads the images of the tarball `filename` (as `docker save`
+        writes). On Linux, the file is sent to the daemon with sendfile.
+        Returns the progress messages of the daemon."""
+        with open(filename, 'rb') as f:
+            res = self._post_file(
+                self._url("/images/load"), f,
+                headers={'Content-Type': 'application/x-tar'}
+            )
+        self._raise_for_status(res)
+        messages = list(json_stream([res.content]))
+        for message in messages:
+            if isinstance(message, dict) and 'error' in message:
+                raise errors.DockerException(message['error'])
+        return messages
+
     def pull(self, repository, tag=None, stream=False,
              insecure_registry=False, auth_config=None, decode=False):
         if insecure_registry:
@@ -153,16 +205,7 @@ class ImageApiMixin(object):
             'tag': tag,
             'fromImage': repository
         }
-        headers = {}
-
-        if utils.compare_version('1.5', self._version) >= 0:
-            if auth_config is None:
-                header = auth.get_config_header(self, registry)
-                if header:
-                    headers['X-Registry-Auth'] = header
-            else:
-                log.debug('Sending supplied auth config')
-                headers['X-Registry-Auth'] = auth.encode_header(auth_config)
+        headers = self._registry_auth_headers(registry, auth_config)
 
         response = self._post(
             self._url('/images/create'), params=params, headers=headers,
@@ -176,6 +219,19 @@ class ImageApiMixin(object):
 
         return self._result(response)
 
+    def pull_images(self, images, workers=DEFAULT_TRANSFER_WORKERS,
+                    auth_config=None):
+        """Pull several images, `workers` at a time, over the client's
+        connection pool. Images without a tag are pulled with the `latest`
+        tag. Returns an `ImageTransfer` iterator of their progress."""
+        def pull(image):
+            repository, tag = utils.parse_repository_tag(image)
+            return self.pull(
+                repository, tag=tag or 'latest', stream=True, decode=True,
+                auth_config=auth_config
+            )
+        return ImageTransfer(pull, images, workers)
+
     def push(self, repository, tag=None, stream=False,
              insecure_registry=False, auth_config=None, decode=False):
         if insecure_registry:
@@ -187,21 +243,14 @@ class ImageApiMixin(object):
         if not tag:
             repository, tag = utils.parse_repository_tag(repository)
         registry, repo_name = auth.resolve_repository_name(repository)
+        headers = self._registry_auth_headers(registry, auth_config)
+        return self._push(repository, tag, headers, stream, decode)
+
+    def _push(self, repository, tag, headers, stream=False, decode=False):
         u = self._url("/images/{0}/push", repository)
         params = {
             'tag': tag
         }
-        headers = {}
-
-        if utils.compare_version('1.5', self._version) >= 0:
-            if auth_config is None:
-                header = auth.get_config_header(self, registry)
-                if header:
-                    headers['X-Registry-Auth'] = header
-            else:
-                log.debug('Sending supplied auth config')
-                headers['X-Registry-Auth'] = auth.encode_header(auth_config)
-
         response = self._post_json(
             u, None, headers=headers, stream=stream, params=params
         )
@@ -213,12 +262,62 @@ class ImageApiMixin(object):
 
         return self._result(response)
 
+    def push_images(self, images, workers=DEFAULT_TRANSFER_WORKERS,
+                    auth_config=None):
+        """Push several repositories or tags, `workers` at a time, over the
+        client's connection pool. The credentials of each registry are only
+        looked up once. Returns an `ImageTransfer` iterator of their
+        progress."""
+        images = unique_images(images)
+        registry_headers = {}
+        for image in images:
+            repository, _ = utils.parse_repository_tag(image)
+            registry, _ = auth.resolve_repository_name(repository)
+            if registry not in registry_headers:
+                registry_headers[registry] = self._registry_auth_headers(
+                    registry, auth_config
+                )
+
+        def push(image):
+            repository, tag = utils.parse_repository_tag(image)
+            registry, _ = auth.resolve_repository_name(repository)
+            return self._push(
+                repository, tag, dict(registry_headers[registry]),
+                stream=True, decode=True
+            )
+        return ImageTransfer(push, images, workers)
+
+    def _registry_auth_headers(self, registry, auth_config=None):
+        headers = {}
+        if self._supports('registry_auth'):
+            if auth_config is None:
+                header = auth.get_config_header(self, registry)
+                if header:
+                    headers['X-Registry-Auth'] = header
+            else:
+                log.debug('Sending supplied auth config')
+                headers['X-Registry-Auth'] = auth.encode_header(auth_config)
+        return headers
+
     @utils.check_resource
     def remove_image(self, image, force=False, noprune=False):
         params = {'force': force, 'noprune': noprune}
         res = self._delete(self._url("/images/{0}", image), params=params)
         self._raise_for_status(res)
 
+    @utils.check_resource
+    def save_image_to_file(self, image, filename):
+        """Writes the tarball of `image`, as returned by `get_image`, to
+        `filename`. On Linux, it is spliced from the daemon's socket to the
+        file. Returns the number of bytes written."""
+        res = self._get(self._url("/images/{0}/get", image), stream=True)
+        self._raise_for_status(res)
+        try:
+            with open(filename, 'wb') as f:
+                return self._copy_response_to_file(res, f.fileno())
+        finally:
+            res.close()
+
     def search(self, term):
         return self._result(
             self._get(self._url("/images/search"), params={'term': term}),
@@ -1,7 +1,7 @@
 import json
 
 from ..errors import InvalidVersion
-from ..utils import check_resource, minimum_version
+from ..utils import cached_inspect, check_resource, minimum_version
 from ..utils import version_lt
 
 
@@ -68,6 +68,7 @@ class NetworkApiMixin(object):
         self._raise_for_status(res)
 
     @minimum_version('1.21')
+    @cached_inspect('network')
     def inspect_network(self, net_id):
         url = self._url("/networks/{0}", net_id)
         res = self._get(url)
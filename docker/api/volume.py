@@ -35,6 +35,7 @@ class VolumeApiMixin(object):
         return self._result(self._post_json(url, data=data), True)
 
     @utils.minimum_version('1.21')
+    @utils.cached_inspect('volume')
     def inspect_volume(self, name):
         url = self._url('/volumes/{0}', name)
         return self._result(self._get(url), True)
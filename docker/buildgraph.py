@@ -0,0 +1,284 @@
+import collections
+import io
+import logging
+import os
+import re
+
+import six
+from six.moves import queue
+
+from . import errors
+from .utils.concurrency import ThreadPool
+from .utils.dockerfile import parse_instructions
+from .utils.progress import BUILT_RE
+from .utils.utils import parse_repository_tag
+
+log = logging.getLogger(__name__)
+
+DEFAULT_BUILD_WORKERS = 4
+
+STARTED = 'started'
+OUTPUT = 'output'
+SUCCEEDED = 'succeeded'
+FAILED = 'failed'
+SKIPPED = 'skipped'
+
+VARIABLE_RE = re.compile(r'\$(?:\{(\w+)\}|(\w+))')
+
+GraphBuildEvent = collections.namedtuple(
+    'GraphBuildEvent', 'tag status message'
+)
+
+
+def normalize_image(name):
+    """
+    Returns the name of an image with its tag, `latest` if it has none, so
+    that the names given to FROM and to `build` can be compared.
+    """
+    repository, tag = parse_repository_tag(name)
+    if not tag:
+        return repository + ':latest'
+    separator = '@' if ':' in tag else ':'
+    return repository + separator + tag
+
+
+def substitute(text, variables):
+    def replace(match):
+        return variables.get(match.group(1) or match.group(2), '')
+    return VARIABLE_RE.sub(replace, text)
+
+
+def base_images(content, buildargs=None):
+    """
+    Returns the images which the FROM instructions of the Dockerfile
+    `content` refer to, leaving out the names of its build stages. Variables
+    are replaced with the ARG instructions preceding the first FROM and with
+    `buildargs`.
+    """
+    buildargs = buildargs or {}
+    variables = {}
+    stages = set()
+    images = []
+    seen_from = False
+    for instruction, arguments in parse_instructions(content):
+        if instruction == 'ARG' and not seen_from:
+            name, _, default = arguments.partition('=')
+            name = name.strip()
+            if name in buildargs:
+                variables[name] = buildargs[name]
+            else:
+                variables[name] = default.strip().strip('"\'')
+        elif instruction == 'FROM':
+            seen_from = True
+            parts = [
+                p for p in arguments.split() if not p.startswith('--')
+            ]
+            if not parts:
+                continue
+            image = substitute(parts[0], variables)
+            if image.lower() not in stages and image != 'scratch':
+                images.append(image)
+            if len(parts) >= 3 and parts[1].lower() == 'as':
+                stages.add(parts[2].lower())
+    return images
+
+
+def read_dockerfile(spec):
+    """
+    Returns the content of the Dockerfile of the `build` arguments `spec`,
+    or None if it can't be read (e.g. for a remote context).
+    """
+    dockerfile = spec.get('dockerfile') or 'Dockerfile'
+    fileobj = spec.get('fileobj')
+    content = None
+    if isinstance(fileobj, dict):
+        content = fileobj.get(dockerfile)
+        if content is not None and not isinstance(content, (
+                six.binary_type, six.text_type)):
+            return None
+    elif fileobj is not None:
+        if spec.get('custom_context') or not hasattr(fileobj, 'getvalue'):
+            return None
+        content = fileobj.getvalue()
+    elif spec.get('path') and os.path.isdir(spec['path']):
+        try:
+            with io.open(os.path.join(spec['path'], dockerfile), 'rb') as f:
+                content = f.read()
+        except (IOError, OSError):
+            return None
+    if isinstance(content, six.binary_type):
+        content = content.decode('utf-8', 'replace')
+    return content
+
+
+class BuildGraph(object):
+    """
+    The images to build, given as dicts of `build` arguments with a `tag`,
+    and their dependencies, inferred from the FROM instructions of their
+    Dockerfiles.
+    """
+
+    def __init__(self, specs):
+        self.specs = {}
+        self.order = []
+        for spec in specs:
+            if not spec.get('tag'):
+                raise errors.DockerException(
+                    'Every image of a build graph needs a tag'
+                )
+            tag = normalize_image(spec['tag'])
+            if tag in self.specs:
+                raise errors.DockerException(
+                    'Image {0} is built more than once'.format(tag)
+                )
+            self.specs[tag] = spec
+            self.order.append(tag)
+
+        self.dependencies = {}
+        self.dependents = dict((tag, []) for tag in self.order)
+        for tag in self.order:
+            content = read_dockerfile(self.specs[tag])
+            images = []
+            if content is not None:
+                images = base_images(content, self.specs[tag].get('buildargs'))
+            deps = []
+            for image in images:
+                image = normalize_image(image)
+                if image in self.specs and image not in deps:
+                    deps.append(image)
+                    self.dependents[image].append(tag)
+            self.dependencies[tag] = deps
+
+        self.check_cycles()
+
+    def check_cycles(self):
+        remaining = dict(
+            (tag, len(deps)) for tag, deps in self.dependencies.items()
+        )
+        ready = [tag for tag in self.order if not remaining[tag]]
+        done = 0
+        while ready:
+            tag = ready.pop()
+            done += 1
+            for dependent in self.dependents[tag]:
+                remaining[dependent] -= 1
+                if not remaining[dependent]:
+                    ready.append(dependent)
+        if done < len(self.order):
+            raise errors.DockerException(
+                'The FROM instructions of {0} depend on each other'.format(
+                    ', '.join(t for t in self.order if remaining[t])
+                )
+            )
+
+    def downstream(self, tag):
+        """
+        Returns the tags of the images which depend on `tag`, directly or
+        not.
+        """
+        found = []
+        stack = list(self.dependents[tag])
+        while stack:
+            dependent = stack.pop()
+            if dependent not in found:
+                found.append(dependent)
+                stack.extend(self.dependents[dependent])
+        return found
+
+
+class GraphBuild(object):
+    """
+    Iterator of the `GraphBuildEvent` of the builds of a `BuildGraph`. An
+    image is built once all the images it depends on are, and up to
+    `workers` images are built at the same time. When a build fails, the
+    images which depend on it are skipped and the others are still built.
+
+    Events are `started`, `output` (with a message of the build output),
+    `succeeded` (with the ID of the image), `failed` (with the exception)
+    and `skipped` (with the tag of the image which failed). Once they have
+    all been consumed, `results` maps the tags of the images built to their
+    IDs, and `failed` and `skipped` have the others.
+    """
+
+    def __init__(self, client, graph, workers=DEFAULT_BUILD_WORKERS):
+        self.client = client
+        self.graph = graph
+        self.workers = workers
+        self.results = {}
+        self.failed = {}
+        self.skipped = {}
+        self._events = self._run()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return next(self._events)
+
+    next = __next__
+
+    def _run(self):
+        graph = self.graph
+        remaining = dict(
+            (tag, len(deps)) for tag, deps in graph.dependencies.items()
+        )
+        events = queue.Queue()
+        running = 0
+        with ThreadPool(self.workers) as pool:
+            for tag in graph.order:
+                if not remaining[tag]:
+                    pool.submit(self._build, tag, events)
+                    running += 1
+
+            while running:
+                event = events.get()
+                yield event
+                if event.status not in (SUCCEEDED, FAILED):
+                    continue
+                running -= 1
+                if event.status == FAILED:
+                    self.failed[event.tag] = event.message
+                    for dependent in graph.downstream(event.tag):
+                        if dependent not in self.skipped:
+                            self.skipped[dependent] = event.tag
+                            yield GraphBuildEvent(
+                                dependent, SKIPPED, event.tag
+                            )
+                    continue
+                self.results[event.tag] = event.message
+                for dependent in graph.dependents[event.tag]:
+                    remaining[dependent] -= 1
+                    if not remaining[dependent] and \
+                            dependent not in self.skipped:
+                        pool.submit(self._build, dependent, events)
+                        running += 1
+
+    def _build(self, tag, events):
+        # Run by the worker threads
+        spec = dict(self.graph.specs[tag])
+        spec.update(stream=True, decode=True)
+        spec.pop('progress', None)
+        image_id = None
+        events.put(GraphBuildEvent(tag, STARTED, None))
+        try:
+            for message in self.client.build(**spec):
+                events.put(GraphBuildEvent(tag, OUTPUT, message))
+                if not isinstance(message, dict):
+                    continue
+                if 'error' in message:
+                    raise errors.BuildError(message['error'])
+                aux = message.get('aux')
+                if isinstance(aux, dict) and 'ID' in aux:
+                    image_id = aux['ID']
+                match = BUILT_RE.match(message.get('stream', '').strip())
+                if match and image_id is None:
+                    image_id = match.group(1)
+            if image_id is None:
+                raise errors.BuildError(
+                    'The build of {0} ended without an image'.format(tag)
+                )
+        except Exception as e:
+            log.debug('Build of {0} failed: {1}'.format(tag, e))
+            events.put(GraphBuildEvent(tag, FAILED, e))
+        else:
+            events.put(GraphBuildEvent(tag, SUCCEEDED, image_id))
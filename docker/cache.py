@@ -0,0 +1,616 @@
+import copy
+import errno
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+import time
+
+from six.moves.urllib.parse import unquote
+
+log = logging.getLogger(__name__)
+
+# Fields of the links of LRUCache's circular doubly linked list
+PREV, NEXT, KEY, VALUE, EXPIRES = 0, 1, 2, 3, 4
+
+
+class LRUCache(object):
+    """
+    A thread-safe mapping that holds at most `maxsize` entries. Once it is
+    full, storing a new key evicts the least recently used one. If `ttl` is
+    set, entries also expire `ttl` seconds after they were stored.
+    """
+
+    def __init__(self, maxsize, ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._map = {}
+        # The root of the list sits between the most recently used entry
+        # (root[PREV]) and the least recently used one (root[NEXT]).
+        self._root = root = []
+        root[:] = [root, root, None, None, None]
+
+    def __len__(self):
+        return len(self._map)
+
+    def __contains__(self, key):
+        return key in self._map
+
+    def _unlink(self, link):
+        link_prev, link_next = link[PREV], link[NEXT]
+        link_prev[NEXT] = link_next
+        link_next[PREV] = link_prev
+
+    def _append(self, link):
+        root = self._root
+        last = root[PREV]
+        link[PREV], link[NEXT] = last, root
+        last[NEXT] = root[PREV] = link
+
+    def get(self, key, default=None):
+        with self._lock:
+            link = self._map.get(key)
+            if link is None:
+                return default
+            self._unlink(link)
+            if link[EXPIRES] is not None and link[EXPIRES] <= time.time():
+                del self._map[key]
+                return default
+            self._append(link)
+            return link[VALUE]
+
+    def set(self, key, value):
+        expires = None
+        if self.ttl is not None:
+            expires = time.time() + self.ttl
+        with self._lock:
+            link = self._map.get(key)
+            if link is not None:
+                link[VALUE] = value
+                link[EXPIRES] = expires
+                self._unlink(link)
+                self._append(link)
+                return
+            if len(self._map) >= self.maxsize:
+                oldest = self._root[NEXT]
+                self._unlink(oldest)
+                del self._map[oldest[KEY]]
+            link = [None, None, key, value, expires]
+            self._append(link)
+            self._map[key] = link
+
+    def pop(self, key, default=None):
+        with self._lock:
+            link = self._map.pop(key, None)
+            if link is None:
+                return default
+            self._unlink(link)
+            return link[VALUE]
+
+    def keys(self):
+        with self._lock:
+            return list(self._map)
+
+    def clear(self):
+        with self._lock:
+            self._map.clear()
+            root = self._root
+            root[:] = [root, root, None, None, None]
+
+
+CONTAINER = 'container'
+IMAGE = 'image'
+NETWORK = 'network'
+VOLUME = 'volume'
+
+DEFAULT_INSPECT_CACHE_SIZE = 1024
+DEFAULT_INSPECT_CACHE_TTL = 30
+
+# Container events which don't change what inspect_container returns
+READ_ONLY_CONTAINER_ACTIONS = (
+    'attach', 'detach', 'resize', 'top', 'export', 'archive-path', 'copy',
+    'commit', 'extract-to-dir'
+)
+
+# Resources that requests to these endpoints may modify
+WRITE_URL_RE = re.compile(
+    r'/(containers|images|networks|volumes|build|commit)(?:/([^?]*))?'
+)
+URL_KINDS = {
+    'containers': CONTAINER, 'images': IMAGE, 'networks': NETWORK,
+    'volumes': VOLUME
+}
+
+
+class InspectCache(object):
+    """
+    A read-through cache of the results of `inspect_container`,
+    `inspect_image`, `inspect_network` and `inspect_volume`.
+
+    Entries are bounded in number and age, and are invalidated when the
+    daemon reports a change through `handle_event` or when the client
+    modifies a resource itself. Lookups are counted in `hits` and `misses`.
+    """
+
+    def __init__(self, maxsize=DEFAULT_INSPECT_CACHE_SIZE,
+                 ttl=DEFAULT_INSPECT_CACHE_TTL):
+        self._entries = LRUCache(maxsize, ttl)
+        self._lock = threading.Lock()
+        # (kind, resource ID) -> keys the resource is cached under
+        self._keys = {}
+        # Keys of images cached by reference, which can move to another image
+        self._image_references = set()
+        # Bumped by every invalidation, so that results loaded concurrently
+        # with an invalidation aren't stored.
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'invalidations': self.invalidations,
+            'size': len(self._entries),
+        }
+
+    def load(self, kind, key, loader):
+        """
+        Returns the cached result for `key`, or calls `loader` to inspect the
+        resource and caches its result.
+        """
+        result = self._entries.get((kind, key))
+        if result is not None:
+            self.hits += 1
+            return copy.deepcopy(result)
+
+        self.misses += 1
+        generation = self._generation
+        result = loader()
+        with self._lock:
+            if generation == self._generation:
+                self._store(kind, key, result)
+        return result
+
+    def _store(self, kind, key, result):
+        resource_id = result.get('Id') or result.get('Name')
+        if not resource_id:
+            return
+        self._entries.set((kind, key), copy.deepcopy(result))
+        if len(self._keys) > 2 * self._entries.maxsize:
+            self._prune_keys()
+        self._keys.setdefault((kind, resource_id), set()).add(key)
+        if kind == IMAGE and not (
+                resource_id.startswith(key) or
+                resource_id.split(':', 1)[-1].startswith(key)):
+            self._image_references.add(key)
+
+    def _prune_keys(self):
+        # Forget the keys of entries evicted from the LRU cache
+        for resource, keys in list(self._keys.items()):
+            keys = set(k for k in keys if (resource[0], k) in self._entries)
+            if keys:
+                self._keys[resource] = keys
+            else:
+                del self._keys[resource]
+        self._image_references = set(
+            k for k in self._image_references if (IMAGE, k) in self._entries
+        )
+
+    def invalidate(self, kind, ref, exact=False):
+        """
+        Drops the entries of a resource. `ref` may be its full ID or any ID
+        prefix or name it was looked up with; with `exact`, it must be the
+        full ID (or the key the resource was looked up with).
+        """
+        if not ref:
+            return
+        with self._lock:
+            self._generation += 1
+            self.invalidations += 1
+            resources = set()
+            if (kind, ref) in self._keys:
+                resources.add((kind, ref))
+            elif not exact:
+                for resource in self._keys:
+                    if resource[0] == kind and (
+                            ref in self._keys[resource] or
+                            resource[1].startswith(ref)):
+                        resources.add(resource)
+            self._entries.pop((kind, ref))
+            for resource in resources:
+                for key in self._keys.pop(resource):
+                    self._entries.pop((kind, key))
+
+    def invalidate_image_references(self):
+        """
+        Drops the images cached by reference (name and tag), which builds,
+        pulls, tags and the like can point to another image.
+        """
+        with self._lock:
+            self._generation += 1
+            self.invalidations += 1
+            for key in self._image_references:
+                self._entries.pop((IMAGE, key))
+            self._image_references = set()
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            self._keys = {}
+            self._image_references = set()
+
+    def handle_event(self, event):
+        """
+        Invalidates the entries affected by an event from the `/events`
+        stream.
+        """
+        actor = event.get('Actor', {})
+        resource_id = actor.get('ID', event.get('id'))
+        action = event.get('Action', event.get('status', ''))
+        # Some actions carry details, e.g. "exec_start: sh"
+        action = action.split(':', 1)[0]
+        kind = event.get('Type')
+        if kind is None:
+            # Events from API < 1.22 only concern containers and images
+            kind = CONTAINER if 'from' in event else IMAGE
+
+        # Events carry full IDs, so there is no need to look for prefixes
+        if kind == CONTAINER:
+            if action not in READ_ONLY_CONTAINER_ACTIONS:
+                self.invalidate(CONTAINER, resource_id, exact=True)
+            if action == 'commit':
+                self.invalidate_image_references()
+        elif kind == IMAGE:
+            self.invalidate(IMAGE, resource_id, exact=True)
+            self.invalidate_image_references()
+        elif kind == NETWORK:
+            self.invalidate(NETWORK, resource_id, exact=True)
+            container = actor.get('Attributes', {}).get('container')
+            self.invalidate(CONTAINER, container, exact=True)
+        elif kind == VOLUME:
+            if action not in ('mount', 'unmount'):
+                self.invalidate(VOLUME, resource_id, exact=True)
+
+    def handle_request(self, method, url, data=None):
+        """
+        Invalidates the entries of the resources a request made by the
+        client may have modified, without waiting for the matching event.
+        """
+        if method == 'GET':
+            return
+        match = WRITE_URL_RE.search(url)
+        if match is None:
+            return
+        endpoint, path = match.group(1), unquote(match.group(2) or '')
+        if endpoint in ('build', 'commit'):
+            self.invalidate_image_references()
+            return
+
+        kind = URL_KINDS[endpoint]
+        if kind == IMAGE:
+            # Image names may contain slashes, and be followed by an action
+            self.invalidate(IMAGE, path)
+            self.invalidate(IMAGE, path.rsplit('/', 1)[0])
+            self.invalidate_image_references()
+        else:
+            self.invalidate(kind, path.split('/', 1)[0])
+        if kind == NETWORK and data:
+            # Connecting and disconnecting also change the container
+            try:
+                data = json.loads(data)
+            except (TypeError, ValueError):
+                return
+            if isinstance(data, dict):
+                self.invalidate(CONTAINER, data.get('Container'))
+
+
+DEFAULT_IMAGE_INDEX_TTL = 300
+
+# Image events which don't change the local images
+READ_ONLY_IMAGE_ACTIONS = ('push', 'save')
+
+IMAGE_ID_RE = re.compile(r'^(?:sha256:)?([0-9a-f]{1,64})$')
+DEFAULT_REGISTRY_PREFIXES = ('docker.io/', 'index.docker.io/')
+
+
+def normalize_image_reference(ref):
+    """
+    Returns the name the daemon lists an image reference under: Docker Hub
+    names without their registry or `library/` namespace, and with the
+    `latest` tag if they have neither a tag nor a digest.
+    """
+    for prefix in DEFAULT_REGISTRY_PREFIXES:
+        if ref.startswith(prefix):
+            ref = ref[len(prefix):]
+            break
+    if ref.startswith('library/'):
+        ref = ref[len('library/'):]
+    if '@' not in ref:
+        name, _, tag = ref.rpartition(':')
+        if not name or '/' in tag:
+            ref = ref + ':latest'
+    return ref
+
+
+class ImageIndex(object):
+    """
+    An index of the local images by tag, digest and ID, built from a single
+    `images(all=True)` call.
+
+    The index is rebuilt on the next lookup once it is stale: when the
+    daemon reports an image change through `handle_event`, when the client
+    modifies images itself, or `ttl` seconds after it was built in case an
+    event was missed. Deleted images are dropped from the index without
+    rebuilding it. Lookups are counted in `hits` and `misses`, and rebuilds
+    in `refreshes`.
+    """
+
+    def __init__(self, ttl=DEFAULT_IMAGE_INDEX_TTL):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._refs = {}
+        self._ids = set()
+        self._expires = None
+        self._stale = True
+        # Bumped by every invalidation, so that an index loaded concurrently
+        # with an invalidation isn't kept.
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.refreshes = 0
+
+    def __len__(self):
+        return len(self._ids)
+
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'refreshes': self.refreshes,
+            'images': len(self._ids),
+        }
+
+    @property
+    def stale(self):
+        return self._stale or (
+            self._expires is not None and self._expires <= time.time()
+        )
+
+    def resolve(self, ref, loader):
+        """
+        Returns the ID of the local image `ref` (a name, a name with a digest
+        or an ID) refers to, or None if there is none. `loader` is called to
+        list the images with `images(all=True)` when the index is stale.
+        """
+        refs, ids = self._refs, self._ids
+        if self.stale:
+            # Concurrent lookups wait for a single rebuild
+            with self._refresh_lock:
+                refs, ids = self._refs, self._ids
+                if self.stale:
+                    refs, ids = self._refresh(loader)
+
+        image_id = self._lookup(ref, refs, ids)
+        if image_id is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return image_id
+
+    def _refresh(self, loader):
+        generation = self._generation
+        refs, ids = self._build(loader())
+        with self._lock:
+            self.refreshes += 1
+            if generation == self._generation:
+                self._refs, self._ids = refs, ids
+                self._stale = False
+                if self.ttl is not None:
+                    self._expires = time.time() + self.ttl
+        return refs, ids
+
+    def _build(self, images):
+        refs = {}
+        ids = set()
+        for image in images:
+            image_id = image['Id']
+            ids.add(image_id)
+            names = (image.get('RepoTags') or []) + (
+                image.get('RepoDigests') or []
+            )
+            for name in names:
+                if not name.startswith('<none>'):
+                    refs[normalize_image_reference(name)] = image_id
+        return refs, ids
+
+    def _lookup(self, ref, refs, ids):
+        image_id = refs.get(normalize_image_reference(ref))
+        if image_id is not None:
+            return image_id
+        match = IMAGE_ID_RE.match(ref)
+        if match is None:
+            return None
+        prefix = match.group(1)
+        found = [
+            i for i in ids if i.split(':', 1)[-1].startswith(prefix)
+        ]
+        if len(found) == 1:
+            return found[0]
+        return None
+
+    def invalidate(self):
+        """
+        Marks the index as stale, so that the next lookup rebuilds it.
+        """
+        with self._lock:
+            self._generation += 1
+            self._stale = True
+
+    def remove(self, image_id):
+        """
+        Drops an image and all its names from the index.
+        """
+        with self._lock:
+            self._generation += 1
+            if image_id not in self._ids:
+                return
+            self._ids = set(i for i in self._ids if i != image_id)
+            self._refs = dict(
+                (k, v) for k, v in self._refs.items() if v != image_id
+            )
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._refs = {}
+            self._ids = set()
+            self._stale = True
+
+    def handle_event(self, event):
+        """
+        Updates the index after an event from the `/events` stream.
+        """
+        action = event.get('Action', event.get('status', ''))
+        kind = event.get('Type')
+        if kind is None:
+            kind = CONTAINER if 'from' in event else IMAGE
+
+        if kind == CONTAINER:
+            if action == 'commit':
+                self.invalidate()
+        elif kind == IMAGE:
+            if action == 'delete':
+                self.remove(event.get('Actor', {}).get('ID', event.get('id')))
+            elif action not in READ_ONLY_IMAGE_ACTIONS:
+                self.invalidate()
+
+    def handle_request(self, method, url, data=None):
+        """
+        Marks the index as stale after a request made by the client which
+        may have added, tagged or removed images.
+        """
+        if method == 'GET':
+            return
+        match = WRITE_URL_RE.search(url)
+        if match is None:
+            return
+        endpoint, path = match.group(1), match.group(2) or ''
+        if endpoint in ('build', 'commit') or (
+                endpoint == 'images' and not path.endswith('/push')):
+            self.invalidate()
+
+
+DEFAULT_VERSION_CACHE_TTL = 24 * 60 * 60
+
+
+def default_cache_dir():
+    config_dir = os.environ.get('DOCKER_CONFIG') or os.path.join(
+        os.path.expanduser('~'), '.docker'
+    )
+    return os.path.join(config_dir, 'docker-py')
+
+
+def default_version_cache_path():
+    return os.path.join(default_cache_dir(), 'api-versions.json')
+
+
+def makedirs(directory):
+    try:
+        os.makedirs(directory)
+    except OSError as e:
+        if e.errno != errno.EEXIST:
+            raise
+
+
+def replace_file(src, dst):
+    if hasattr(os, 'replace'):
+        os.replace(src, dst)
+    else:
+        if os.name == 'nt' and os.path.exists(dst):
+            os.remove(dst)
+        os.rename(src, dst)
+
+
+def save_json(path, data):
+    # Write to a temporary file first so that concurrent readers never see a
+    # partial file.
+    directory = os.path.dirname(path)
+    makedirs(directory)
+    fd, tmp_path = tempfile.mkstemp(dir=directory)
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(data, f)
+        replace_file(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+def load_json(path):
+    """
+    Returns the dict saved in `path`, or an empty dict if it's missing or
+    isn't a valid JSON object.
+    """
+    try:
+        with open(path) as f:
+            data = json.load(f)
+    except (IOError, OSError, ValueError):
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+class APIVersionCache(object):
+    """
+    Remembers the API version negotiated with each daemon in a JSON file,
+    so that clients using `version='auto'` don't need a `/version` request
+    every time they are created. Entries are keyed by the daemon's URL and
+    record the daemon's `Server` header, which identifies its version.
+    """
+
+    def __init__(self, path=None, ttl=DEFAULT_VERSION_CACHE_TTL):
+        self.path = path or default_version_cache_path()
+        self.ttl = ttl
+
+    def get(self, base_url):
+        """
+        Returns the entry for `base_url` as a dict with `ApiVersion`,
+        `Server` and `Time` keys, or None if there's no fresh entry.
+        """
+        entry = self._load().get(base_url)
+        if not isinstance(entry, dict) or 'ApiVersion' not in entry:
+            return None
+        if entry.get('Time', 0) + self.ttl <= time.time():
+            return None
+        return entry
+
+    def set(self, base_url, api_version, server=None):
+        entries = self._load()
+        entries[base_url] = {
+            'ApiVersion': api_version, 'Server': server, 'Time': time.time()
+        }
+        self._save(entries)
+
+    def remove(self, base_url):
+        entries = self._load()
+        if entries.pop(base_url, None) is not None:
+            self._save(entries)
+
+    def _load(self):
+        return load_json(self.path)
+
+    def _save(self, entries):
+        # Failing to save is harmless
+        try:
+            save_json(self.path, entries)
+        except (IOError, OSError) as e:
+            log.debug('Could not save the API version cache: {0}'.format(e))
@@ -1,5 +1,7 @@
 import json
+import os
 import struct
+import threading
 from functools import partial
 
 import requests
@@ -7,16 +9,30 @@ import requests.exceptions
 import six
 import websocket
 
+try:
+    import requests.packages.urllib3 as urllib3
+except ImportError:
+    import urllib3
 
 from . import api
 from . import constants
 from . import errors
 from .auth import auth
+from .cache import (
+    DEFAULT_IMAGE_INDEX_TTL, DEFAULT_INSPECT_CACHE_SIZE,
+    DEFAULT_INSPECT_CACHE_TTL, APIVersionCache, ImageIndex, InspectCache,
+    LRUCache
+)
+from .events import EventHub
 from .ssladapter import ssladapter
 from .tls import TLSConfig
 from .transport import UnixAdapter
 from .utils import utils, check_resource, update_headers, kwargs_from_env
-from .utils.socket import frames_iter
+from .utils import chunked, fileio
+from .utils.json_stream import json_stream
+from .utils.socket import (
+    FrameReader, buffer_frames, consume_frames, demux_frames, frames_iter
+)
 try:
     from .transport import NpipeAdapter
 except ImportError:
@@ -41,7 +57,7 @@ class Client(
     def __init__(self, base_url=None, version=None,
                  timeout=constants.DEFAULT_TIMEOUT_SECONDS, tls=False,
                  user_agent=constants.DEFAULT_USER_AGENT,
-                 num_pools=constants.DEFAULT_NUM_POOLS):
+                 num_pools=constants.DEFAULT_NUM_POOLS, version_cache=True):
         super(Client, self).__init__()
 
         if tls and not base_url:
@@ -54,6 +70,14 @@ class Client(
         self.headers['User-Agent'] = user_agent
 
         self._auth_configs = auth.load_config()
+        self._tty_cache = LRUCache(constants.TTY_CACHE_SIZE)
+        self._event_hub = None
+        self._event_hub_lock = threading.Lock()
+        self.inspect_cache = None
+        self.image_index = None
+        self._version_cache = None
+        self._version_cache_key = None
+        self._cached_server = None
 
         base_url = utils.parse_host(
             base_url, constants.IS_WINDOWS_PLATFORM, tls=bool(tls)
@@ -96,7 +120,12 @@ class Client(
             self._version = constants.DEFAULT_DOCKER_API_VERSION
         elif isinstance(version, six.string_types):
             if version.lower() == 'auto':
-                self._version = self._retrieve_server_version()
+                if version_cache:
+                    self._version_cache = APIVersionCache(
+                        None if version_cache is True else version_cache
+                    )
+                    self._version_cache_key = base_url
+                self._version = self._cached_server_version()
             else:
                 self._version = version
         else:
@@ -110,12 +139,14 @@ class Client(
     def from_env(cls, **kwargs):
         timeout = kwargs.pop('timeout', None)
         version = kwargs.pop('version', None)
+        version_cache = kwargs.pop('version_cache', True)
         return cls(timeout=timeout, version=version,
-                   **kwargs_from_env(**kwargs))
+                   version_cache=version_cache, **kwargs_from_env(**kwargs))
 
     def _retrieve_server_version(self):
         try:
-            return self.version(api_version=False)["ApiVersion"]
+            res = self._get(self._url("/version", versioned_api=False))
+            version = self._result(res, json=True)["ApiVersion"]
         except KeyError:
             raise errors.DockerException(
                 'Invalid response from docker daemon: key "ApiVersion"'
@@ -125,6 +156,53 @@ class Client(
             raise errors.DockerException(
                 'Error while fetching server API version: {0}'.format(e)
             )
+        if self._version_cache is not None:
+            self._version_cache.set(
+                self._version_cache_key, version, res.headers.get('Server')
+            )
+        return version
+
+    def _cached_server_version(self):
+        if self._version_cache is None:
+            return self._retrieve_server_version()
+        entry = self._version_cache.get(self._version_cache_key)
+        if entry is None:
+            return self._retrieve_server_version()
+        # The daemon may have been upgraded or replaced since; its Server
+        # header is checked against the cache on the first response.
+        self._cached_server = entry.get('Server') or ''
+        return entry['ApiVersion']
+
+    def _check_cached_version(self, response):
+        server, self._cached_server = self._cached_server, None
+        if response.headers.get('Server', '') != server:
+            self._refresh_server_version()
+
+    def _refresh_server_version(self):
+        try:
+            self._version = self._retrieve_server_version()
+        except errors.DockerException:
+            if self._version_cache is not None:
+                self._version_cache.remove(self._version_cache_key)
+
+    def _request(self, method, url, **kwargs):
+        """Sends a request with `method` (`self.get`, `self.post`...). If
+        the daemon rejects the cached API version, the version is refreshed
+        and the request sent again once with the new one."""
+        response = method(url, **kwargs)
+        if self._version_cache is None or \
+                not utils.is_version_error(response):
+            return response
+        version = self._version
+        self._refresh_server_version()
+        prefix = '/v{0}/'.format(version)
+        if self._version == version or prefix not in url or \
+                not _replayable(kwargs.get('data')):
+            return response
+        # Reading the error message released the connection already
+        return method(
+            url.replace(prefix, '/v{0}/'.format(self._version), 1), **kwargs
+        )
 
     def _set_request_timeout(self, kwargs):
         """Prepare the kwargs for an HTTP request by inserting the timeout
@@ -134,19 +212,81 @@ class Client(
 
     @update_headers
     def _post(self, url, **kwargs):
-        return self.post(url, **self._set_request_timeout(kwargs))
+        response = self._request(
+            self.post, url, **self._set_request_timeout(kwargs)
+        )
+        self._invalidate_caches('POST', url, kwargs.get('data'))
+        return response
 
     @update_headers
     def _get(self, url, **kwargs):
-        return self.get(url, **self._set_request_timeout(kwargs))
+        return self._request(
+            self.get, url, **self._set_request_timeout(kwargs)
+        )
 
     @update_headers
     def _put(self, url, **kwargs):
-        return self.put(url, **self._set_request_timeout(kwargs))
+        response = self._request(
+            self.put, url, **self._set_request_timeout(kwargs)
+        )
+        self._invalidate_caches('PUT', url)
+        return response
 
     @update_headers
     def _delete(self, url, **kwargs):
-        return self.delete(url, **self._set_request_timeout(kwargs))
+        response = self._request(
+            self.delete, url, **self._set_request_timeout(kwargs)
+        )
+        self._invalidate_caches('DELETE', url)
+        return response
+
+    @update_headers
+    def _post_file(self, url, f, **kwargs):
+        """Posts the rest of file `f` as the body of a request. Over plain
+        sockets, the file is sent with sendfile on a connection of the
+        client's pool; over TLS and named pipes, it goes through requests in
+        large blocks."""
+        headers = kwargs.get('headers') or {}
+        if self.base_url.startswith(('https://', 'http+docker://localnpipe')):
+            return self._post(
+                url, data=fileio.read_blocks(f), headers=headers, timeout=None
+            )
+
+        request = self.prepare_request(
+            requests.Request('POST', url, headers=headers)
+        )
+        request.headers.pop('Content-Length', None)
+        size = os.fstat(f.fileno()).st_size - f.tell()
+        adapter = self.get_adapter(request.url)
+        pool = adapter.get_connection(request.url)
+        conn = pool._get_conn()
+        try:
+            conn.putrequest(
+                'POST', request.path_url, skip_accept_encoding=True
+            )
+            for name, value in request.headers.items():
+                conn.putheader(name, value)
+            conn.putheader('Content-Length', str(size))
+            conn.endheaders()
+            # The daemon may only answer once it has processed the body
+            conn.sock.settimeout(None)
+            fileio.send_file(conn.sock, f)
+            response = conn.getresponse()
+        except Exception:
+            conn.close()
+            pool._put_conn(conn)
+            raise
+        self._invalidate_caches('POST', url)
+        response = urllib3.HTTPResponse.from_httplib(
+            response, pool=pool, connection=conn, preload_content=False
+        )
+        return adapter.build_response(request, response)
+
+    def _invalidate_caches(self, method, url, data=None):
+        if self.inspect_cache is not None:
+            self.inspect_cache.handle_request(method, url, data)
+        if self.image_index is not None:
+            self.image_index.handle_request(method, url, data)
 
     def _url(self, pathfmt, *args, **kwargs):
         for arg in args:
@@ -168,9 +308,15 @@ class Client(
 
     def _raise_for_status(self, response, explanation=None):
         """Raises stored :class:`APIError`, if one occurred."""
+        if self._cached_server is not None:
+            self._check_cached_version(response)
         try:
             response.raise_for_status()
         except requests.exceptions.HTTPError as e:
+            if self._version_cache is not None and \
+                    utils.is_version_error(response):
+                # The cached version no longer suits the daemon
+                self._refresh_server_version()
             if e.response.status_code == 404:
                 raise errors.NotFound(e, response, explanation=explanation)
             raise errors.APIError(e, response, explanation=explanation)
@@ -240,29 +386,66 @@ class Client(
 
         return sock
 
+    def _read_chunks(self, response):
+        """Generator of the chunks of a chunked-encoded HTTP response."""
+        reader = response.raw
+        fp = getattr(reader._fp, 'fp', None)
+        if hasattr(fp, 'read1'):
+            # Read large blocks off the connection's buffered reader and
+            # decode the chunks ourselves.
+            for data in chunked.read_chunks(fp):
+                yield data
+            reader._fp.close()
+            return
+
+        while not reader.closed:
+            # this read call will block until we get a chunk
+            data = reader.read(1)
+            if not data:
+                break
+            if reader._fp.chunk_left:
+                data += reader.read(reader._fp.chunk_left)
+            yield data
+
+    def _response_fileno(self, response):
+        # The kernel can only move the bytes of plain sockets
+        if not fileio.HAS_SPLICE or self.base_url.startswith(
+                ('https://', 'http+docker://localnpipe')):
+            return None
+        try:
+            return response.raw._fp.fp.raw.fileno()
+        except (AttributeError, ValueError, OSError):
+            return None
+
+    def _copy_response_to_file(self, response, fd):
+        """Copies the body of a streamed response to file descriptor `fd`,
+        splicing it from the socket where possible. Returns the number of
+        bytes copied."""
+        reader = response.raw
+        fp = getattr(reader._fp, 'fp', None)
+        if not hasattr(fp, 'read1') or 'Content-Encoding' in response.headers:
+            return fileio.copy_blocks(reader, fd)
+
+        sock_fd = self._response_fileno(response)
+        if reader._fp.chunked:
+            size = fileio.copy_chunked(fp, fd, sock_fd, self.timeout)
+        elif reader._fp.length is not None:
+            size = reader._fp.length
+            fileio.copy_exact(fp, fd, size, sock_fd, self.timeout)
+        else:
+            return fileio.copy_blocks(reader, fd)
+        # The body was read past the response object, which can't be reused
+        reader._fp.close()
+        return size
+
     def _stream_helper(self, response, decode=False):
         """Generator for data coming from a chunked-encoded HTTP response."""
         if response.raw._fp.chunked:
-            reader = response.raw
-            while not reader.closed:
-                # this read call will block until we get a chunk
-                data = reader.read(1)
-                if not data:
-                    break
-                if reader._fp.chunk_left:
-                    data += reader.read(reader._fp.chunk_left)
-                if decode:
-                    if six.PY3:
-                        data = data.decode('utf-8')
-                    # remove the trailing newline
-                    data = data.strip()
-                    # split the data at any newlines
-                    data_list = data.split("\r\n")
-                    # load and yield each line seperately
-                    for data in data_list:
-                        data = json.loads(data)
-                        yield data
-                else:
+            if decode:
+                for data in json_stream(self._read_chunks(response)):
+                    yield data
+            else:
+                for data in self._read_chunks(response):
                     yield data
         else:
             # Response isn't chunked, meaning we probably
@@ -270,22 +453,14 @@ class Client(
             yield self._result(response, json=decode)
 
     def _multiplexed_buffer_helper(self, response):
-        """A generator of multiplexed data blocks read from a buffered
-        response."""
+        """An iterator of multiplexed (stream id, data) frames read from a
+        buffered response."""
         buf = self._result(response, binary=True)
-        walker = 0
-        while True:
-            if len(buf[walker:]) < 8:
-                break
-            _, length = struct.unpack_from('>BxxxL', buf[walker:])
-            start = walker + constants.STREAM_HEADER_SIZE_BYTES
-            end = start + length
-            walker = end
-            yield buf[start:end]
+        return buffer_frames(buf)
 
     def _multiplexed_response_stream_helper(self, response):
-        """A generator of multiplexed data blocks coming from a response
-        stream."""
+        """A generator of multiplexed (stream id, data) frames coming from a
+        response stream."""
 
         # Disable timeout on the underlying socket to prevent
         # Read timed out(s) for long running processes
@@ -296,13 +471,13 @@ class Client(
             header = response.raw.read(constants.STREAM_HEADER_SIZE_BYTES)
             if not header:
                 break
-            _, length = struct.unpack('>BxxxL', header)
+            stream_id, length = struct.unpack('>BxxxL', header)
             if not length:
                 continue
             data = response.raw.read(length)
             if not data:
                 break
-            yield data
+            yield stream_id, data
 
     def _stream_raw_result_old(self, response):
         ''' Stream raw output for API versions below 1.6 '''
@@ -319,13 +494,13 @@ class Client(
         for out in response.iter_content(chunk_size=1, decode_unicode=True):
             yield out
 
-    def _read_from_socket(self, response, stream):
+    def _read_from_socket(self, response, stream, demux=False):
         socket = self._get_raw_response_socket(response)
 
         if stream:
-            return frames_iter(socket)
+            return frames_iter(socket, demux)
         else:
-            return six.binary_type().join(frames_iter(socket))
+            return consume_frames(FrameReader(socket), demux)
 
     def _disable_socket_timeout(self, socket):
         """ Depending on the combination of python version and whether we're
@@ -355,30 +530,117 @@ class Client(
 
             s.settimeout(None)
 
-    def _get_result(self, container, stream, res):
-        cont = self.inspect_container(container)
-        return self._get_result_tty(stream, res, cont['Config']['Tty'])
+    def _get_result(self, container, stream, res, demux=False):
+        return self._get_result_tty(
+            stream, res, self._container_tty(container), demux
+        )
 
-    def _get_result_tty(self, stream, res, is_tty):
+    def _container_tty(self, container):
+        # Whether a container has a TTY can't change during its lifetime, so
+        # the answer is cached. Names may later refer to another container
+        # and are only cached through the ID they resolve to.
+        tty = self._tty_cache.get(container)
+        if tty is None:
+            cont = self.inspect_container(container)
+            tty = cont['Config']['Tty']
+            if cont['Id'].startswith(container):
+                self._tty_cache.set(container, tty)
+        return tty
+
+    def event_hub(self):
+        """
+        Returns the `EventHub` sharing this client's `/events` stream between
+        subscribers, creating it on first use.
+        """
+        with self._event_hub_lock:
+            if self._event_hub is None or self._event_hub.closed:
+                self._event_hub = EventHub(self)
+                self._event_hub.add_listener(
+                    self._on_event, self._tty_cache.clear
+                )
+            return self._event_hub
+
+    def enable_inspect_cache(self, maxsize=DEFAULT_INSPECT_CACHE_SIZE,
+                             ttl=DEFAULT_INSPECT_CACHE_TTL):
+        """
+        Caches the results of `inspect_container`, `inspect_image`,
+        `inspect_network` and `inspect_volume`. Entries are invalidated by
+        the events from the client's `event_hub()` and by the client's own
+        requests, and expire after `ttl` seconds in case an event is missed.
+        Returns the `InspectCache`.
+        """
+        self.disable_inspect_cache()
+        cache = InspectCache(maxsize, ttl)
+        self.event_hub().add_listener(cache.handle_event, cache.clear)
+        self.inspect_cache = cache
+        return cache
+
+    def disable_inspect_cache(self):
+        cache, self.inspect_cache = self.inspect_cache, None
+        if cache is not None and self._event_hub is not None:
+            self._event_hub.remove_listener(cache.handle_event)
+
+    def enable_image_index(self, ttl=DEFAULT_IMAGE_INDEX_TTL):
+        """
+        Indexes the local images by tag, digest and ID for `ensure_image`.
+        The index is built with one `images(all=True)` call and kept up to
+        date by the events from the client's `event_hub()` and by the
+        client's own requests, and is rebuilt after `ttl` seconds in case an
+        event is missed. Returns the `ImageIndex`.
+        """
+        self.disable_image_index()
+        index = ImageIndex(ttl)
+        self.event_hub().add_listener(index.handle_event, index.invalidate)
+        self.image_index = index
+        return index
+
+    def disable_image_index(self):
+        index, self.image_index = self.image_index, None
+        if index is not None and self._event_hub is not None:
+            self._event_hub.remove_listener(index.handle_event)
+
+    def _on_event(self, event):
+        # Keep the client's caches in line with the daemon's state
+        action = event.get('Action', event.get('status'))
+        if event.get('Type', 'container') == 'container':
+            if action == 'destroy':
+                self._forget_container(
+                    event.get('Actor', {}).get('ID', event.get('id'))
+                )
+
+    def _forget_container(self, container_id):
+        for key in self._tty_cache.keys():
+            if container_id.startswith(key) or key.startswith(container_id):
+                self._tty_cache.pop(key)
+
+    def _get_result_tty(self, stream, res, is_tty, demux=False):
         # Stream multi-plexing was only introduced in API v1.6. Anything
         # before that needs old-style streaming.
-        if utils.compare_version('1.6', self._version) < 0:
+        if not self._supports('multiplexed_streams'):
+            if demux:
+                raise errors.InvalidVersion(
+                    'demux is not supported in API < 1.6'
+                )
             return self._stream_raw_result_old(res)
 
         # We should also use raw streaming (without keep-alives)
-        # if we're dealing with a tty-enabled container.
+        # if we're dealing with a tty-enabled container. TTY output has no
+        # separate stderr, so everything is reported as stdout.
         if is_tty:
-            return self._stream_raw_result(res) if stream else \
-                self._result(res, binary=True)
+            if stream:
+                output = self._stream_raw_result(res)
+                return ((x, None) for x in output) if demux else output
+            output = self._result(res, binary=True)
+            return (output, six.binary_type()) if demux else output
 
         self._raise_for_status(res)
-        sep = six.binary_type()
         if stream:
-            return self._multiplexed_response_stream_helper(res)
+            frames = self._multiplexed_response_stream_helper(res)
+            if demux:
+                return demux_frames(frames)
+            return (data for _, data in frames)
         else:
-            return sep.join(
-                [x for x in self._multiplexed_buffer_helper(res)]
-            )
+            return consume_frames(self._multiplexed_buffer_helper(res), demux)
 
     def _unmount(self, *args):
         for proto in args:
@@ -397,6 +659,24 @@ class Client(
     def api_version(self):
         return self._version
 
+    @property
+    def _version(self):
+        return self._api_version
+
+    @_version.setter
+    def _version(self, version):
+        self._api_version = version
+        # The capability table is built on first use, as an invalid version
+        # should only fail once it is actually compared.
+        self._api_features = None
+
+    def _supports(self, feature):
+        """Returns whether the API version in use has `feature`, one of the
+        keys of constants.API_FEATURES."""
+        if self._api_features is None:
+            self._api_features = utils.api_features(self._version)
+        return feature in self._api_features
+
 
 class AutoVersionClient(Client):
     def __init__(self, *args, **kwargs):
@@ -406,3 +686,10 @@ class AutoVersionClient(Client):
             )
         kwargs['version'] = 'auto'
         super(AutoVersionClient, self).__init__(*args, **kwargs)
+
+
+def _replayable(data):
+    # Streams and generators can't be sent a second time
+    return data is None or isinstance(
+        data, (six.binary_type, six.text_type, dict)
+    )
@@ -4,6 +4,21 @@ from .version import version
 DEFAULT_DOCKER_API_VERSION = '1.24'
 DEFAULT_TIMEOUT_SECONDS = 60
 STREAM_HEADER_SIZE_BYTES = 8
+# Minimum API versions of the features checked with Client._supports
+API_FEATURES = {
+    'registry_auth': '1.5',
+    'multiplexed_streams': '1.6',
+    'build_stream': '1.8',
+    'build_registry_config': '1.9',
+    'logs': '1.11',
+    'logs_tail': '1.13',
+    'host_config': '1.15',
+    'build_dockerfile': '1.17',
+    'build_pull_bool': '1.19',
+    'logs_since': '1.19',
+    'build_buildargs': '1.21',
+    'build_cache_from': '1.25',
+}
 CONTAINER_LIMITS_KEYS = [
     'memory', 'memswap', 'cpushares', 'cpusetcpus'
 ]
@@ -16,3 +31,4 @@ IS_WINDOWS_PLATFORM = (sys.platform == 'win32')
 
 DEFAULT_USER_AGENT = "docker-py/{0}".format(version)
 DEFAULT_NUM_POOLS = 25
+TTY_CACHE_SIZE = 8192
@@ -51,6 +51,14 @@ class InvalidVersion(DockerException):
     pass
 
 
+class BuildError(DockerException):
+    pass
+
+
+class StreamParseError(DockerException):
+    pass
+
+
 class InvalidRepository(DockerException):
     pass
 
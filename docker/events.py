@@ -0,0 +1,305 @@
+import logging
+import socket
+import threading
+import time
+
+from six.moves import queue
+
+from . import errors
+
+log = logging.getLogger(__name__)
+
+BLOCK = 'block'
+DROP_OLDEST = 'drop_oldest'
+DROP_NEWEST = 'drop_newest'
+OVERFLOW_POLICIES = (BLOCK, DROP_OLDEST, DROP_NEWEST)
+
+DEFAULT_QUEUE_SIZE = 1000
+DEFAULT_RECONNECT_DELAY = 1
+
+# Queued after the last event of a closed subscription
+_CLOSED = object()
+
+
+class Subscription(object):
+    """
+    A consumer of the events dispatched by an `EventHub`. Matching events are
+    queued in a bounded queue; iterating over the subscription blocks until
+    events are available and stops once it is closed.
+
+    `overflow` decides what happens when the queue is full: `'block'` makes
+    the hub wait for the consumer (delaying every other subscriber),
+    `'drop_oldest'` discards the oldest queued event and `'drop_newest'`
+    discards the incoming one. Discarded events are counted in `dropped`.
+    """
+
+    def __init__(self, hub, predicate=None, maxsize=DEFAULT_QUEUE_SIZE,
+                 overflow=BLOCK):
+        if overflow not in OVERFLOW_POLICIES:
+            raise errors.DockerException(
+                'Invalid overflow policy {0!r}, expected one of {1}'.format(
+                    overflow, ', '.join(OVERFLOW_POLICIES)
+                )
+            )
+        self.hub = hub
+        self.predicate = predicate
+        self.overflow = overflow
+        self.dropped = 0
+        self.closed = False
+        self._queue = queue.Queue(maxsize)
+
+    def __iter__(self):
+        while True:
+            event = self.get()
+            if event is None:
+                return
+            yield event
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def get(self, timeout=None):
+        """
+        Returns the next event, or None once the subscription is closed and
+        all its events have been consumed. Raises `six.moves.queue.Empty` if
+        no event arrives within `timeout` seconds.
+        """
+        deadline = None if timeout is None else time.time() + timeout
+        while True:
+            if self.closed:
+                try:
+                    event = self._queue.get_nowait()
+                except queue.Empty:
+                    return None
+            else:
+                # Wake up regularly, as the end-of-events marker can't be
+                # queued when the queue is full
+                wait = 0.5
+                if deadline is not None:
+                    wait = max(0, min(wait, deadline - time.time()))
+                try:
+                    event = self._queue.get(timeout=wait)
+                except queue.Empty:
+                    if deadline is not None and time.time() >= deadline:
+                        raise
+                    continue
+            if event is _CLOSED:
+                return None
+            return event
+
+    def close(self):
+        self.hub.unsubscribe(self)
+
+    def _put(self, event):
+        if self.closed:
+            return
+        if self.predicate is not None and not self.predicate(event):
+            return
+
+        if self.overflow == BLOCK:
+            while not self.closed:
+                try:
+                    self._queue.put(event, timeout=0.5)
+                    return
+                except queue.Full:
+                    continue
+        elif self.overflow == DROP_NEWEST:
+            try:
+                self._queue.put_nowait(event)
+            except queue.Full:
+                self.dropped += 1
+        else:
+            while True:
+                try:
+                    self._queue.put_nowait(event)
+                    return
+                except queue.Full:
+                    try:
+                        self._queue.get_nowait()
+                        self.dropped += 1
+                    except queue.Empty:
+                        pass
+
+    def _close(self):
+        self.closed = True
+        # Wakes up a consumer waiting for events. Queued events are kept, so
+        # a full queue is left as is.
+        try:
+            self._queue.put_nowait(_CLOSED)
+        except queue.Full:
+            pass
+
+
+class EventHub(object):
+    """
+    Shares a single `/events` stream between any number of subscribers.
+
+    The stream is read by a background thread, started with the first
+    subscription. Each event is decoded once, passed to the listeners, then
+    queued for every subscription whose predicate accepts it. If the stream
+    breaks, the hub reconnects and resumes from the time of the last event
+    it received. The first connection asks for the events since the hub was
+    created, so that listeners added before it was made miss none. As
+    events may still have been missed, the listeners' reset functions are
+    called on reconnection.
+    """
+
+    def __init__(self, client, reconnect_delay=DEFAULT_RECONNECT_DELAY):
+        self.client = client
+        self.reconnect_delay = reconnect_delay
+        self.created = int(time.time())
+        self._lock = threading.Lock()
+        self._subscriptions = []
+        self._listeners = []
+        self._thread = None
+        self._response = None
+        self._closed = threading.Event()
+
+    @property
+    def closed(self):
+        return self._closed.is_set()
+
+    def subscribe(self, predicate=None, maxsize=DEFAULT_QUEUE_SIZE,
+                  overflow=BLOCK):
+        """
+        Returns a new `Subscription` to the events for which `predicate`
+        (a function taking the decoded event) returns True, or to all events
+        if no predicate is given.
+        """
+        subscription = Subscription(self, predicate, maxsize, overflow)
+        with self._lock:
+            self._check_closed()
+            self._subscriptions.append(subscription)
+            self._start()
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            if subscription in self._subscriptions:
+                self._subscriptions.remove(subscription)
+        subscription._close()
+
+    def add_listener(self, listener, reset=None):
+        """
+        Calls `listener` with every event, from the hub's thread. Listeners
+        are meant for quick bookkeeping such as cache invalidation; anything
+        slow should use a subscription instead. `reset`, if given, is called
+        without arguments whenever the hub reconnects, so that state built
+        from the events can be dropped.
+        """
+        with self._lock:
+            self._check_closed()
+            self._listeners.append((listener, reset))
+            self._start()
+
+    def remove_listener(self, listener):
+        with self._lock:
+            self._listeners = [
+                (registered, reset) for registered, reset in self._listeners
+                if registered != listener
+            ]
+
+    def close(self):
+        """
+        Stops reading events and closes all subscriptions. Events already
+        queued can still be consumed.
+        """
+        with self._lock:
+            self._closed.set()
+            subscriptions, self._subscriptions = self._subscriptions, []
+            self._listeners = []
+            response = self._response
+            thread = self._thread
+        if response is not None:
+            self._close_response(response)
+        for subscription in subscriptions:
+            subscription._close()
+        if thread is not None and thread is not threading.current_thread():
+            thread.join()
+
+    def _check_closed(self):
+        if self.closed:
+            raise errors.DockerException('The event hub is closed')
+
+    def _start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._run, name='docker-event-hub'
+            )
+            self._thread.daemon = True
+            self._thread.start()
+
+    def _close_response(self, response):
+        # Shutting the socket down interrupts a read blocked in the hub's
+        # thread, which closing the response alone doesn't do.
+        try:
+            sock = self.client._get_raw_response_socket(response)
+            sock = getattr(sock, '_sock', sock)
+            sock.shutdown(socket.SHUT_RDWR)
+        except Exception:
+            pass
+        response.close()
+
+    def _run(self):
+        since = self.created
+        last_time_nano = 0
+        connected = False
+        while not self.closed:
+            try:
+                response = self.client.get(
+                    self.client._url('/events'), params={'since': since},
+                    stream=True
+                )
+                with self._lock:
+                    if self.closed:
+                        response.close()
+                        return
+                    self._response = response
+                if connected:
+                    self._reset()
+                connected = True
+
+                for event in self.client._stream_helper(response, True):
+                    # After reconnecting, events from the second of the last
+                    # event are sent again.
+                    time_nano = event.get('timeNano')
+                    if time_nano is not None:
+                        if time_nano <= last_time_nano:
+                            continue
+                        last_time_nano = time_nano
+                    since = event.get('time', since)
+                    self._dispatch(event)
+            except Exception as e:
+                if not self.closed:
+                    log.debug('Error while reading events: {0}'.format(e))
+            finally:
+                with self._lock:
+                    self._response = None
+            self._closed.wait(self.reconnect_delay)
+
+    def _reset(self):
+        with self._lock:
+            resets = [reset for _, reset in self._listeners if reset]
+        for reset in resets:
+            try:
+                reset()
+            except Exception as e:
+                log.debug('Error in event listener reset: {0}'.format(e))
+
+    def _dispatch(self, event):
+        with self._lock:
+            listeners = [listener for listener, _ in self._listeners]
+            subscriptions = list(self._subscriptions)
+        for listener in listeners:
+            try:
+                listener(event)
+            except Exception as e:
+                log.debug('Error in event listener: {0}'.format(e))
+        for subscription in subscriptions:
+            try:
+                subscription._put(event)
+            except Exception as e:
+                log.debug('Error in event subscription: {0}'.format(e))
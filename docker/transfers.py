@@ -0,0 +1,264 @@
+"""
+Concurrent pulls and pushes of several images, with their progress merged
+layer by layer.
+"""
+import collections
+import logging
+import re
+import time
+
+from six.moves import queue
+
+from . import errors
+from .utils.concurrency import ThreadPool
+
+log = logging.getLogger(__name__)
+
+DEFAULT_TRANSFER_WORKERS = 4
+# Throughput is estimated over the progress of the last seconds
+THROUGHPUT_WINDOW = 5
+
+LAYER_ID_RE = re.compile(r'^[0-9a-f]{12,64}$')
+DIGEST_RE = re.compile(r'(?:^Digest: |: digest: )(sha256:[0-9a-f]{64})')
+
+# Statuses of layers whose bytes are being moved, and the statuses meaning
+# they don't need to be anymore
+TRANSFER_STATUSES = ('Downloading', 'Pushing')
+DONE_STATUSES = (
+    'Download complete', 'Extracting', 'Pull complete', 'Already exists',
+    'Pushed', 'Layer already exists'
+)
+EXISTING_STATUSES = ('Already exists', 'Layer already exists')
+
+STARTED = 'started'
+PROGRESS = 'progress'
+SUCCEEDED = 'succeeded'
+FAILED = 'failed'
+
+TransferEvent = collections.namedtuple(
+    'TransferEvent', 'image status message'
+)
+
+
+def unique_images(images):
+    # In order, without transferring an image twice
+    seen = set()
+    unique = []
+    for image in images:
+        if image not in seen:
+            seen.add(image)
+            unique.append(image)
+    return unique
+
+
+class Layer(object):
+    __slots__ = ('id', 'status', 'current', 'total', 'images')
+
+    def __init__(self, layer_id):
+        self.id = layer_id
+        self.status = None
+        self.current = 0
+        self.total = None
+        self.images = set()
+
+    @property
+    def done(self):
+        return self.status in DONE_STATUSES or (
+            self.status is not None and self.status.startswith('Mounted from')
+        )
+
+    @property
+    def existed(self):
+        return self.status in EXISTING_STATUSES or (
+            self.status is not None and self.status.startswith('Mounted from')
+        )
+
+
+class TransferProgress(object):
+    """
+    The merged progress of the pulls or pushes of several images, from their
+    decoded progress messages. Layers shared by several images are only
+    counted once. Throughput is estimated from the bytes moved during the
+    last `window` seconds, as given by `clock`.
+    """
+
+    def __init__(self, clock=time.time, window=THROUGHPUT_WINDOW):
+        self.clock = clock
+        self.window = window
+        self.images = {}
+        self.layers = {}
+        self._transferred = 0
+        self._samples = collections.deque()
+
+    def start(self, image):
+        self.images[image] = STARTED
+
+    def finish(self, image, status):
+        self.images[image] = status
+
+    def update(self, image, message):
+        layer_id = message.get('id')
+        status = message.get('status')
+        if not status or not layer_id or not LAYER_ID_RE.match(layer_id):
+            return
+        layer = self.layers.get(layer_id)
+        if layer is None:
+            layer = self.layers[layer_id] = Layer(layer_id)
+        layer.images.add(image)
+        # Once a layer is done, the progress of the pulls which waited for
+        # it doesn't matter
+        if layer.done and status not in DONE_STATUSES:
+            return
+
+        before = self._layer_bytes(layer)
+        layer.status = status
+        detail = message.get('progressDetail') or {}
+        if status in TRANSFER_STATUSES:
+            layer.current = detail.get('current') or layer.current
+            layer.total = detail.get('total') or layer.total
+        elif layer.done and layer.total:
+            layer.current = layer.total
+        self._transferred += self._layer_bytes(layer) - before
+        self._sample()
+
+    def _layer_bytes(self, layer):
+        if layer.existed:
+            return 0
+        if layer.total:
+            return min(layer.current, layer.total)
+        return layer.current
+
+    def _sample(self):
+        now = self.clock()
+        self._samples.append((now, self._transferred))
+        while len(self._samples) > 1 and \
+                self._samples[0][0] < now - self.window:
+            self._samples.popleft()
+
+    @property
+    def transferred(self):
+        """The number of bytes downloaded or uploaded so far."""
+        return self._transferred
+
+    @property
+    def total(self):
+        """The size of the layers being moved whose size is known."""
+        return sum(
+            layer.total for layer in self.layers.values()
+            if layer.total and not layer.existed
+        )
+
+    @property
+    def bytes_per_second(self):
+        if len(self._samples) < 2:
+            return 0.0
+        (start, start_bytes), (end, end_bytes) = (
+            self._samples[0], self._samples[-1]
+        )
+        if end <= start:
+            return 0.0
+        return (end_bytes - start_bytes) / float(end - start)
+
+    def snapshot(self):
+        """
+        Returns a dict summing up the progress of all the images.
+        """
+        statuses = list(self.images.values())
+        return {
+            'images': len(statuses),
+            'images_done': statuses.count(SUCCEEDED),
+            'images_failed': statuses.count(FAILED),
+            'layers': len(self.layers),
+            'layers_done': sum(
+                1 for layer in self.layers.values() if layer.done
+            ),
+            'layers_existing': sum(
+                1 for layer in self.layers.values() if layer.existed
+            ),
+            'bytes': self.transferred,
+            'total_bytes': self.total,
+            'bytes_per_second': self.bytes_per_second,
+        }
+
+
+class ImageTransfer(object):
+    """
+    Iterator of the `TransferEvent` of the transfers of `images`, up to
+    `workers` at a time. `transfer` is called in worker threads with an
+    image and returns its decoded progress messages.
+
+    Events are `started`, `progress` (with a progress message), `succeeded`
+    (with the digest of the image, if the daemon gave it) and `failed`
+    (with the exception). `progress` merges the progress of all the images,
+    and once all the events have been consumed, `results` maps the images
+    transferred to their digests and `errors` has the others.
+    """
+
+    def __init__(self, transfer, images, workers=DEFAULT_TRANSFER_WORKERS,
+                 clock=time.time):
+        self.transfer = transfer
+        self.images = unique_images(images)
+        self.workers = workers
+        self.progress = TransferProgress(clock=clock)
+        self.results = {}
+        self.errors = {}
+        self._events = self._run()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return next(self._events)
+
+    next = __next__
+
+    def wait(self):
+        """
+        Consumes all the events, and returns `results`.
+        """
+        for _ in self:
+            pass
+        return self.results
+
+    def _run(self):
+        if not self.images:
+            return
+        events = queue.Queue()
+        running = len(self.images)
+        with ThreadPool(min(self.workers, running)) as pool:
+            for image in self.images:
+                pool.submit(self._transfer, image, events)
+            while running:
+                event = events.get()
+                if event.status == STARTED:
+                    self.progress.start(event.image)
+                elif event.status == PROGRESS:
+                    self.progress.update(event.image, event.message)
+                else:
+                    running -= 1
+                    self.progress.finish(event.image, event.status)
+                    if event.status == SUCCEEDED:
+                        self.results[event.image] = event.message
+                    else:
+                        self.errors[event.image] = event.message
+                yield event
+
+    def _transfer(self, image, events):
+        # Run by the worker threads
+        events.put(TransferEvent(image, STARTED, None))
+        digest = None
+        try:
+            for message in self.transfer(image):
+                if not isinstance(message, dict):
+                    continue
+                events.put(TransferEvent(image, PROGRESS, message))
+                if 'error' in message:
+                    raise errors.DockerException(message['error'])
+                match = DIGEST_RE.search(message.get('status') or '')
+                if match:
+                    digest = match.group(1)
+        except Exception as e:
+            log.debug('Transfer of {0} failed: {1}'.format(image, e))
+            events.put(TransferEvent(image, FAILED, e))
+        else:
+            events.put(TransferEvent(image, SUCCEEDED, digest))
@@ -6,8 +6,15 @@ from .utils import (
     create_host_config, create_container_config, parse_bytes, ping_registry,
     parse_env_file, version_lt, version_gte, decode_json_header, split_command,
     create_ipam_config, create_ipam_pool, parse_devices, normalize_links,
+    is_version_error, parse_version, api_features, memory_tar,
 )
+from .build import memory_tar_stream, tar_stream
+from .context_cache import ContextCache
+from .dockerfile import context_sources, read_context_sources
+from .progress import BuildProgress
 
 from ..types import LogConfig, Ulimit
 from ..types import SwarmExternalCA, SwarmSpec
-from .decorators import check_resource, minimum_version, update_headers
+from .decorators import (
+    cached_inspect, check_resource, minimum_version, update_headers
+)
@@ -0,0 +1,543 @@
+import functools
+import itertools
+import os
+import stat
+import sys
+import tarfile
+
+import six
+
+from .compression import gzip_stream
+from .concurrency import ThreadPool, batches, ordered_map
+from .dockerignore import PatternMatcher
+
+try:
+    from os import scandir
+except ImportError:
+    try:
+        from scandir import scandir
+    except ImportError:
+        scandir = None
+
+try:
+    import grp
+    import pwd
+except ImportError:
+    grp = pwd = None
+
+CONTEXT_BLOCK_SIZE = 65536
+# Files up to this size are read ahead by the worker threads of tar_stream
+PREFETCH_FILE_SIZE = 1024 * 1024
+PREFETCH_BATCH_SIZE = 32
+
+
+class ListdirEntry(object):
+    """
+    Stands for the entries of os.scandir where it isn't available.
+    """
+
+    def __init__(self, directory, name):
+        self.name = name
+        self.path = os.path.join(directory, name)
+        self._lstat = None
+
+    def is_dir(self, follow_symlinks=True):
+        if follow_symlinks:
+            return os.path.isdir(self.path)
+        return stat.S_ISDIR(self.stat(follow_symlinks=False).st_mode)
+
+    def stat(self, follow_symlinks=True):
+        if follow_symlinks:
+            return os.stat(self.path)
+        if self._lstat is None:
+            self._lstat = os.lstat(self.path)
+        return self._lstat
+
+
+def scan_directory(directory):
+    if scandir is not None:
+        return scandir(directory)
+    return [ListdirEntry(directory, name) for name in os.listdir(directory)]
+
+
+def scan_context_directory(root, parent, matcher):
+    """
+    Lists the directory `parent` of the build context in `root`. Returns
+    the (path, lstat result) of the entries `matcher` includes, directories
+    first, and the paths of the subdirectories to scan next.
+    """
+    # The matcher works on paths separated by slashes
+    prefix = parent.replace(os.sep, '/') + '/' if parent else ''
+    dirs = []
+    files = []
+    subdirs = []
+    try:
+        entries = scan_directory(os.path.join(root, parent))
+    except OSError:
+        # Like os.walk, skip the directories which can't be listed
+        return [], []
+    for entry in entries:
+        key = prefix + entry.name
+        path = os.path.join(parent, entry.name)
+        is_dir = entry.is_dir(follow_symlinks=False)
+        if is_dir and not matcher.can_prune(key):
+            subdirs.append(path)
+        if matcher.includes(key):
+            st = entry.stat(follow_symlinks=False)
+            (dirs if is_dir else files).append((path, st))
+    # Scan in a stable order, as archives are built along the scan
+    dirs.sort()
+    files.sort()
+    subdirs.sort()
+    return dirs + files, subdirs
+
+
+def scan_context(root, matcher, pool=None):
+    """
+    Generator of the (path, lstat result) of the paths of the build context
+    in `root` which `matcher` includes, with paths relative to `root`.
+
+    Directories are listed with scandir, whose entries provide the stats
+    without another lookup on most platforms. With a `ThreadPool`, the
+    directories are scanned by its threads, ahead of the consumer.
+    """
+    if pool is None:
+        stack = ['']
+        while stack:
+            entries, subdirs = scan_context_directory(
+                root, stack.pop(), matcher
+            )
+            for entry in entries:
+                yield entry
+            stack.extend(reversed(subdirs))
+        return
+
+    stack = [pool.submit(scan_context_directory, root, '', matcher)]
+    while stack:
+        entries, subdirs = stack.pop().result()
+        # Scan all the subdirectories at once: each of them is consumed in
+        # turn, while the others are being scanned.
+        stack.extend(reversed([
+            pool.submit(scan_context_directory, root, d, matcher)
+            for d in subdirs
+        ]))
+        for entry in entries:
+            yield entry
+
+
+class IntersectionMatcher(object):
+    """
+    Includes the paths which all of `matchers` include.
+    """
+
+    def __init__(self, matchers):
+        self.matchers = matchers
+
+    def includes(self, path):
+        return all(m.includes(path) for m in self.matchers)
+
+    def can_prune(self, path):
+        return any(m.can_prune(path) for m in self.matchers)
+
+
+def context_matcher(patterns, dockerfile=None, sources=None):
+    """
+    Returns a `PatternMatcher` for the patterns of a .dockerignore file,
+    which never excludes the Dockerfile or the .dockerignore file itself.
+
+    If `sources` isn't None, only the paths matching these patterns (the
+    sources of the COPY and ADD instructions of the Dockerfile) are
+    included, besides the Dockerfile and the .dockerignore file.
+    """
+    if dockerfile is None:
+        dockerfile = 'Dockerfile'
+
+    exceptions = [p for p in patterns if p.startswith('!')]
+
+    include_patterns = [p[1:] for p in exceptions]
+    include_patterns += [dockerfile, '.dockerignore']
+
+    exclude_patterns = list(set(patterns) - set(exceptions))
+    matcher = PatternMatcher(exclude_patterns, include_patterns)
+    if sources is None:
+        return matcher
+    return IntersectionMatcher([matcher, PatternMatcher(
+        ['**'], list(sources) + [dockerfile, '.dockerignore']
+    )])
+
+
+def iter_context(root, patterns, dockerfile=None, pool=None, sources=None):
+    """
+    Generator of the (path, lstat result) of the paths of the build context
+    in `root` which the .dockerignore `patterns` don't exclude, limited to
+    the patterns of `sources` if it isn't None.
+    """
+    if dockerfile is None:
+        dockerfile = 'Dockerfile'
+
+    found_dockerfile = False
+    matcher = context_matcher(patterns, dockerfile, sources)
+    for path, st in scan_context(root, matcher, pool):
+        if path == dockerfile:
+            found_dockerfile = True
+        yield path, st
+
+    # The Dockerfile is sent even if it doesn't exist under that name in the
+    # scan, e.g. when it's given as "./Dockerfile".
+    if not found_dockerfile:
+        try:
+            yield dockerfile, os.lstat(os.path.join(root, dockerfile))
+        except OSError:
+            pass
+
+
+def iter_paths(root, patterns, dockerfile=None):
+    """
+    Like `exclude_paths`, but yields the paths as the root directory is
+    scanned, so that they can be archived before the scan is over.
+    """
+    for path, _ in iter_context(root, patterns, dockerfile=dockerfile):
+        yield path
+
+
+class TarInfoFactory(object):
+    """
+    Builds the TarInfo of the members of a TarFile from stat results, like
+    `TarFile.gettarinfo` but without another lookup of the file, and with
+    the user and group names of their owners cached.
+    """
+
+    def __init__(self, tar_file):
+        self.tarfile = tar_file
+        self._unames = {}
+        self._gnames = {}
+
+    def uname(self, uid):
+        if uid not in self._unames:
+            try:
+                self._unames[uid] = pwd.getpwuid(uid)[0] if pwd else ''
+            except KeyError:
+                self._unames[uid] = ''
+        return self._unames[uid]
+
+    def gname(self, gid):
+        if gid not in self._gnames:
+            try:
+                self._gnames[gid] = grp.getgrgid(gid)[0] if grp else ''
+            except KeyError:
+                self._gnames[gid] = ''
+        return self._gnames[gid]
+
+    def create(self, name, arcname, st):
+        """
+        Returns the TarInfo of the file `name` for its lstat result `st`,
+        or None if it can't be archived (e.g. a socket).
+        """
+        t = self.tarfile
+        arcname = arcname.replace(os.sep, '/').lstrip('/')
+        info = t.tarinfo()
+        info.tarfile = t
+        mode = st.st_mode
+        linkname = ''
+        if stat.S_ISREG(mode):
+            inode = (st.st_ino, st.st_dev)
+            if st.st_nlink > 1 and inode in t.inodes and \
+                    arcname != t.inodes[inode]:
+                # A hard link to a file which is already in the archive
+                kind = tarfile.LNKTYPE
+                linkname = t.inodes[inode]
+            else:
+                kind = tarfile.REGTYPE
+                if inode[0]:
+                    t.inodes[inode] = arcname
+        elif stat.S_ISDIR(mode):
+            kind = tarfile.DIRTYPE
+        elif stat.S_ISFIFO(mode):
+            kind = tarfile.FIFOTYPE
+        elif stat.S_ISLNK(mode):
+            kind = tarfile.SYMTYPE
+            linkname = os.readlink(name)
+        elif stat.S_ISCHR(mode):
+            kind = tarfile.CHRTYPE
+        elif stat.S_ISBLK(mode):
+            kind = tarfile.BLKTYPE
+        else:
+            return None
+
+        info.name = arcname
+        info.mode = mode
+        info.uid = st.st_uid
+        info.gid = st.st_gid
+        info.size = st.st_size if kind == tarfile.REGTYPE else 0
+        # Whole seconds, as fractional times would need a pax header for
+        # every member
+        info.mtime = int(st.st_mtime)
+        info.type = kind
+        info.linkname = linkname
+        info.uname = self.uname(st.st_uid)
+        info.gname = self.gname(st.st_gid)
+        if kind in (tarfile.CHRTYPE, tarfile.BLKTYPE):
+            info.devmajor = os.major(st.st_rdev)
+            info.devminor = os.minor(st.st_rdev)
+
+        if sys.platform == 'win32':
+            # Windows doesn't keep track of the execute bit, so we make files
+            # and directories executable by default.
+            info.mode = info.mode & 0o755 | 0o111
+        return info
+
+
+class BlockBuffer(object):
+    """
+    A write-only file object which keeps what is written to it until it is
+    taken with `pop`.
+    """
+
+    def __init__(self):
+        self._blocks = []
+
+    def write(self, data):
+        if data:
+            self._blocks.append(data)
+
+    def pop(self):
+        data = b''.join(self._blocks)
+        self._blocks = []
+        return data
+
+
+def read_small_files(root, entries, session=None):
+    # Run by the worker threads of tar_stream
+    results = []
+    for path, st in entries:
+        content = None
+        if stat.S_ISREG(st.st_mode) and st.st_size <= PREFETCH_FILE_SIZE \
+                and (session is None or session.find(path, st) is None):
+            # Like _copy_blocks, only the size found by the scan is read,
+            # even if the file grew since
+            with open(os.path.join(root, path), 'rb') as f:
+                content = f.read(st.st_size)
+        results.append(((path, st), content))
+    return results
+
+
+def tar_stream(path, exclude=None, dockerfile=None, gzip=False,
+               block_size=CONTEXT_BLOCK_SIZE, workers=None, cache=None,
+               sources=None, gzip_level=None, gzip_workers=None):
+    """
+    Generator of the blocks of a tar archive of the build context in `path`,
+    compressed with gzip if `gzip` is True.
+
+    Unlike `tar`, nothing is written to disk: blocks are produced while the
+    directory is scanned and the files are read, so that they can be sent
+    with chunked transfer encoding as soon as they are ready.
+
+    With `workers`, directories are scanned and small files are read by
+    that many threads, which helps with large trees on network file
+    systems.
+
+    With a `docker.utils.ContextCache`, the members of the files which
+    haven't changed since the context was last archived are copied from the
+    cache, and only the other files are read.
+
+    If `sources` isn't None, the archive only holds the paths matching these
+    patterns, as returned by `docker.utils.dockerfile.context_sources`,
+    besides the Dockerfile and the .dockerignore file.
+
+    The archive is compressed at `gzip_level` (9 by default), by
+    `gzip_workers` threads if more than one.
+    """
+    session = cache.open(path) if cache is not None else None
+    pool = gzip_pool = None
+    complete = False
+    try:
+        if workers and workers > 1:
+            pool = ThreadPool(workers)
+        if gzip and gzip_workers and gzip_workers > 1:
+            gzip_pool = ThreadPool(gzip_workers)
+        blocks = _tar_stream(
+            path, exclude, dockerfile, block_size, pool, session, sources
+        )
+        if gzip:
+            blocks = gzip_stream(blocks, gzip_level, gzip_pool)
+        for data in blocks:
+            yield data
+        complete = True
+    finally:
+        for p in (pool, gzip_pool):
+            if p is not None:
+                p.close()
+        if session is not None:
+            session.close(complete)
+
+
+def _tar_stream(path, exclude, dockerfile, block_size, pool, session,
+                sources):
+    root = os.path.abspath(path)
+    buf = BlockBuffer()
+    t = tarfile.open(mode='w|', fileobj=buf, bufsize=block_size)
+    tarinfos = TarInfoFactory(t)
+
+    entries = iter_context(root, exclude or [], dockerfile, pool, sources)
+    if pool is None:
+        entries = ((entry, None) for entry in entries)
+    else:
+        # Files are read in batches, as a task per file would cost more
+        # than reading most of them.
+        entries = itertools.chain.from_iterable(ordered_map(
+            pool, functools.partial(read_small_files, root, session=session),
+            batches(entries, PREFETCH_BATCH_SIZE), window=2 * pool.workers
+        ))
+
+    for (path, st), content in entries:
+        full_path = os.path.join(root, path)
+        info = tarinfos.create(full_path, path, st)
+        if info is None:
+            continue
+
+        if info.type != tarfile.REGTYPE:
+            t.addfile(info)
+        elif session is not None:
+            segment = session.find(path, st)
+            if segment is not None:
+                for data in session.read(path, segment, block_size):
+                    t.fileobj.write(data)
+                    t.offset += len(data)
+                    data = buf.pop()
+                    if data:
+                        yield data
+            else:
+                session.start(path, st)
+                recorder = TeeWriter(t.fileobj, session)
+                for data in _add_file(t, recorder, buf, full_path, info,
+                                      content, block_size):
+                    yield data
+                session.finish()
+        else:
+            for data in _add_file(t, t.fileobj, buf, full_path, info,
+                                  content, block_size):
+                yield data
+
+        data = buf.pop()
+        if data:
+            yield data
+
+    t.close()
+    data = buf.pop()
+    if data:
+        yield data
+
+
+class TeeWriter(object):
+    """
+    Writes to two file objects at once.
+    """
+
+    def __init__(self, first, second):
+        self.first = first
+        self.second = second
+
+    def write(self, data):
+        self.first.write(data)
+        self.second.write(data)
+
+
+def memory_tar_stream(files, gzip=False, gzip_level=None,
+                      block_size=CONTEXT_BLOCK_SIZE):
+    """
+    Generator of the blocks of a tar archive of a build context held in
+    memory, compressed with gzip if `gzip` is True.
+
+    `files` maps the paths of the context to their content: bytes, text
+    (encoded as UTF-8) or file objects, which are read from their current
+    position. Files are archived in the order of their paths, with mode
+    0644 and no modification time, so that the same files always make the
+    same archive.
+    """
+    blocks = _memory_tar_stream(files, block_size)
+    if gzip:
+        blocks = gzip_stream(blocks, gzip_level)
+    for data in blocks:
+        yield data
+
+
+def _memory_tar_stream(files, block_size):
+    buf = BlockBuffer()
+    t = tarfile.open(mode='w|', fileobj=buf, bufsize=block_size)
+    for name in sorted(files):
+        content = files[name]
+        f = None
+        if isinstance(content, six.text_type):
+            content = content.encode('utf-8')
+        elif not isinstance(content, six.binary_type):
+            f = content
+            content = None
+            size = _remaining_size(f)
+            if size is None:
+                content = f.read()
+                if isinstance(content, six.text_type):
+                    content = content.encode('utf-8')
+
+        info = tarfile.TarInfo(name.replace(os.sep, '/').lstrip('/'))
+        info.mode = 0o644
+        info.size = len(content) if content is not None else size
+        for data in _add_file(t, t.fileobj, buf, name, info, content,
+                              block_size, f):
+            yield data
+        data = buf.pop()
+        if data:
+            yield data
+
+    t.close()
+    data = buf.pop()
+    if data:
+        yield data
+
+
+def _remaining_size(f):
+    # The size of what is left to read in a real file, or None
+    try:
+        return os.fstat(f.fileno()).st_size - f.tell()
+    except (AttributeError, IOError, OSError, ValueError):
+        return None
+
+
+def _add_file(t, fileobj, buf, full_path, info, content, block_size, f=None):
+    # Copy the file block by block rather than with addfile, which would
+    # buffer all of it before anything could be sent.
+    header = info.tobuf(t.format, t.encoding, t.errors)
+    fileobj.write(header)
+    t.offset += len(header)
+    if content is not None:
+        if len(content) != info.size:
+            raise IOError(
+                '{0} was truncated while archiving it'.format(full_path)
+            )
+        fileobj.write(content)
+    elif f is not None:
+        for data in _copy_blocks(fileobj, buf, full_path, f, info.size,
+                                 block_size):
+            yield data
+    else:
+        with open(full_path, 'rb') as f:
+            for data in _copy_blocks(fileobj, buf, full_path, f, info.size,
+                                     block_size):
+                yield data
+    blocks, remainder = divmod(info.size, tarfile.BLOCKSIZE)
+    if remainder:
+        fileobj.write(tarfile.NUL * (tarfile.BLOCKSIZE - remainder))
+        blocks += 1
+    t.offset += blocks * tarfile.BLOCKSIZE
+
+
+def _copy_blocks(fileobj, buf, name, f, size, block_size):
+    remaining = size
+    while remaining:
+        data = f.read(min(block_size, remaining))
+        if not data:
+            raise IOError('{0} was truncated while archiving it'.format(name))
+        fileobj.write(data)
+        remaining -= len(data)
+        data = buf.pop()
+        if data:
+            yield data
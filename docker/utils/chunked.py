@@ -0,0 +1,78 @@
+import six
+
+from .. import errors
+
+READ_BLOCK_SIZE = 65536
+
+
+class ChunkedDecoder(object):
+    """
+    Incremental decoder for HTTP chunked transfer encoding.
+
+    Data is fed in arbitrarily sized blocks and `feed` returns the payloads
+    of all chunks completed by that block. Partial chunks are kept in an
+    internal buffer until the rest of them arrives.
+    """
+
+    def __init__(self):
+        self._buffer = bytearray()
+        self.done = False
+
+    def feed(self, data):
+        buf = self._buffer
+        buf += data
+        chunks = []
+        pos = 0
+        length = len(buf)
+
+        while not self.done:
+            eol = buf.find(b'\r\n', pos)
+            if eol < 0:
+                break
+            size_field = bytes(buf[pos:eol]).split(b';', 1)[0].strip()
+            try:
+                size = int(size_field, 16)
+            except ValueError:
+                raise errors.DockerException(
+                    'Invalid chunk size in response stream: {0!r}'.format(
+                        size_field
+                    )
+                )
+
+            if size == 0:
+                # Last chunk; it is followed by optional trailer fields and
+                # an empty line.
+                end = eol + 2
+                if buf[end:end + 2] != b'\r\n':
+                    end = buf.find(b'\r\n\r\n', eol)
+                    if end < 0:
+                        break
+                pos = length
+                self.done = True
+                break
+
+            start = eol + 2
+            end = start + size
+            if end + 2 > length:
+                break
+            chunks.append(six.binary_type(buf[start:end]))
+            pos = end + 2
+
+        del buf[:pos]
+        return chunks
+
+
+def read_chunks(fp, block_size=READ_BLOCK_SIZE):
+    """
+    Generator of chunk payloads read from `fp`, a buffered reader positioned
+    at the start of a chunked-encoded body. Each `read1` call returns
+    whatever is available, up to `block_size` bytes, so many chunks are
+    decoded per read.
+    """
+    decoder = ChunkedDecoder()
+    while not decoder.done:
+        data = fp.read1(block_size)
+        if not data:
+            break
+        for chunk in decoder.feed(data):
+            yield chunk
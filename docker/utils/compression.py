@@ -0,0 +1,110 @@
+"""
+Gzip compression of streams, optionally spread over worker threads.
+
+In parallel mode, the stream is cut into blocks which are deflated
+independently, each ending on a byte boundary, and concatenated into a
+single gzip member, like pigz does. Each block is primed with the end of
+the previous one, so that the compression ratio stays close to that of a
+single deflate stream. zlib releases the GIL while compressing, so the
+blocks are really compressed at the same time.
+"""
+import functools
+import struct
+import sys
+import zlib
+
+from .concurrency import ordered_map
+
+# As tarfile's gzip mode
+DEFAULT_GZIP_LEVEL = 9
+GZIP_BLOCK_SIZE = 128 * 1024
+# The size of the deflate window, which primes the compression of a block
+DICTIONARY_SIZE = 32 * 1024
+
+# Magic, deflate method, no flags, no mtime, no extra flags, unknown OS
+GZIP_HEADER = b'\x1f\x8b\x08\x00\x00\x00\x00\x00\x00\xff'
+
+# Preset dictionaries can only be given to compressobj in Python 3.3+
+SUPPORTS_ZDICT = sys.version_info >= (3, 3)
+
+
+def regroup(blocks, size):
+    """
+    Generator of blocks of `size` bytes (except the last one) made of the
+    data of `blocks`.
+    """
+    pending = []
+    pending_size = 0
+    for data in blocks:
+        pending.append(data)
+        pending_size += len(data)
+        if pending_size >= size:
+            data = b''.join(pending)
+            for start in range(0, len(data) - size + 1, size):
+                yield data[start:start + size]
+            rest = data[len(data) - len(data) % size:]
+            pending = [rest] if rest else []
+            pending_size = len(rest)
+    if pending_size:
+        yield b''.join(pending)
+
+
+def deflate_block(level, block):
+    """
+    Returns the raw deflate data of `block`, a (data, dictionary) pair,
+    ending on a byte boundary without ending the deflate stream.
+    """
+    data, dictionary = block
+    if dictionary and SUPPORTS_ZDICT:
+        compressor = zlib.compressobj(
+            level, zlib.DEFLATED, -zlib.MAX_WBITS, zlib.DEF_MEM_LEVEL,
+            zlib.Z_DEFAULT_STRATEGY, dictionary
+        )
+    else:
+        compressor = zlib.compressobj(level, zlib.DEFLATED, -zlib.MAX_WBITS)
+    return compressor.compress(data) + compressor.flush(zlib.Z_SYNC_FLUSH)
+
+
+def gzip_stream(blocks, level=None, pool=None, block_size=GZIP_BLOCK_SIZE):
+    """
+    Generator of the gzip compressed stream of the data of `blocks`.
+
+    With a `ThreadPool`, blocks of `block_size` bytes are compressed by its
+    threads, ahead of the consumer.
+    """
+    if level is None:
+        level = DEFAULT_GZIP_LEVEL
+
+    if pool is None:
+        compressor = zlib.compressobj(
+            level, zlib.DEFLATED, zlib.MAX_WBITS | 16
+        )
+        for data in blocks:
+            data = compressor.compress(data)
+            if data:
+                yield data
+        yield compressor.flush()
+        return
+
+    state = {'crc': 0, 'size': 0}
+
+    def with_dictionaries():
+        # Runs in the consumer's thread, as the checksum covers the blocks
+        # in order
+        dictionary = b''
+        for data in regroup(blocks, block_size):
+            state['crc'] = zlib.crc32(data, state['crc'])
+            state['size'] += len(data)
+            yield data, dictionary
+            dictionary = data[-DICTIONARY_SIZE:]
+
+    yield GZIP_HEADER
+    for data in ordered_map(pool, functools.partial(deflate_block, level),
+                            with_dictionaries(), window=2 * pool.workers):
+        if data:
+            yield data
+    # An empty final block ends the deflate stream
+    yield zlib.compressobj(level, zlib.DEFLATED, -zlib.MAX_WBITS).flush()
+    yield struct.pack(
+        '<II', state['crc'] & 0xffffffff, state['size'] & 0xffffffff
+    )
@@ -0,0 +1,133 @@
+import collections
+import sys
+import threading
+
+import six
+from six.moves import queue
+
+
+class Task(object):
+    """
+    A call submitted to a `ThreadPool`, whose result is returned (or whose
+    exception is raised again) by `result`.
+    """
+
+    def __init__(self, func, args, kwargs):
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.cancelled = False
+        self._done = threading.Event()
+        self._result = None
+        self._exc_info = None
+
+    def run(self):
+        try:
+            if not self.cancelled:
+                self._result = self.func(*self.args, **self.kwargs)
+        except BaseException:
+            self._exc_info = sys.exc_info()
+        finally:
+            self._done.set()
+
+    def done(self):
+        return self._done.is_set()
+
+    def result(self):
+        self._done.wait()
+        if self._exc_info is not None:
+            six.reraise(*self._exc_info)
+        return self._result
+
+
+class ThreadPool(object):
+    """
+    A fixed number of daemon threads running the tasks submitted to them, in
+    submission order. Closing the pool cancels the tasks which haven't
+    started yet.
+    """
+
+    def __init__(self, workers):
+        self.workers = workers
+        self._queue = queue.Queue()
+        self._threads = []
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def submit(self, func, *args, **kwargs):
+        task = Task(func, args, kwargs)
+        with self._lock:
+            if self._closed:
+                raise RuntimeError('The thread pool is closed')
+            if len(self._threads) < self.workers:
+                thread = threading.Thread(target=self._work)
+                thread.daemon = True
+                thread.start()
+                self._threads.append(thread)
+            self._queue.put(task)
+        return task
+
+    def close(self):
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            threads = self._threads
+        while True:
+            try:
+                task = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            task.cancelled = True
+            task.run()
+        for _ in threads:
+            self._queue.put(None)
+        for thread in threads:
+            if thread is not threading.current_thread():
+                thread.join()
+
+    def _work(self):
+        while True:
+            task = self._queue.get()
+            if task is None:
+                return
+            task.run()
+
+
+def ordered_map(pool, func, iterable, window):
+    """
+    Generator of `func(item)` for each item of `iterable`, in order. The
+    calls are made by the threads of `pool`, at most `window` items ahead
+    of the consumer.
+    """
+    pending = collections.deque()
+    try:
+        for item in iterable:
+            pending.append(pool.submit(func, item))
+            if len(pending) >= window:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        for task in pending:
+            task.cancelled = True
+
+
+def batches(iterable, size):
+    """
+    Generator of lists of up to `size` consecutive items of `iterable`.
+    """
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
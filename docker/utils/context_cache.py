@@ -0,0 +1,281 @@
+import hashlib
+import logging
+import os
+import tempfile
+import time
+
+import six
+
+from ..cache import (
+    default_cache_dir, load_json, makedirs, replace_file, save_json
+)
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+try:
+    import msvcrt
+except ImportError:
+    msvcrt = None
+
+log = logging.getLogger(__name__)
+
+# Sessions lock their directory with flock, or msvcrt on Windows
+HAS_FILE_LOCKS = fcntl is not None or msvcrt is not None
+
+CONTEXT_CACHE_FORMAT = 1
+# Files modified this recently (in seconds) when an archive is started
+# aren't cached, as they could change again without their mtime changing.
+CONTEXT_CACHE_RACY_WINDOW = 2
+# Stale segments are dropped once they take more room than this and than
+# the live ones.
+CONTEXT_CACHE_COMPACT_SIZE = 16 * 1024 * 1024
+
+
+def default_context_cache_dir():
+    return os.path.join(default_cache_dir(), 'context-cache')
+
+
+class ContextCache(object):
+    """
+    An on-disk cache of the members of the build context archives produced
+    by `utils.tar` and `utils.tar_stream`.
+
+    For every context directory, the cache keeps the tar segments (header
+    and content) of the regular files it archived, indexed by their path,
+    size, mtime, inode, mode and owner. When the context is archived again,
+    the segments of unchanged files are copied from the cache instead of
+    reading the files and building their headers again.
+
+    Lookups are counted in `hits` and `misses`, and the size of the reused
+    segments in `bytes_reused`. The cache isn't shared between concurrent
+    archives of the same directory: if the directory is already being
+    archived, the cache is simply not used. This relies on file locks, so
+    on platforms which have neither `fcntl` nor `msvcrt` the cache is never
+    used.
+    """
+
+    def __init__(self, directory=None):
+        self.directory = directory or default_context_cache_dir()
+        self.hits = 0
+        self.misses = 0
+        self.bytes_reused = 0
+
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'bytes_reused': self.bytes_reused,
+        }
+
+    def open(self, root):
+        """
+        Returns a `ContextCacheSession` to archive the directory `root`, or
+        None if the cache can't be used for it.
+        """
+        if not HAS_FILE_LOCKS:
+            # Concurrent archives would mix up their segments
+            return None
+        root = os.path.abspath(root)
+        if isinstance(root, six.text_type):
+            key = root.encode('utf-8', 'surrogateescape' if six.PY3 else
+                              'strict')
+        else:
+            key = root
+        directory = os.path.join(
+            self.directory, hashlib.sha1(key).hexdigest()
+        )
+        try:
+            return ContextCacheSession(self, directory)
+        except (IOError, OSError) as e:
+            log.debug('Could not open the context cache: {0}'.format(e))
+            return None
+
+
+def file_key(st):
+    mtime_ns = getattr(st, 'st_mtime_ns', None)
+    if mtime_ns is None:
+        mtime_ns = int(st.st_mtime * 1e9)
+    return [st.st_size, mtime_ns, st.st_ino, st.st_mode, st.st_uid, st.st_gid]
+
+
+def lock_file(f):
+    """
+    Takes an exclusive lock on the open file `f`, without waiting. Raises
+    IOError or OSError if it is already locked.
+    """
+    if fcntl is not None:
+        fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    else:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+
+
+def unlock_file(f):
+    # Closing the file releases a flock
+    if fcntl is None:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+class ContextCacheSession(object):
+    """
+    The use of a `ContextCache` by one archive. Segments are stored in a
+    single append-only file, which is compacted when it holds too many
+    stale segments.
+    """
+
+    def __init__(self, cache, directory):
+        self.cache = cache
+        self.directory = directory
+        self.index_path = os.path.join(directory, 'index.json')
+        self.segments_path = os.path.join(directory, 'segments')
+        self.started = time.time()
+        makedirs(directory)
+
+        self._lock = open(os.path.join(directory, 'lock'), 'a')
+        try:
+            lock_file(self._lock)
+        except (IOError, OSError):
+            self._lock.close()
+            raise
+        try:
+            self._segments = open(self.segments_path, 'a+b')
+            self._segments.seek(0, os.SEEK_END)
+            self._end = self._segments.tell()
+        except BaseException:
+            self._release()
+            raise
+
+        index = load_json(self.index_path)
+        entries = index.get('Entries')
+        if index.get('Format') != CONTEXT_CACHE_FORMAT or \
+                not isinstance(entries, dict) or \
+                index.get('Size') != self._end:
+            # A missing, outdated or torn index: start over
+            entries = {}
+            self._segments.truncate(0)
+            self._end = 0
+        self._size = self._end
+        self._index = entries
+        self._new_index = {}
+        self._recording = None
+
+    def find(self, path, st):
+        """
+        Returns the (offset, length) of the segment of the regular file
+        `path` with the lstat result `st`, or None if it isn't cached.
+        """
+        entry = self._index.get(path)
+        if entry is not None and entry[0] == file_key(st) and \
+                entry[1] + entry[2] <= self._end:
+            return entry[1], entry[2]
+        return None
+
+    def read(self, path, segment, block_size):
+        """
+        Generator of the blocks of a segment returned by `find`.
+        """
+        offset, length = segment
+        self._new_index[path] = self._index[path]
+        self.cache.hits += 1
+        self.cache.bytes_reused += length
+        remaining = length
+        while remaining:
+            # Writes move the position, so seek before every read
+            self._segments.seek(offset)
+            data = self._segments.read(min(block_size, remaining))
+            if not data:
+                raise IOError(
+                    'The context cache in {0} is truncated'.format(
+                        self.directory
+                    )
+                )
+            offset += len(data)
+            remaining -= len(data)
+            yield data
+
+    def start(self, path, st):
+        """
+        Starts recording the segment of the regular file `path`, which is
+        then passed to `write`.
+        """
+        self.cache.misses += 1
+        self._recording = None
+        if st.st_nlink > 1:
+            # Whether it's archived as a hard link depends on the other files
+            return
+        if st.st_mtime >= self.started - CONTEXT_CACHE_RACY_WINDOW:
+            return
+        self._recording = (path, file_key(st), self._end)
+
+    def write(self, data):
+        if self._recording is not None:
+            self._segments.write(data)
+            self._end += len(data)
+
+    def finish(self):
+        if self._recording is not None:
+            path, key, offset = self._recording
+            self._new_index[path] = [key, offset, self._end - offset]
+            self._recording = None
+
+    def close(self, complete=True):
+        """
+        Releases the cache. With `complete`, the archive was fully produced
+        and the index is replaced with the segments it used. Otherwise, the
+        segments recorded since `open` are dropped.
+        """
+        try:
+            if not complete:
+                self._segments.truncate(self._size)
+            else:
+                self._segments.flush()
+                live = sum(entry[2] for entry in self._new_index.values())
+                dead = self._end - live
+                if dead > live and dead > CONTEXT_CACHE_COMPACT_SIZE:
+                    self._compact()
+                save_json(self.index_path, {
+                    'Format': CONTEXT_CACHE_FORMAT,
+                    'Size': self._end,
+                    'Entries': self._new_index,
+                })
+        except (IOError, OSError) as e:
+            log.debug('Could not save the context cache: {0}'.format(e))
+        finally:
+            self._segments.close()
+            self._release()
+
+    def _release(self):
+        try:
+            unlock_file(self._lock)
+        finally:
+            self._lock.close()
+
+    def _compact(self):
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                for entry in sorted(self._new_index.values(),
+                                    key=lambda e: e[1]):
+                    self._segments.seek(entry[1])
+                    offset = f.tell()
+                    remaining = entry[2]
+                    while remaining:
+                        data = self._segments.read(min(remaining, 1 << 20))
+                        if not data:
+                            raise IOError('Truncated context cache')
+                        f.write(data)
+                        remaining -= len(data)
+                    entry[1] = offset
+                end = f.tell()
+            self._segments.close()
+            replace_file(tmp_path, self.segments_path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+        finally:
+            self._segments = open(self.segments_path, 'a+b')
+        self._end = end
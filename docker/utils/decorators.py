@@ -37,6 +37,24 @@ def minimum_version(version):
     return decorator
 
 
+def cached_inspect(kind):
+    """
+    Serves the decorated inspect method from the client's inspect cache, if
+    one is enabled.
+    """
+    def decorator(f):
+        @functools.wraps(f)
+        def wrapper(self, resource_id, *args, **kwargs):
+            cache = getattr(self, 'inspect_cache', None)
+            if cache is None or args or kwargs:
+                return f(self, resource_id, *args, **kwargs)
+            return cache.load(
+                kind, resource_id, lambda: f(self, resource_id)
+            )
+        return wrapper
+    return decorator
+
+
 def update_headers(f):
     def inner(self, *args, **kwargs):
         if 'HttpHeaders' in self._auth_configs:
@@ -0,0 +1,125 @@
+"""
+Parsing of Dockerfiles, to find out which paths of the build context their
+`COPY` and `ADD` instructions can refer to.
+"""
+import io
+import json
+import os
+import re
+
+import six
+
+from .dockerignore import normalize_pattern
+
+DIRECTIVE_RE = re.compile(r'^#\s*([a-zA-Z][a-zA-Z0-9]*)\s*=\s*(.+?)\s*$')
+URL_PREFIXES = ('http://', 'https://', 'git://', 'git@', 'github.com/')
+
+
+def parse_instructions(content):
+    """
+    Returns the (instruction, arguments) pairs of a Dockerfile, with
+    instructions in upper case, comments removed and continuation lines
+    joined.
+    """
+    escape = '\\'
+    lines = content.splitlines()
+
+    # Parser directives can only appear before any other line
+    for line in lines:
+        match = DIRECTIVE_RE.match(line)
+        if not match:
+            break
+        if match.group(1).lower() == 'escape' and \
+                match.group(2) in ('\\', '`'):
+            escape = match.group(2)
+
+    instructions = []
+    current = ''
+    for line in lines:
+        stripped = line.strip()
+        if not stripped or stripped.startswith('#'):
+            continue
+        if stripped.endswith(escape):
+            current += stripped[:-1].rstrip() + ' '
+            continue
+        current += stripped
+        parts = current.split(None, 1)
+        current = ''
+        if parts:
+            instructions.append(
+                (parts[0].upper(), parts[1] if len(parts) > 1 else '')
+            )
+    if current.strip():
+        parts = current.split(None, 1)
+        instructions.append(
+            (parts[0].upper(), parts[1].strip() if len(parts) > 1 else '')
+        )
+    return instructions
+
+
+def parse_copy_arguments(arguments):
+    """
+    Splits the arguments of a `COPY` or `ADD` instruction into its flags (a
+    dict) and its sources and destination (a list).
+    """
+    flags = {}
+    arguments = arguments.strip()
+    while arguments.startswith('--'):
+        parts = arguments.split(None, 1)
+        name, _, value = parts[0][2:].partition('=')
+        flags[name.lower()] = value
+        arguments = parts[1] if len(parts) > 1 else ''
+
+    if arguments.startswith('['):
+        try:
+            paths = json.loads(arguments)
+        except ValueError:
+            pass
+        else:
+            if isinstance(paths, list) and \
+                    all(isinstance(p, six.string_types) for p in paths):
+                return flags, paths
+    return flags, arguments.split()
+
+
+def context_sources(content):
+    """
+    Returns the patterns of the paths of the build context that the `COPY`
+    and `ADD` instructions of the Dockerfile `content` refer to, or None if
+    they can't be known and the whole context is needed (e.g. when a source
+    uses a variable or is the root of the context).
+
+    Sources copied from other build stages or images (`--from`) and remote
+    `ADD` sources aren't part of the context.
+    """
+    sources = []
+    for instruction, arguments in parse_instructions(content):
+        if instruction not in ('COPY', 'ADD'):
+            continue
+        flags, paths = parse_copy_arguments(arguments)
+        if 'from' in flags:
+            continue
+        for source in paths[:-1]:
+            if instruction == 'ADD' and source.startswith(URL_PREFIXES):
+                continue
+            if '$' in source:
+                return None
+            normalized = normalize_pattern(source)
+            if normalized in ('', '.') or normalized.startswith('..'):
+                return None
+            sources.append(source)
+    return sources
+
+
+def read_context_sources(root, dockerfile=None):
+    """
+    Like `context_sources`, for the Dockerfile of the build context in
+    `root`. Returns None if the Dockerfile can't be read.
+    """
+    path = os.path.join(root, dockerfile or 'Dockerfile')
+    try:
+        with io.open(path, 'r', encoding='utf-8', errors='replace') as f:
+            content = f.read()
+    except (IOError, OSError):
+        return None
+    return context_sources(content)
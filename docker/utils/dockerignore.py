@@ -0,0 +1,156 @@
+"""
+Matching of build context paths against .dockerignore patterns.
+
+Patterns are compiled into regular expressions once, so that a path is
+checked against all of them with a single match. As with the docker CLI, a
+pattern also matches everything below the paths it matches, `*` and `?`
+don't match path separators and `**` matches any number of directories.
+"""
+import os
+import re
+
+# Match paths case-insensitively where the file system does, like fnmatch
+IGNORE_CASE = os.path.normcase('A') == os.path.normcase('a')
+
+
+def normalize_pattern(pattern):
+    pattern = pattern.rstrip('/')
+    if pattern:
+        pattern = os.path.normpath(pattern).replace(os.sep, '/').lstrip('/')
+    return pattern
+
+
+def translate_component(component):
+    """
+    Translates a path component of a pattern into a regular expression,
+    like `fnmatch.translate` but without matching path separators.
+    """
+    i, n = 0, len(component)
+    res = []
+    while i < n:
+        c = component[i]
+        i += 1
+        if c == '*':
+            res.append('[^/]*')
+        elif c == '?':
+            res.append('[^/]')
+        elif c == '[':
+            j = i
+            if j < n and component[j] == '!':
+                j += 1
+            if j < n and component[j] == ']':
+                j += 1
+            while j < n and component[j] != ']':
+                j += 1
+            if j >= n:
+                res.append('\\[')
+            else:
+                stuff = component[i:j].replace('\\', '\\\\')
+                i = j + 1
+                if stuff[0] == '!':
+                    stuff = '^/' + stuff[1:]
+                elif stuff[0] == '^':
+                    stuff = '\\' + stuff
+                res.append('[{0}]'.format(stuff))
+        else:
+            res.append(re.escape(c))
+    return ''.join(res)
+
+
+def translate(pattern):
+    """
+    Returns a regular expression matching the paths `pattern` applies to:
+    the paths it matches and everything below them.
+    """
+    components = normalize_pattern(pattern).split('/')
+    regex = ''
+    need_separator = False
+    for i, component in enumerate(components):
+        last = i == len(components) - 1
+        if component == '**':
+            if last:
+                regex += '(?:/.*)?' if need_separator else '.*'
+            else:
+                regex += '/(?:[^/]+/)*' if need_separator else '(?:[^/]+/)*'
+            need_separator = False
+        else:
+            if need_separator:
+                regex += '/'
+            regex += translate_component(component)
+            need_separator = True
+    return regex + '(?:/.*)?'
+
+
+def translate_parents(pattern):
+    """
+    Returns a regular expression matching the directories below which
+    `pattern` could match something, or None if there are none (when the
+    pattern has a single component).
+    """
+    components = normalize_pattern(pattern).split('/')[:-1]
+    if not components:
+        return None
+    regex = ''
+    depth = 0
+    for i, component in enumerate(components):
+        if component == '**':
+            regex += '(?:/.*)?' if i else '.*'
+            break
+        if i:
+            regex += '(?:/'
+            depth += 1
+        regex += translate_component(component)
+    return regex + ')?' * depth
+
+
+def compile_regexes(regexes):
+    regexes = [r for r in regexes if r is not None]
+    if not regexes:
+        return None
+    return re.compile(
+        '(?:{0})\\Z'.format('|'.join('(?:{0})'.format(r) for r in regexes)),
+        re.DOTALL | (re.IGNORECASE if IGNORE_CASE else 0)
+    )
+
+
+class PatternMatcher(object):
+    """
+    Decides which paths of a build context are sent to the daemon. A path
+    is left out if it matches one of `exclude_patterns`, unless it also
+    matches one of `include_patterns` (the `!` exceptions of a
+    .dockerignore file, the Dockerfile and the .dockerignore file itself).
+
+    Paths are relative to the root of the context and use `/` as separator.
+    """
+
+    def __init__(self, exclude_patterns, include_patterns=()):
+        self.exclude_patterns = list(exclude_patterns)
+        self.include_patterns = list(include_patterns)
+        self._exclude = compile_regexes(
+            translate(p) for p in self.exclude_patterns
+        )
+        self._include = compile_regexes(
+            translate(p) for p in self.include_patterns
+        )
+        self._include_parents = compile_regexes(
+            translate_parents(p) for p in self.include_patterns
+        )
+
+    def excludes(self, path):
+        return self._exclude is not None and bool(self._exclude.match(path))
+
+    def includes(self, path):
+        if not self.excludes(path):
+            return True
+        return self._include is not None and bool(self._include.match(path))
+
+    def can_prune(self, path):
+        """
+        Returns whether nothing in the directory `path` can be included, so
+        that it doesn't need to be walked.
+        """
+        if self.includes(path):
+            return False
+        return self._include_parents is None or not (
+            self._include_parents.match(path)
+        )
@@ -0,0 +1,149 @@
+"""
+Copies of large bodies between the daemon's socket and files.
+
+On Linux, bytes are moved by the kernel: `splice` takes them from the socket
+to the file through a pipe, and `sendfile` from the file to the socket, so
+they are never copied into Python. Elsewhere, over TLS and for data already
+read into Python's buffers, they are copied in large blocks.
+"""
+import os
+import select
+import socket
+
+from .. import errors
+from .socket import HAS_MEMORYVIEW
+
+COPY_BUFFER_SIZE = 1024 * 1024
+# Longest chunk size line accepted in a chunked-encoded body
+MAX_CHUNK_LINE = 1024
+
+HAS_SPLICE = hasattr(os, 'splice')
+HAS_SENDFILE = hasattr(os, 'sendfile')
+
+
+def write_all(fd, data):
+    if not HAS_MEMORYVIEW:
+        # Python 2.6: each partial write copies the rest of the data
+        while data:
+            data = data[os.write(fd, data):]
+        return
+    view = memoryview(data)
+    while view:
+        view = view[os.write(fd, view):]
+
+
+def read_blocks(f, size=COPY_BUFFER_SIZE):
+    """Generator of the blocks of `size` bytes of the rest of file `f`."""
+    while True:
+        data = f.read(size)
+        if not data:
+            break
+        yield data
+
+
+def copy_blocks(f, fd, size=COPY_BUFFER_SIZE):
+    """
+    Copies the rest of file `f` to file descriptor `fd` in blocks of `size`
+    bytes, and returns the number of bytes copied.
+    """
+    total = 0
+    for data in read_blocks(f, size):
+        write_all(fd, data)
+        total += len(data)
+    return total
+
+
+def splice_to_file(sock_fd, fd, count, timeout=None):
+    """
+    Moves `count` bytes from socket `sock_fd` to file descriptor `fd`
+    through a pipe, without copying them into Python. Sockets with a
+    timeout are non-blocking, so their readability is waited for with
+    `select`.
+    """
+    pipe_read, pipe_write = os.pipe()
+    try:
+        while count:
+            try:
+                moved = os.splice(
+                    sock_fd, pipe_write, min(count, COPY_BUFFER_SIZE)
+                )
+            except BlockingIOError:
+                readable, _, _ = select.select([sock_fd], [], [], timeout)
+                if not readable:
+                    raise socket.timeout('timed out')
+                continue
+            if not moved:
+                raise errors.DockerException('Unexpected end of stream')
+            count -= moved
+            while moved:
+                moved -= os.splice(pipe_read, fd, moved)
+    finally:
+        os.close(pipe_read)
+        os.close(pipe_write)
+
+
+def copy_exact(fp, fd, count, sock_fd=None, timeout=None):
+    """
+    Copies `count` bytes from `fp`, a buffered reader over a socket, to file
+    descriptor `fd`. The data `fp` has buffered is copied first; once its
+    buffer is drained, the rest is spliced straight from `sock_fd` if given.
+    """
+    while count:
+        size = min(count, COPY_BUFFER_SIZE)
+        data = fp.read1(size)
+        if not data:
+            raise errors.DockerException('Unexpected end of stream')
+        write_all(fd, data)
+        count -= len(data)
+        # read1 only returns less than asked for once it has returned all
+        # the data fp had buffered.
+        if count and len(data) < size and sock_fd is not None:
+            splice_to_file(sock_fd, fd, count, timeout)
+            return
+
+
+def copy_chunked(fp, fd, sock_fd=None, timeout=None):
+    """
+    Copies the payload of the chunked-encoded body read from `fp`, a
+    buffered reader over a socket, to file descriptor `fd` as `copy_exact`
+    does. Returns the number of bytes copied.
+    """
+    total = 0
+    while True:
+        line = fp.readline(MAX_CHUNK_LINE)
+        if not line:
+            raise errors.DockerException('Unexpected end of stream')
+        size_field = line.split(b';', 1)[0].strip()
+        try:
+            size = int(size_field, 16)
+        except ValueError:
+            raise errors.DockerException(
+                'Invalid chunk size in response stream: {0!r}'.format(
+                    size_field
+                )
+            )
+        if size == 0:
+            # Skip the trailer fields, up to the empty line ending the body
+            while fp.readline(MAX_CHUNK_LINE).strip():
+                pass
+            return total
+        copy_exact(fp, fd, size, sock_fd, timeout)
+        total += size
+        if fp.read(2) != b'\r\n':
+            raise errors.DockerException(
+                'Invalid chunk delimiter in response stream'
+            )
+
+
+def send_file(sock, f):
+    """
+    Sends the rest of file `f` over `sock`, with `sendfile` where it is
+    available. Returns the number of bytes sent.
+    """
+    if HAS_SENDFILE and hasattr(sock, 'sendfile'):
+        return sock.sendfile(f)
+    total = 0
+    for data in read_blocks(f):
+        sock.sendall(data)
+        total += len(data)
+    return total
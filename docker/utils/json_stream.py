@@ -0,0 +1,106 @@
+import codecs
+import json
+import json.decoder
+import re
+
+import six
+
+from .. import errors
+
+json_decoder = json.JSONDecoder()
+WHITESPACE = json.decoder.WHITESPACE
+LINE_TERMINATORS = ('\n', '\r')
+# Python 2 only gives the position of decoding errors in their message
+ERROR_POSITION_RE = re.compile(r'\(char (\d+)')
+
+
+class JSONStreamDecoder(object):
+    """
+    Incremental decoder for a stream of whitespace-separated JSON documents,
+    such as the progress messages sent by the build, pull and push
+    endpoints or the objects sent by events and stats.
+
+    Blocks of data are fed as they arrive and `feed` returns the documents
+    they complete. A document may be split across any number of blocks;
+    the unparsed tail is carried over to the next call. Data which can't be
+    decoded raises StreamParseError once a line terminator follows it, as
+    the daemon ends every document with one.
+    """
+
+    def __init__(self):
+        self._text_decoder = codecs.getincrementaldecoder('utf-8')()
+        self._buffer = six.text_type()
+
+    def feed(self, data):
+        if isinstance(data, six.binary_type):
+            data = self._text_decoder.decode(data)
+        buf = self._buffer + data if self._buffer else data
+        length = len(buf)
+        objects = []
+        pos = WHITESPACE.match(buf, 0).end()
+
+        while pos < length:
+            try:
+                obj, end = json_decoder.raw_decode(buf, idx=pos)
+            except ValueError as e:
+                if objects or _incomplete(buf, _error_position(e, pos)):
+                    # Wait for more data, or return the documents decoded
+                    # so far and raise on the next call
+                    break
+                self._buffer = six.text_type()
+                raise errors.StreamParseError(e)
+            if end == length and not isinstance(obj, (dict, list)):
+                # A scalar at the very end of the buffer may be truncated
+                break
+            objects.append(obj)
+            pos = WHITESPACE.match(buf, end).end()
+
+        self._buffer = buf[pos:]
+        return objects
+
+    def close(self):
+        """
+        Signal the end of the stream. Returns the last document if the
+        stream ended on a complete scalar, and raises StreamParseError if
+        undecodable data is left over.
+        """
+        rest = (self._buffer + self._text_decoder.decode(b'', True)).strip()
+        self._buffer = six.text_type()
+        if not rest:
+            return []
+        try:
+            return [json.loads(rest)]
+        except ValueError as e:
+            raise errors.StreamParseError(e)
+
+
+def _error_position(error, default):
+    pos = getattr(error, 'pos', None)
+    if pos is None:
+        match = ERROR_POSITION_RE.search(str(error))
+        pos = int(match.group(1)) if match else default
+    return pos
+
+
+def _incomplete(buf, pos):
+    """
+    Whether the decoding error at `pos` may be due to `buf` ending in the
+    middle of a document, rather than to invalid data. A block can end
+    anywhere in a document, even in an escape sequence or a number, so
+    only a line terminator after the error tells that it is invalid.
+    """
+    rest = buf[pos:]
+    return not any(c in rest for c in LINE_TERMINATORS)
+
+
+def json_stream(stream):
+    """
+    Given an iterable of bytes or text blocks, yield the JSON documents they
+    contain, regardless of how the documents are split across blocks.
+    """
+    decoder = JSONStreamDecoder()
+    for data in stream:
+        for obj in decoder.feed(data):
+            yield obj
+    for obj in decoder.close():
+        yield obj
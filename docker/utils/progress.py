@@ -0,0 +1,223 @@
+"""
+Structured events and timings from the output of `Client.build`.
+
+The daemon reports the progress of a build as lines of text ("Step 2/5 :
+RUN make", " ---> Using cache", " ---> 1a2b3c4d5e6f", ...). `BuildProgress`
+turns them into typed events with wall-clock timings, and records a
+`BuildProfile` of the time spent in each step.
+"""
+import collections
+import re
+import time
+
+import six
+
+STEP_RE = re.compile(r'^Step (\d+)(?:/(\d+))? : (.*)$')
+LAYER_RE = re.compile(r'^ ---> (?:sha256:)?([0-9a-f]{12,64})$')
+CACHE_LINE = ' ---> Using cache'
+BUILT_RE = re.compile(r'^Successfully built (?:sha256:)?([0-9a-f]+)$')
+
+
+StepStarted = collections.namedtuple(
+    'StepStarted', 'step total instruction time'
+)
+StepFinished = collections.namedtuple(
+    'StepFinished', 'step instruction duration cached layer_id time'
+)
+CacheHit = collections.namedtuple('CacheHit', 'step instruction time')
+LayerCreated = collections.namedtuple('LayerCreated', 'step layer_id time')
+BuildOutput = collections.namedtuple('BuildOutput', 'step text time')
+BuildFailed = collections.namedtuple(
+    'BuildFailed', 'step message detail time'
+)
+BuildFinished = collections.namedtuple(
+    'BuildFinished', 'image_id duration time'
+)
+
+StepTiming = collections.namedtuple(
+    'StepTiming', 'step instruction duration cached layer_id'
+)
+InstructionTiming = collections.namedtuple(
+    'InstructionTiming', 'instruction count cached total mean max'
+)
+
+
+def instruction_name(instruction):
+    parts = instruction.split(None, 1)
+    return parts[0].upper() if parts else ''
+
+
+class BuildProfile(object):
+    """
+    The timings of the steps of a build, in the order they ran.
+    """
+
+    def __init__(self, steps=None):
+        self.steps = list(steps or [])
+        self.duration = None
+        self.image_id = None
+
+    def slowest(self, count=None):
+        """
+        Returns the timings of the steps, slowest first.
+        """
+        steps = sorted(self.steps, key=lambda s: s.duration, reverse=True)
+        return steps if count is None else steps[:count]
+
+    def report(self, count=None):
+        """
+        Returns a text table of the steps, slowest first.
+        """
+        lines = ['{0:>5} {1:>10} {2:>6}  {3}'.format(
+            'STEP', 'SECONDS', 'CACHED', 'INSTRUCTION'
+        )]
+        for s in self.slowest(count):
+            lines.append('{0:>5} {1:>10.3f} {2:>6}  {3}'.format(
+                s.step, s.duration, 'yes' if s.cached else 'no',
+                s.instruction
+            ))
+        if self.duration is not None:
+            lines.append('{0:>5} {1:>10.3f}'.format('TOTAL', self.duration))
+        return '\n'.join(lines)
+
+
+def aggregate_profiles(profiles, key=instruction_name):
+    """
+    Returns the `InstructionTiming` of the steps of `profiles` grouped by
+    `key` (by default, the kind of instruction: RUN, COPY...), the most
+    costly first, to find out what builds spend their time on.
+    """
+    groups = {}
+    for profile in profiles:
+        for s in profile.steps:
+            groups.setdefault(key(s.instruction), []).append(s)
+    timings = []
+    for name, steps in groups.items():
+        total = sum(s.duration for s in steps)
+        timings.append(InstructionTiming(
+            name, len(steps), sum(1 for s in steps if s.cached), total,
+            total / len(steps), max(s.duration for s in steps)
+        ))
+    timings.sort(key=lambda t: t.total, reverse=True)
+    return timings
+
+
+class BuildProgress(object):
+    """
+    Iterator of the events of a build, from the decoded output of
+    `Client.build(decode=True)`: `StepStarted`, `CacheHit`, `LayerCreated`,
+    `StepFinished`, `BuildOutput` for the other lines, `BuildFailed` and
+    `BuildFinished`. Times are given by `clock`.
+
+    Once the output has been consumed, `profile` holds the timings of the
+    steps.
+    """
+
+    def __init__(self, output, clock=time.time):
+        self.output = output
+        self.clock = clock
+        self.profile = BuildProfile()
+        self._events = self._parse()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return next(self._events)
+
+    next = __next__
+
+    def _lines(self):
+        # Lines can be split across messages, or share one
+        pending = ''
+        for message in self.output:
+            if not isinstance(message, dict):
+                continue
+            if 'stream' in message:
+                text = message['stream']
+                if isinstance(text, six.binary_type):
+                    text = text.decode('utf-8', 'replace')
+                pending += text
+                lines = pending.split('\n')
+                pending = lines.pop()
+                for line in lines:
+                    yield line.rstrip('\r'), None
+            else:
+                yield None, message
+        if pending:
+            yield pending.rstrip('\r'), None
+
+    def _parse(self):
+        started = self.clock()
+        step = None
+        image_id = None
+
+        for line, message in self._lines():
+            now = self.clock()
+            if message is not None:
+                if 'error' in message:
+                    yield BuildFailed(
+                        step and step['step'], message['error'],
+                        message.get('errorDetail'), now
+                    )
+                elif isinstance(message.get('aux'), dict) and \
+                        'ID' in message['aux']:
+                    image_id = message['aux']['ID']
+                continue
+
+            match = STEP_RE.match(line)
+            if match:
+                if step is not None:
+                    yield self._finish_step(step, now)
+                step = {
+                    'step': int(match.group(1)),
+                    'instruction': match.group(3).strip(),
+                    'started': now,
+                    'cached': False,
+                    'layer_id': None,
+                }
+                yield StepStarted(
+                    step['step'],
+                    int(match.group(2)) if match.group(2) else None,
+                    step['instruction'], now
+                )
+                continue
+
+            if step is not None:
+                if line == CACHE_LINE:
+                    step['cached'] = True
+                    yield CacheHit(step['step'], step['instruction'], now)
+                    continue
+                match = LAYER_RE.match(line)
+                if match:
+                    step['layer_id'] = match.group(1)
+                    yield LayerCreated(step['step'], match.group(1), now)
+                    continue
+
+            match = BUILT_RE.match(line)
+            if match:
+                # Daemons which send the full ID send it first
+                image_id = image_id or match.group(1)
+                if step is not None:
+                    yield self._finish_step(step, now)
+                    step = None
+            yield BuildOutput(step and step['step'], line, now)
+
+        now = self.clock()
+        if step is not None:
+            yield self._finish_step(step, now)
+        self.profile.duration = now - started
+        self.profile.image_id = image_id
+        if image_id is not None:
+            yield BuildFinished(image_id, now - started, now)
+
+    def _finish_step(self, step, now):
+        duration = now - step['started']
+        self.profile.steps.append(StepTiming(
+            step['step'], step['instruction'], duration, step['cached'],
+            step['layer_id']
+        ))
+        return StepFinished(
+            step['step'], step['instruction'], duration, step['cached'],
+            step['layer_id'], now
+        )
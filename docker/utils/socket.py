@@ -5,11 +5,20 @@ import struct
 
 import six
 
+from ..constants import STREAM_HEADER_SIZE_BYTES
+
 try:
     from ..transport import NpipeSocket
 except ImportError:
     NpipeSocket = type(None)
 
+STDOUT = 1
+STDERR = 2
+
+RECV_BUFFER_SIZE = 65536
+RECOVERABLE_ERRORS = (errno.EINTR, errno.EDEADLK, errno.EWOULDBLOCK)
+HAS_MEMORYVIEW = hasattr(six.moves.builtins, 'memoryview')
+
 
 class SocketError(Exception):
     pass
@@ -20,8 +29,6 @@ def read(socket, n=4096):
     Reads at most n bytes from socket
     """
 
-    recoverable_errors = (errno.EINTR, errno.EDEADLK, errno.EWOULDBLOCK)
-
     # wait for data to become available
     if not isinstance(socket, NpipeSocket):
         select.select([socket], [], [])
@@ -31,7 +38,7 @@ def read(socket, n=4096):
             return socket.recv(n)
         return os.read(socket.fileno(), n)
     except EnvironmentError as e:
-        if e.errno not in recoverable_errors:
+        if e.errno not in RECOVERABLE_ERRORS:
             raise
 
 
@@ -65,11 +72,149 @@ def next_frame_size(socket):
     return actual
 
 
-def frames_iter(socket):
+class FrameReader(object):
+    """
+    Reads multiplexed frames from socket through a large receive buffer, as
+    (stream id, data) tuples.
+
+    Each receive fills as much of the buffer as the socket has available, and
+    frame headers and payloads are parsed out of it in place, so a burst of
+    small frames costs a single syscall. select() is only called when the
+    buffer has run dry and the socket (or its TLS layer) has nothing pending.
+    """
+
+    def __init__(self, socket, bufsize=RECV_BUFFER_SIZE):
+        self._socket = socket
+        self._buf = bytearray(bufsize)
+        self._start = 0
+        self._end = 0
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        while True:
+            if not self._fill(STREAM_HEADER_SIZE_BYTES):
+                raise StopIteration
+            stream_id, length = struct.unpack_from(
+                '>BxxxL', self._buf, self._start
+            )
+            self._start += STREAM_HEADER_SIZE_BYTES
+            if not length:
+                continue
+            if not self._fill(length):
+                raise StopIteration
+            start = self._start
+            self._start += length
+            if HAS_MEMORYVIEW:
+                # A single copy, where slicing the bytearray would make two
+                frame = memoryview(self._buf)[start:self._start].tobytes()
+            else:
+                frame = six.binary_type(self._buf[start:self._start])
+            return stream_id, frame
+
+    next = __next__
+
+    def _fill(self, n):
+        """
+        Makes sure at least n unread bytes are in the buffer. Returns False
+        if the socket reaches EOF first.
+        """
+        while self._end - self._start < n:
+            if self._start:
+                # Move the unread tail to the front of the buffer
+                unread = self._end - self._start
+                self._buf[:unread] = self._buf[self._start:self._end]
+                self._start, self._end = 0, unread
+            if len(self._buf) < n:
+                self._buf.extend(bytearray(n - len(self._buf)))
+
+            received = self._recv()
+            if received == 0:
+                return False
+            self._end += received or 0
+        return True
+
+    def _recv(self):
+        """
+        Receives data at the end of the buffer. Returns the number of bytes
+        received, 0 on EOF or None if the read should be retried.
+        """
+        socket = self._socket
+        if not isinstance(socket, NpipeSocket):
+            pending = getattr(socket, 'pending', None)
+            if not (pending and pending()):
+                select.select([socket], [], [])
+
+        end = self._end
+        try:
+            if HAS_MEMORYVIEW and hasattr(socket, 'recv_into'):
+                return socket.recv_into(memoryview(self._buf)[end:])
+            if HAS_MEMORYVIEW and hasattr(socket, 'readinto'):
+                return socket.readinto(memoryview(self._buf)[end:])
+            # Python 2.6 can't receive into the middle of a buffer
+            size = len(self._buf) - end
+            if hasattr(socket, 'recv'):
+                data = socket.recv(size)
+            else:
+                data = os.read(socket.fileno(), size)
+            self._buf[end:end + len(data)] = data
+            return len(data)
+        except EnvironmentError as e:
+            if e.errno not in RECOVERABLE_ERRORS:
+                raise
+
+
+def frames_iter(socket, demux=False):
+    """
+    Returns a generator of frames read from socket. With demux, frames are
+    (stdout, stderr) tuples instead; see demux_frames.
+    """
+    frames = FrameReader(socket)
+    if demux:
+        return demux_frames(frames)
+    return (data for _, data in frames)
+
+
+def buffer_frames(buf):
+    """
+    Returns a generator of the (stream id, data) frames contained in buf, a
+    fully read multiplexed stream. On Python 3, data are memoryview slices of
+    buf, so nothing is copied until they are joined.
+    """
+    # str.join() doesn't accept memoryviews on Python 2, where slicing the
+    # str itself is the cheapest option.
+    view = buf if six.PY2 else memoryview(buf)
+    size = len(view)
+    walker = 0
+    while walker + STREAM_HEADER_SIZE_BYTES <= size:
+        stream_id, length = struct.unpack_from('>BxxxL', buf, walker)
+        start = walker + STREAM_HEADER_SIZE_BYTES
+        walker = start + length
+        yield stream_id, view[start:walker]
+
+
+def demux_frames(frames):
+    """
+    Turns (stream id, data) frames into (stdout, stderr) tuples, where the
+    stream the data was not written to is None.
+    """
+    for stream_id, data in frames:
+        if stream_id == STDERR:
+            yield None, data
+        else:
+            yield data, None
+
+
+def consume_frames(frames, demux=False):
     """
-    Returns a generator of frames read from socket
+    Joins the data of (stream id, data) frames into a single bytes object,
+    or with demux into a (stdout, stderr) tuple of bytes objects.
     """
-    n = next_frame_size(socket)
-    while n > 0:
-        yield read(socket, n)
-        n = next_frame_size(socket)
+    sep = six.binary_type()
+    if not demux:
+        return sep.join(data for _, data in frames)
+    stdout, stderr = [], []
+    for stream_id, data in frames:
+        (stderr if stream_id == STDERR else stdout).append(data)
+    return sep.join(stdout), sep.join(stderr)
@@ -3,14 +3,13 @@ import io
 import os
 import os.path
 import json
+import re
 import shlex
-import sys
 import tarfile
 import tempfile
 import warnings
 from distutils.version import StrictVersion
 from datetime import datetime
-from fnmatch import fnmatch
 
 import requests
 import six
@@ -19,6 +18,8 @@ from .. import constants
 from .. import errors
 from .. import tls
 from ..types import Ulimit, LogConfig
+from .build import iter_paths, memory_tar_stream, scan_context, tar_stream
+from .dockerignore import PatternMatcher
 
 if six.PY2:
     from urllib import splitnport
@@ -29,6 +30,10 @@ DEFAULT_HTTP_HOST = "127.0.0.1"
 DEFAULT_UNIX_SOCKET = "http+unix://var/run/docker.sock"
 DEFAULT_NPIPE = 'npipe:////./pipe/docker_engine'
 
+VERSION_ERROR_RE = re.compile(
+    r'client is newer than server|client version \S+ is too (new|old)'
+)
+
 BYTE_UNITS = {
     'b': 1,
     'k': 1024,
@@ -55,7 +60,11 @@ def create_ipam_config(driver='default', pool_configs=None):
 
 
 def mkbuildcontext(dockerfile):
-    f = tempfile.NamedTemporaryFile()
+    if isinstance(dockerfile, (io.StringIO, io.BytesIO)):
+        # An in-memory Dockerfile makes an in-memory context
+        f = io.BytesIO()
+    else:
+        f = tempfile.NamedTemporaryFile()
     t = tarfile.open(mode='w', fileobj=f)
     if isinstance(dockerfile, io.StringIO):
         dfinfo = tarfile.TarInfo('Dockerfile')
@@ -77,6 +86,20 @@ def mkbuildcontext(dockerfile):
     return f
 
 
+def memory_tar(files, fileobj=None, gzip=False, gzip_level=None):
+    """
+    Writes the tar archive of the build context made of `files`, as
+    described in `memory_tar_stream`, to `fileobj` (a new BytesIO by
+    default), and returns it rewound.
+    """
+    if fileobj is None:
+        fileobj = io.BytesIO()
+    for data in memory_tar_stream(files, gzip=gzip, gzip_level=gzip_level):
+        fileobj.write(data)
+    fileobj.seek(0)
+    return fileobj
+
+
 def decode_json_header(header):
     data = base64.b64decode(header)
     if six.PY3:
@@ -84,32 +107,16 @@ def decode_json_header(header):
     return json.loads(data)
 
 
-def tar(path, exclude=None, dockerfile=None, fileobj=None, gzip=False):
+def tar(path, exclude=None, dockerfile=None, fileobj=None, gzip=False,
+        workers=None, cache=None, sources=None, gzip_level=None,
+        gzip_workers=None):
     if not fileobj:
         fileobj = tempfile.NamedTemporaryFile()
-    t = tarfile.open(mode='w:gz' if gzip else 'w', fileobj=fileobj)
-
-    root = os.path.abspath(path)
-    exclude = exclude or []
-
-    for path in sorted(exclude_paths(root, exclude, dockerfile=dockerfile)):
-        i = t.gettarinfo(os.path.join(root, path), arcname=path)
-
-        if sys.platform == 'win32':
-            # Windows doesn't keep track of the execute bit, so we make files
-            # and directories executable by default.
-            i.mode = i.mode & 0o755 | 0o111
-
-        try:
-            # We open the file object in binary mode for Windows support.
-            f = open(os.path.join(root, path), 'rb')
-        except IOError:
-            # When we encounter a directory the file object is set to None.
-            f = None
-
-        t.addfile(i, f)
-
-    t.close()
+    for data in tar_stream(path, exclude=exclude, dockerfile=dockerfile,
+                           gzip=gzip, workers=workers, cache=cache,
+                           sources=sources, gzip_level=gzip_level,
+                           gzip_workers=gzip_workers):
+        fileobj.write(data)
     fileobj.seek(0)
     return fileobj
 
@@ -122,26 +129,7 @@ def exclude_paths(root, patterns, dockerfile=None):
 
     All paths returned are relative to the root.
     """
-    if dockerfile is None:
-        dockerfile = 'Dockerfile'
-
-    exceptions = [p for p in patterns if p.startswith('!')]
-
-    include_patterns = [p[1:] for p in exceptions]
-    include_patterns += [dockerfile, '.dockerignore']
-
-    exclude_patterns = list(set(patterns) - set(exceptions))
-
-    paths = get_paths(root, exclude_patterns, include_patterns,
-                      has_exceptions=len(exceptions) > 0)
-
-    return set(paths).union(
-        # If the Dockerfile is in a subdirectory that is excluded, get_paths
-        # will not descend into it and the file will be skipped. This ensures
-        # it doesn't happen.
-        set([dockerfile])
-        if os.path.exists(os.path.join(root, dockerfile)) else set()
-    )
+    return set(iter_paths(root, patterns, dockerfile=dockerfile))
 
 
 def should_include(path, exclude_patterns, include_patterns):
@@ -154,64 +142,43 @@ def should_include(path, exclude_patterns, include_patterns):
     3. Returns true if the path matches an exclusion pattern and matches an
        inclusion pattern
     """
-    for pattern in exclude_patterns:
-        if match_path(path, pattern):
-            for pattern in include_patterns:
-                if match_path(path, pattern):
-                    return True
-            return False
-    return True
+    matcher = PatternMatcher(exclude_patterns, include_patterns)
+    return matcher.includes(path.replace(os.sep, '/'))
 
 
 def get_paths(root, exclude_patterns, include_patterns, has_exceptions=False):
-    paths = []
+    # has_exceptions is no longer needed, as the matcher knows in which
+    # directories the exceptions can match.
+    matcher = PatternMatcher(exclude_patterns, include_patterns)
+    return [path for path, _ in scan_context(root, matcher)]
 
-    for parent, dirs, files in os.walk(root, topdown=True, followlinks=False):
-        parent = os.path.relpath(parent, root)
-        if parent == '.':
-            parent = ''
 
-        # If exception rules exist, we can't skip recursing into ignored
-        # directories, as we need to look for exceptions in them.
-        #
-        # It may be possible to optimize this further for exception patterns
-        # that *couldn't* match within ignored directores.
-        #
-        # This matches the current docker logic (as of 2015-11-24):
-        # https://github.com/docker/docker/blob/37ba67bf636b34dc5c0c0265d62a089d0492088f/pkg/archive/archive.go#L555-L557
-
-        if not has_exceptions:
-
-            # Remove excluded patterns from the list of directories to traverse
-            # by mutating the dirs we're iterating over.
-            # This looks strange, but is considered the correct way to skip
-            # traversal. See https://docs.python.org/2/library/os.html#os.walk
-
-            dirs[:] = [d for d in dirs if
-                       should_include(os.path.join(parent, d),
-                                      exclude_patterns, include_patterns)]
-
-        for path in dirs:
-            if should_include(os.path.join(parent, path),
-                              exclude_patterns, include_patterns):
-                paths.append(os.path.join(parent, path))
+def match_path(path, pattern):
+    return PatternMatcher([pattern]).excludes(path.replace(os.sep, '/'))
 
-        for path in files:
-            if should_include(os.path.join(parent, path),
-                              exclude_patterns, include_patterns):
-                paths.append(os.path.join(parent, path))
 
-    return paths
+# Plain "major.minor[.patch]" versions, compared as tuples of ints
+SIMPLE_VERSION_RE = re.compile(r'^(\d+)\.(\d+)(?:\.(\d+))?$')
+PARSED_VERSIONS_MAX = 1024
+_parsed_versions = {}
 
 
-def match_path(path, pattern):
-    pattern = pattern.rstrip('/')
-    if pattern:
-        pattern = os.path.relpath(pattern)
-
-    pattern_components = pattern.split(os.path.sep)
-    path_components = path.split(os.path.sep)[:len(pattern_components)]
-    return fnmatch('/'.join(path_components), pattern)
+def parse_version(v):
+    """Parses a docker version, remembering the result as only a handful
+    of versions are ever compared. Plain versions are turned into
+    (major, minor, patch) tuples; others (e.g. "1.10.0b1") are left to
+    StrictVersion.
+    """
+    parsed = _parsed_versions.get(v)
+    if parsed is None:
+        match = SIMPLE_VERSION_RE.match(v)
+        if match:
+            parsed = tuple(int(x or 0) for x in match.groups())
+        else:
+            parsed = StrictVersion(v)
+        if len(_parsed_versions) < PARSED_VERSIONS_MAX:
+            _parsed_versions[v] = parsed
+    return parsed
 
 
 def compare_version(v1, v2):
@@ -226,8 +193,11 @@ def compare_version(v1, v2):
     >>> compare_version(v2, v2)
     0
     """
-    s1 = StrictVersion(v1)
-    s2 = StrictVersion(v2)
+    s1 = parse_version(v1)
+    s2 = parse_version(v2)
+    if type(s1) is not type(s2):
+        s1 = StrictVersion(v1)
+        s2 = StrictVersion(v2)
     if s1 == s2:
         return 0
     elif s1 > s2:
@@ -244,6 +214,36 @@ def version_gte(v1, v2):
     return not version_lt(v1, v2)
 
 
+_api_features = {}
+
+
+def api_features(version):
+    """Returns the set of the features of constants.API_FEATURES which
+    API `version` supports."""
+    features = _api_features.get(version)
+    if features is None:
+        features = frozenset(
+            name for name, minimum in constants.API_FEATURES.items()
+            if version_gte(version, minimum)
+        )
+        if len(_api_features) < PARSED_VERSIONS_MAX:
+            _api_features[version] = features
+    return features
+
+
+def is_version_error(response):
+    """
+    Whether the daemon rejected a request because of the API version it
+    was made with.
+    """
+    if response.status_code not in (400, 404):
+        return False
+    try:
+        return VERSION_ERROR_RE.search(response.text) is not None
+    except Exception:
+        return False
+
+
 def ping_registry(url):
     warnings.warn(
         'The `ping_registry` method is deprecated and will be removed.',
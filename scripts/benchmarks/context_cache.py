@@ -0,0 +1,63 @@
+#!/usr/bin/env python
+"""
+Compare archiving a build context without a ContextCache, with a cold one
+and with a warm one.
+
+A synthetic tree is created in a temporary directory and removed
+afterwards.
+
+Usage: python scripts/benchmarks/context_cache.py [number of files]
+                                                  [file size in bytes]
+(with docker-py installed, or PYTHONPATH pointing at the repository root)
+"""
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from docker.cache import ContextCache
+from docker.utils.build import tar_stream
+
+
+def make_tree(base, count, size):
+    mtime = time.time() - 60
+    for i in range(count):
+        directory = os.path.join(base, 'pkg{0}'.format(i % 100))
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        path = os.path.join(directory, 'f{0}.bin'.format(i))
+        with open(path, 'wb') as f:
+            f.write(os.urandom(size))
+        os.utime(path, (mtime, mtime))
+
+
+def archive(base, cache=None):
+    start = time.time()
+    size = sum(len(data) for data in tar_stream(base, cache=cache))
+    return time.time() - start, size
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    size = int(sys.argv[2]) if len(sys.argv) > 2 else 64 * 1024
+    base = tempfile.mkdtemp()
+    cache_dir = tempfile.mkdtemp()
+    try:
+        make_tree(base, count, size)
+        cache = ContextCache(cache_dir)
+        for name, run in (('no cache', lambda: archive(base)),
+                          ('cold cache', lambda: archive(base, cache)),
+                          ('warm cache', lambda: archive(base, cache))):
+            elapsed, total = run()
+            print('{0:>12}: {1:.3f}s for {2} bytes'.format(
+                name, elapsed, total
+            ))
+        print('{0:>12}: {1}'.format('stats', cache.stats()))
+    finally:
+        shutil.rmtree(base)
+        shutil.rmtree(cache_dir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+#!/usr/bin/env python
+"""
+Compare the ways of archiving a build context made of many small files:
+os.walk followed by TarFile.gettarinfo for every path, as utils.tar
+previously did, and tar_stream's scandir walker, with and without worker
+threads.
+
+A synthetic tree is created in a temporary directory (or in the directory
+given with --dir, e.g. on a network file system) and removed afterwards.
+--latency adds a delay to every directory listing and file opening, to
+simulate a network file system.
+
+Usage: python scripts/benchmarks/context_walker.py [number of files]
+                        [--dir DIR] [--workers N] [--latency MILLISECONDS]
+(with docker-py installed, or PYTHONPATH pointing at the repository root)
+"""
+import argparse
+import os
+import shutil
+import tarfile
+import tempfile
+import time
+
+from docker.utils import build
+from docker.utils.build import tar_stream
+
+
+class NullFile(object):
+    def write(self, data):
+        pass
+
+
+def make_tree(base, count):
+    for i in range(count):
+        directory = os.path.join(
+            base, 'pkg{0}'.format(i % 100), 'sub{0}'.format(i % 7)
+        )
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        with open(os.path.join(directory, 'f{0}.py'.format(i)), 'w') as f:
+            f.write('x = {0}\n'.format(i))
+
+
+def add_latency(latency):
+    scan_directory = build.scan_directory
+
+    def slow_scan_directory(directory):
+        time.sleep(latency)
+        return scan_directory(directory)
+
+    def slow_open(*args, **kwargs):
+        time.sleep(latency)
+        return open(*args, **kwargs)
+
+    build.scan_directory = slow_scan_directory
+    build.open = slow_open
+
+
+def walk_gettarinfo(root):
+    # The approach previously used: walk first, then stat every path again
+    paths = []
+    for parent, dirs, files in os.walk(root):
+        parent = os.path.relpath(parent, root)
+        if parent == '.':
+            parent = ''
+        for name in dirs + files:
+            paths.append(os.path.join(parent, name))
+
+    t = tarfile.open(mode='w|', fileobj=NullFile())
+    for path in sorted(paths):
+        info = t.gettarinfo(os.path.join(root, path), arcname=path)
+        if info.isreg():
+            with open(os.path.join(root, path), 'rb') as f:
+                t.addfile(info, f)
+        else:
+            t.addfile(info)
+    t.close()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('count', type=int, nargs='?', default=100000)
+    parser.add_argument('--dir')
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--latency', type=float, default=0)
+    args = parser.parse_args()
+
+    base = tempfile.mkdtemp(dir=args.dir)
+    try:
+        make_tree(base, args.count)
+        runs = (
+            ('os.walk + gettarinfo', lambda: walk_gettarinfo(base)),
+        )
+        if args.latency:
+            # Only the new walker is slowed down, so skip the old one
+            add_latency(args.latency / 1000.0)
+            runs = ()
+        runs += (
+            ('scandir walker', lambda: list(tar_stream(base))),
+            ('scandir walker, {0} threads'.format(args.workers),
+             lambda: list(tar_stream(base, workers=args.workers))),
+        )
+        for name, run in runs:
+            start = time.time()
+            run()
+            print('{0:>28}: {1:.3f}s'.format(name, time.time() - start))
+    finally:
+        shutil.rmtree(base)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+#!/usr/bin/env python
+"""
+Compare the ways of demultiplexing a fully read logs/attach response, as done
+by Client._multiplexed_buffer_helper for logs(stream=False).
+
+The payload is a synthetic multiplexed stream of small log lines alternating
+between stdout and stderr, like the output of a chatty container.
+
+Usage: python scripts/benchmarks/demux_buffer.py [size in MB]
+(with docker-py installed, or PYTHONPATH pointing at the repository root)
+"""
+import struct
+import sys
+import time
+
+import six
+
+from docker.utils.socket import buffer_frames
+
+
+def make_payload(size):
+    line = b'2016-10-16T12:00:00Z level=info msg="request served" status=200\n'
+    frames = [
+        struct.pack('>BxxxL', stream, len(line)) + line for stream in (1, 2)
+    ]
+    count = size // (2 * len(frames[0]))
+    return b''.join(frames) * count, count * 2 * len(line)
+
+
+def slicing_walker(buf):
+    # The loop previously used, which copies the rest of the buffer twice
+    # for every frame.
+    walker = 0
+    while True:
+        if len(buf[walker:]) < 8:
+            break
+        stream_id, length = struct.unpack_from('>BxxxL', buf[walker:])
+        start = walker + 8
+        end = start + length
+        walker = end
+        yield stream_id, buf[start:end]
+
+
+def main():
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 2
+    buf, expected = make_payload(size * 1024 * 1024)
+    for name, walker in (('slicing walker', slicing_walker),
+                         ('memoryview walker', buffer_frames)):
+        start = time.time()
+        output = six.binary_type().join(data for _, data in walker(buf))
+        elapsed = time.time() - start
+        assert len(output) == expected
+        print('{0:>18}: {1:8.1f} MB/s ({2:.3f}s)'.format(
+            name, len(buf) / elapsed / 1024 / 1024, elapsed
+        ))
+
+
+if __name__ == '__main__':
+    main()
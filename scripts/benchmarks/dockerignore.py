@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+"""
+Compare the ways of matching build context paths against .dockerignore
+patterns: fnmatch against every pattern, as previously done by
+should_include, and the compiled PatternMatcher.
+
+Paths are synthetic, so that only matching is measured, not walking.
+
+Usage: python scripts/benchmarks/dockerignore.py [number of paths]
+(with docker-py installed, or PYTHONPATH pointing at the repository root)
+"""
+import os
+import sys
+import time
+from fnmatch import fnmatch
+
+from docker.utils.dockerignore import PatternMatcher
+
+EXCLUDE = [
+    '.git', '*.pyc', '**/__pycache__', 'node_modules', 'build/*', 'dist',
+    '*.log', 'docs/_build', 'tmp*', '**/*.swp'
+]
+INCLUDE = ['build/keep', '*.md', 'Dockerfile', '.dockerignore']
+
+
+def make_paths(count):
+    paths = []
+    i = 0
+    while len(paths) < count:
+        top = ['src', 'lib', 'tests', 'build', 'node_modules'][i % 5]
+        paths.append('{0}/pkg{1}/mod{2}.py'.format(top, i % 97, i))
+        paths.append('{0}/pkg{1}/README.md'.format(top, i % 89))
+        i += 1
+    return paths[:count]
+
+
+def match_path(path, pattern):
+    pattern = pattern.rstrip('/')
+    if pattern:
+        pattern = os.path.relpath(pattern)
+
+    pattern_components = pattern.split(os.path.sep)
+    path_components = path.split(os.path.sep)[:len(pattern_components)]
+    return fnmatch('/'.join(path_components), pattern)
+
+
+def fnmatch_includes(path):
+    # The loop previously used, which normalizes and splits every pattern
+    # and the path for each check.
+    for pattern in EXCLUDE:
+        if match_path(path, pattern):
+            for pattern in INCLUDE:
+                if match_path(path, pattern):
+                    return True
+            return False
+    return True
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    paths = make_paths(count)
+    matcher = PatternMatcher(EXCLUDE, INCLUDE)
+    for name, includes in (('fnmatch', fnmatch_includes),
+                           ('PatternMatcher', matcher.includes)):
+        start = time.time()
+        included = sum(1 for path in paths if includes(path))
+        elapsed = time.time() - start
+        print('{0:>15}: {1:8.3f}s for {2} paths ({3} included)'.format(
+            name, elapsed, len(paths), included
+        ))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+#!/usr/bin/env python
+"""
+Compare the ways of compressing a build context archive: tarfile's gzip
+stream mode, as tar_stream previously did, and gzip_stream, with and
+without worker threads.
+
+The data is a mix of random and repetitive blocks, so that it compresses
+roughly like source trees do.
+
+Usage: python scripts/benchmarks/gzip_stream.py [megabytes]
+                                                [--workers N] [--level L]
+(with docker-py installed, or PYTHONPATH pointing at the repository root)
+"""
+import argparse
+import os
+import tarfile
+import time
+
+from docker.utils.build import BlockBuffer
+from docker.utils.compression import gzip_stream
+from docker.utils.concurrency import ThreadPool
+
+BLOCK_SIZE = 65536
+
+
+def make_blocks(megabytes):
+    text = b'def function_{0}(argument):\n    return argument * 2\n' * 600
+    blocks = []
+    for i in range(megabytes * 1024 * 1024 // BLOCK_SIZE):
+        if i % 4:
+            blocks.append(text[:BLOCK_SIZE])
+        else:
+            blocks.append(os.urandom(BLOCK_SIZE))
+    return blocks
+
+
+def tarfile_gzip(blocks):
+    buf = BlockBuffer()
+    stream = tarfile._Stream(None, 'w', 'gz', buf, BLOCK_SIZE)
+    size = 0
+    for data in blocks:
+        stream.write(data)
+        size += len(buf.pop())
+    stream.close()
+    return size + len(buf.pop())
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('megabytes', type=int, nargs='?', default=256)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--level', type=int, default=9)
+    args = parser.parse_args()
+    blocks = make_blocks(args.megabytes)
+
+    def parallel():
+        with ThreadPool(args.workers) as pool:
+            return sum(len(data) for data in gzip_stream(
+                iter(blocks), args.level, pool
+            ))
+
+    runs = (
+        ('tarfile w|gz', lambda: tarfile_gzip(blocks)),
+        ('gzip_stream', lambda: sum(
+            len(data) for data in gzip_stream(iter(blocks), args.level)
+        )),
+        ('gzip_stream, {0} threads'.format(args.workers), parallel),
+    )
+    for name, run in runs:
+        start = time.time()
+        size = run()
+        print('{0:>24}: {1:.3f}s, {2} bytes'.format(
+            name, time.time() - start, size
+        ))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+#!/usr/bin/env python
+"""
+Compare create_host_config with the StrictVersion-based version comparison
+it used to rely on and with the memoized tuple comparison.
+
+create_host_config checks the API version once for nearly every option, so
+it is a good proxy for the cost of version checks on each request.
+
+Usage: python scripts/benchmarks/host_config.py [iterations]
+(with docker-py installed, or PYTHONPATH pointing at the repository root)
+"""
+import sys
+import time
+from distutils.version import StrictVersion
+
+from docker.utils import utils
+
+
+def strict_compare_version(v1, v2):
+    # The implementation previously used, which parses both versions on
+    # every call.
+    s1 = StrictVersion(v1)
+    s2 = StrictVersion(v2)
+    if s1 == s2:
+        return 0
+    elif s1 > s2:
+        return -1
+    else:
+        return 1
+
+
+def make_host_config():
+    return utils.create_host_config(
+        version='1.24', binds={'/tmp': {'bind': '/mnt', 'mode': 'ro'}},
+        port_bindings={8080: 80}, mem_limit='512m', memswap_limit='1g',
+        mem_reservation='256m', kernel_memory='64m', shm_size='64m',
+        cpu_quota=50000, cpu_period=100000, oom_kill_disable=True,
+        oom_score_adj=100, pids_limit=128, userns_mode='host',
+        dns_opt=['ndots:2'], tmpfs=['/run'], sysctls={'net.core.somaxconn': 1},
+        restart_policy={'Name': 'always'}, privileged=False
+    )
+
+
+def run(iterations):
+    start = time.time()
+    for _ in range(iterations):
+        make_host_config()
+    return time.time() - start
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    compare_version = utils.compare_version
+    for name, compare in (('StrictVersion', strict_compare_version),
+                          ('memoized tuples', compare_version)):
+        utils.compare_version = compare
+        try:
+            elapsed = run(iterations)
+        finally:
+            utils.compare_version = compare_version
+        print('{0:>16}: {1:8.1f} us/call ({2:.3f}s)'.format(
+            name, elapsed / iterations * 1e6, elapsed
+        ))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+"""
+Compare the chunked-stream readers used by Client._stream_helper.
+
+A synthetic chunked response made of small JSON progress messages (like the
+ones sent by pull, build and events) is served over a socket pair, and each
+reader decodes it through a real http.client response.
+
+Usage: python scripts/benchmarks/stream_helper.py [size in MB]
+(with docker-py installed, or PYTHONPATH pointing at the repository root)
+"""
+import json
+import socket
+import sys
+import threading
+import time
+
+from six.moves import http_client
+
+from docker.utils.chunked import read_chunks
+
+
+def make_body(size):
+    message = json.dumps({
+        'status': 'Downloading',
+        'progressDetail': {'current': 1048576, 'total': 2097152},
+        'id': 'a3ed95caeb02'
+    }).encode('utf-8') + b'\r\n'
+    chunk = '{0:x}\r\n'.format(len(message)).encode() + message + b'\r\n'
+    count = size // len(message)
+    return chunk * count + b'0\r\n\r\n', count * len(message)
+
+
+def serve(sock, body):
+    sock.sendall(
+        b'HTTP/1.1 200 OK\r\nTransfer-Encoding: chunked\r\n\r\n' + body
+    )
+    sock.close()
+
+
+def legacy_reader(response):
+    # The per-chunk read(1) + read(chunk_left) loop previously used
+    while not response.isclosed():
+        data = response.read(1)
+        if not data:
+            break
+        if response.chunk_left:
+            data += response.read(response.chunk_left)
+        yield data
+
+
+def buffered_reader(response):
+    return read_chunks(response.fp)
+
+
+def run(reader, body):
+    server, client = socket.socketpair()
+    thread = threading.Thread(target=serve, args=(server, body))
+    thread.start()
+    response = http_client.HTTPResponse(client)
+    response.begin()
+
+    start = time.time()
+    total = 0
+    for data in reader(response):
+        total += len(data)
+    elapsed = time.time() - start
+
+    thread.join()
+    client.close()
+    return total, elapsed
+
+
+def main():
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 16
+    body, payload = make_body(size * 1024 * 1024)
+    for name, reader in (('read(1)+read(chunk_left)', legacy_reader),
+                         ('buffered read_chunks', buffered_reader)):
+        total, elapsed = run(reader, body)
+        assert total == payload
+        print('{0:>26}: {1:8.1f} MB/s ({2:.3f}s)'.format(
+            name, total / elapsed / 1024 / 1024, elapsed
+        ))
+
+
+if __name__ == '__main__':
+    main()
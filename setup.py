@@ -15,6 +15,17 @@ requirements = [
     'docker-pycreds >= 0.2.1'
 ]
 
+packages = [
+    'docker', 'docker.api', 'docker.auth', 'docker.transport',
+    'docker.utils', 'docker.utils.ports', 'docker.ssladapter',
+    'docker.types',
+]
+
+# The asyncio client relies on async generators, which older interpreters
+# can't even compile.
+if sys.version_info >= (3, 6):
+    packages += ['docker.aio', 'docker.aio.api']
+
 if sys.platform == 'win32':
     requirements.append('pypiwin32 >= 219')
 
@@ -48,11 +59,7 @@ setup(
     description="Python client for Docker.",
     long_description=long_description,
     url='https://github.com/docker/docker-py/',
-    packages=[
-        'docker', 'docker.api', 'docker.auth', 'docker.transport',
-        'docker.utils', 'docker.utils.ports', 'docker.ssladapter',
-        'docker.types',
-    ],
+    packages=packages,
     install_requires=requirements,
     tests_require=test_requirements,
     extras_require=extras_require,
@@ -0,0 +1,237 @@
+import asyncio
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+import docker
+from docker.aio import AsyncClient
+
+from .. import base
+from . import fake_api
+
+
+def run(coro):
+    return asyncio.get_event_loop().run_until_complete(coro)
+
+
+async def collect(agen):
+    return [x async for x in agen]
+
+
+class FakeDaemon(object):
+    """A minimal HTTP/1.1 server on a UNIX socket answering from
+    `fake_api.fake_responses`. Events and container logs are sent with
+    chunked transfer encoding, like the real daemon does."""
+
+    def __init__(self, socket_path):
+        self.socket_path = socket_path
+        self.requests = []
+        self.connections = 0
+        self.server = None
+        self.handlers = []
+
+    async def start(self):
+        self.server = await asyncio.start_unix_server(
+            self.handle, path=self.socket_path
+        )
+
+    async def stop(self):
+        self.server.close()
+        await self.server.wait_closed()
+        for handler in self.handlers:
+            handler.cancel()
+        await asyncio.gather(*self.handlers, return_exceptions=True)
+
+    async def handle(self, reader, writer):
+        self.connections += 1
+        self.handlers.append(asyncio.current_task())
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, path, _ = request_line.decode().split(' ', 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b''):
+                        break
+                    k, v = line.decode().split(':', 1)
+                    headers[k.strip().lower()] = v.strip()
+                body = b''
+                if 'content-length' in headers:
+                    body = await reader.readexactly(
+                        int(headers['content-length'])
+                    )
+                elif headers.get('transfer-encoding') == 'chunked':
+                    body = await self.read_chunked(reader)
+                self.requests.append((method, path, headers, body))
+                await self.respond(writer, method, path)
+        finally:
+            writer.close()
+
+    async def read_chunked(self, reader):
+        body = b''
+        while True:
+            size = int((await reader.readline()).strip(), 16)
+            chunk = await reader.readexactly(size + 2)
+            if not size:
+                return body
+            body += chunk[:-2]
+
+    async def respond(self, writer, method, path):
+        url = fake_api.prefix + path.split('?', 1)[0]
+        key = url if url in fake_api.fake_responses else (url, method)
+        if key not in fake_api.fake_responses:
+            status_code, content = 404, {'message': 'No such thing'}
+        else:
+            status_code, content = fake_api.fake_responses[key]()
+        if not isinstance(content, bytes):
+            content = json.dumps(content).encode('utf-8')
+
+        head = 'HTTP/1.1 {0} Whatever\r\n'.format(status_code)
+        if path.split('?')[0].endswith(('/events', '/logs')):
+            writer.write(
+                (head + 'Transfer-Encoding: chunked\r\n\r\n').encode()
+            )
+            # Split log frames and JSON documents across chunks
+            parts = [content[:10], content[10:]]
+            for part in parts:
+                writer.write(
+                    '{0:x}\r\n'.format(len(part)).encode() + part + b'\r\n'
+                )
+            writer.write(b'0\r\n\r\n')
+        else:
+            writer.write((
+                head + 'Content-Length: {0}\r\n\r\n'.format(len(content))
+            ).encode() + content)
+        await writer.drain()
+
+
+@unittest.skipIf(docker.constants.IS_WINDOWS_PLATFORM, 'Unix only')
+class AsyncClientTest(base.Cleanup, base.BaseTestCase):
+    def setUp(self):
+        asyncio.set_event_loop(asyncio.new_event_loop())
+        self.addCleanup(asyncio.get_event_loop().close)
+        socket_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, socket_dir)
+        self.socket_path = os.path.join(socket_dir, 'docker.sock')
+        self.daemon = FakeDaemon(self.socket_path)
+        run(self.daemon.start())
+        self.addCleanup(lambda: run(self.daemon.stop()))
+        self.client = AsyncClient(base_url='unix://' + self.socket_path)
+        self.addCleanup(self.client.close)
+
+    def test_inspect_container(self):
+        result = run(self.client.inspect_container(fake_api.FAKE_CONTAINER_ID))
+        self.assertEqual(result['Id'], fake_api.FAKE_CONTAINER_ID)
+        method, path, headers, _ = self.daemon.requests[0]
+        self.assertEqual(method, 'GET')
+        self.assertEqual(
+            path, '/v{0}/containers/3cc2351ab11b/json'.format(
+                docker.constants.DEFAULT_DOCKER_API_VERSION
+            )
+        )
+        self.assertEqual(headers['user-agent'],
+                         docker.constants.DEFAULT_USER_AGENT)
+
+    def test_connection_is_reused(self):
+        async def two_requests():
+            await self.client.containers(all=True)
+            await self.client.inspect_container(fake_api.FAKE_CONTAINER_ID)
+
+        run(two_requests())
+        self.assertEqual(self.daemon.connections, 1)
+        self.assertIn('all=1', self.daemon.requests[0][1])
+        self.assertNotIn('since', self.daemon.requests[0][1])
+
+    def test_concurrent_requests(self):
+        async def many_requests():
+            return await asyncio.gather(*[
+                self.client.inspect_image(fake_api.FAKE_IMAGE_NAME)
+                for _ in range(50)
+            ])
+
+        results = run(many_requests())
+        self.assertEqual(len(results), 50)
+        self.assertTrue(1 <= self.daemon.connections <= 25)
+
+    def test_post_json(self):
+        run(self.client.create_container('busybox', 'true'))
+        method, path, headers, body = self.daemon.requests[0]
+        self.assertEqual(method, 'POST')
+        self.assertEqual(headers['content-type'], 'application/json')
+        self.assertEqual(json.loads(body.decode())['Image'], 'busybox')
+
+    def test_import_image_from_file(self):
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+        path = os.path.join(tmpdir, 'image.tar')
+        with open(path, 'wb') as f:
+            f.write(b'x' * 200000)
+
+        run(self.client.import_image(src=path, repository='test'))
+        method, path, headers, body = self.daemon.requests[0]
+        self.assertEqual(headers['transfer-encoding'], 'chunked')
+        self.assertEqual(body, b'x' * 200000)
+
+    def test_timeout_excludes_request_body(self):
+        async def slow_body():
+            for _ in range(3):
+                await asyncio.sleep(0.05)
+                yield b'data'
+
+        async def upload():
+            response = await self.client._post(
+                self.client._url('/images/create'), data=slow_body(),
+                timeout=0.1
+            )
+            return await self.client._result(response, json=True)
+
+        run(upload())
+        self.assertEqual(self.daemon.requests[0][3], b'data' * 3)
+
+    def test_not_found(self):
+        with self.assertRaises(docker.errors.NotFound) as cm:
+            run(self.client.inspect_volume('doesnotexist'))
+        self.assertEqual(cm.exception.explanation, 'No such thing')
+
+    def test_events(self):
+        events = run(collect(self.client.events(decode=True)))
+        self.assertEqual(events, [fake_api.get_fake_events()[1]])
+
+    def test_logs(self):
+        logs = run(self.client.logs(fake_api.FAKE_CONTAINER_ID))
+        self.assertEqual(logs, b'Flowering Nights\n(Sakuya Iyazoi)\n')
+
+    def test_logs_streaming(self):
+        logs = run(collect(
+            self.client.logs(fake_api.FAKE_CONTAINER_ID, stream=True)
+        ))
+        self.assertEqual(logs, [b'Flowering Nights\n', b'(Sakuya Iyazoi)\n'])
+
+    def test_logs_demux(self):
+        logs = run(self.client.logs(fake_api.FAKE_CONTAINER_ID, demux=True))
+        self.assertEqual(logs, (b'Flowering Nights\n(Sakuya Iyazoi)\n', b''))
+
+    def test_logs_streaming_demux(self):
+        logs = run(collect(self.client.logs(
+            fake_api.FAKE_CONTAINER_ID, stream=True, demux=True
+        )))
+        self.assertEqual(logs, [
+            (b'Flowering Nights\n', None), (b'(Sakuya Iyazoi)\n', None)
+        ])
+
+    def test_auto_version(self):
+        async def negotiate():
+            client = AsyncClient(
+                base_url='unix://' + self.socket_path, version='auto'
+            )
+            with self.assertRaises(docker.errors.DockerException):
+                client.api_version
+            async with client:
+                return client.api_version
+
+        self.assertEqual(run(negotiate()), '1.18')
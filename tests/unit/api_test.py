@@ -83,7 +83,7 @@ def fake_delete(self, url, *args, **kwargs):
     return fake_request('DELETE', url, *args, **kwargs)
 
 
-def fake_read_from_socket(self, response, stream):
+def fake_read_from_socket(self, response, stream, demux=False):
     return six.binary_type()
 
 url_base = '{0}/'.format(fake_api.prefix)
@@ -100,12 +100,16 @@ class DockerClientTest(base.Cleanup, base.BaseTestCase):
             _read_from_socket=fake_read_from_socket
         )
         self.patcher.start()
+        # Keep the API version cache out of the user's home directory
+        self.cache_dir = tempfile.mkdtemp()
+        self.version_cache = os.path.join(self.cache_dir, 'api-versions.json')
         self.client = docker.Client()
         # Force-clear authconfig to avoid tampering with the tests
         self.client._cfg = {'Configs': {}}
 
     def tearDown(self):
         self.client.close()
+        shutil.rmtree(self.cache_dir)
         self.patcher.stop()
 
     def assertIn(self, object, collection):
@@ -194,7 +198,9 @@ class DockerApiTest(DockerClientTest):
         )
 
     def test_retrieve_server_version(self):
-        client = docker.Client(version="auto")
+        client = docker.Client(
+            version="auto", version_cache=self.version_cache
+        )
         self.assertTrue(isinstance(client._version, six.string_types))
         self.assertFalse(client._version == "auto")
         client.close()
@@ -203,6 +209,102 @@ class DockerApiTest(DockerClientTest):
         version = self.client._retrieve_server_version()
         self.assertTrue(isinstance(version, six.string_types))
 
+    def test_retrieve_server_version_cached(self):
+        docker.Client(
+            version='auto', version_cache=self.version_cache
+        ).close()
+        fake_request.reset_mock()
+        client = docker.Client(
+            version='auto', version_cache=self.version_cache
+        )
+        self.assertEqual(client._version, '1.18')
+        self.assertFalse(fake_request.called)
+        client.close()
+
+    def test_cached_version_checked_against_server(self):
+        cache = docker.cache.APIVersionCache(self.version_cache)
+        base_url = docker.utils.parse_host(
+            None, docker.constants.IS_WINDOWS_PLATFORM
+        )
+        cache.set(base_url, '1.20', 'Docker/1.8.0 (linux)')
+        client = docker.Client(
+            version='auto', version_cache=self.version_cache
+        )
+        self.assertEqual(client._version, '1.20')
+
+        # The fake daemon sends no Server header, so it looks different
+        client.version(api_version=False)
+        self.assertEqual(client._version, '1.18')
+        self.assertEqual(cache.get(base_url)['ApiVersion'], '1.18')
+        client.close()
+
+    def test_version_error_refreshes_cached_version(self):
+        base_url = docker.utils.parse_host(
+            None, docker.constants.IS_WINDOWS_PLATFORM
+        )
+        docker.cache.APIVersionCache(self.version_cache).set(
+            base_url, '1.30'
+        )
+        client = docker.Client(
+            version='auto', version_cache=self.version_cache
+        )
+        self.assertEqual(client._version, '1.30')
+
+        with pytest.raises(docker.errors.APIError):
+            client._raise_for_status(response(
+                status_code=400, content=(
+                    b'client is newer than server (client API version: '
+                    b'1.30, server API version: 1.18)'
+                )
+            ))
+        self.assertEqual(client._version, '1.18')
+        client.close()
+
+    def test_version_error_retries_request(self):
+        base_url = docker.utils.parse_host(
+            None, docker.constants.IS_WINDOWS_PLATFORM
+        )
+        docker.cache.APIVersionCache(self.version_cache).set(
+            base_url, '1.30'
+        )
+        client = docker.Client(
+            version='auto', version_cache=self.version_cache
+        )
+
+        def reject_cached_version(method, url, *args, **kwargs):
+            if '/v1.30/' in url:
+                return response(status_code=400, content=(
+                    b'client is newer than server (client API version: '
+                    b'1.30, server API version: 1.18)'
+                ))
+            if '/v1.18/' in url:
+                # fake_api only serves the default API version
+                return response(content={'Containers': 1})
+            return fake_resp(method, url, *args, **kwargs)
+
+        with mock.patch.object(
+                fake_request, 'side_effect', reject_cached_version):
+            self.assertEqual(client.info(), {'Containers': 1})
+        fake_request.assert_called_with(
+            'GET', url_base + 'v1.18/info', timeout=DEFAULT_TIMEOUT_SECONDS
+        )
+        self.assertEqual(client._version, '1.18')
+        client.close()
+
+    def test_version_cache_disabled(self):
+        client = docker.Client(version='auto', version_cache=False)
+        self.assertEqual(client._version, '1.18')
+        self.assertEqual(client._version_cache, None)
+        self.assertFalse(os.path.exists(self.version_cache))
+        client.close()
+
+        with mock.patch.dict(os.environ, {}, clear=True):
+            client = docker.Client.from_env(
+                version='auto', version_cache=False
+            )
+        self.assertEqual(client._version, '1.18')
+        client.close()
+
     def test_info(self):
         self.client.info()
 
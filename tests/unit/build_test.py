@@ -1,10 +1,25 @@
 import gzip
 import io
+import json
+import os
+import shutil
+import tarfile
+import types
+
+import pytest
 
 import docker
 from docker import auth
 
-from .api_test import DockerClientTest, fake_request, url_prefix
+from ..helpers import make_tree
+from .api_test import (
+    DockerClientTest, fake_request, fake_resp, response, url_prefix
+)
+
+try:
+    from unittest import mock
+except ImportError:
+    import mock
 
 
 class BuildTest(DockerClientTest):
@@ -75,6 +90,169 @@ class BuildTest(DockerClientTest):
             encoding="gzip"
         )
 
+    def test_build_container_stream_context(self):
+        base = make_tree([], ['Dockerfile', 'a.py'])
+        self.addCleanup(shutil.rmtree, base)
+
+        sent = []
+
+        def consume_body(method, url, data=None, **kwargs):
+            assert isinstance(data, types.GeneratorType)
+            sent.append(b''.join(data))
+            return fake_resp(method, url, data=data, **kwargs)
+
+        fake_request.side_effect = consume_body
+        try:
+            self.client.build(path=base, stream_context=True)
+        finally:
+            fake_request.side_effect = fake_resp
+
+        archive = tarfile.open(fileobj=io.BytesIO(sent[0]))
+        assert sorted(archive.getnames()) == ['Dockerfile', 'a.py']
+        headers = fake_request.call_args[1]['headers']
+        assert headers['Content-Type'] == 'application/tar'
+
+    def test_build_container_minimal_context(self):
+        base = make_tree(['app', 'docs'], [
+            'Dockerfile', 'app/main.py', 'docs/index.md', 'README'
+        ])
+        self.addCleanup(shutil.rmtree, base)
+        with open(os.path.join(base, 'Dockerfile'), 'w') as f:
+            f.write('FROM python\nCOPY app /app\nCMD python /app/main.py\n')
+
+        sent = []
+
+        def read_body(method, url, data=None, **kwargs):
+            sent.append(data.read())
+            return fake_resp(method, url, data=data, **kwargs)
+
+        fake_request.side_effect = read_body
+        try:
+            self.client.build(path=base, minimal_context=True)
+        finally:
+            fake_request.side_effect = fake_resp
+
+        archive = tarfile.open(fileobj=io.BytesIO(sent[0]))
+        assert sorted(archive.getnames()) == [
+            'Dockerfile', 'app', 'app/main.py'
+        ]
+
+    def test_build_container_memory_context(self):
+        sent = []
+
+        def read_body(method, url, data=None, **kwargs):
+            if isinstance(data, types.GeneratorType):
+                sent.append(b''.join(data))
+            else:
+                sent.append(data.read())
+            return fake_resp(method, url, data=data, **kwargs)
+
+        files = {'Dockerfile': 'FROM busybox\nCOPY a /', 'a': b'content'}
+        fake_request.side_effect = read_body
+        try:
+            self.client.build(fileobj=files)
+            self.client.build(fileobj=files, gzip=True, stream_context=True)
+        finally:
+            fake_request.side_effect = fake_resp
+
+        assert sent[0] == docker.utils.memory_tar(files).read()
+        assert gzip.GzipFile(fileobj=io.BytesIO(sent[1])).read() == sent[0]
+        headers = fake_request.call_args[1]['headers']
+        assert headers['Content-Encoding'] == 'gzip'
+
+    def test_build_container_progress(self):
+        output = [
+            {'stream': 'Step 1/2 : FROM busybox\n'},
+            {'stream': 'Step 2/2 : RUN true\n'},
+            {'stream': 'Successfully built 032b8b2855fc\n'},
+        ]
+        with mock.patch.object(
+                self.client, '_stream_helper', return_value=iter(output)
+        ) as stream_helper:
+            progress = self.client.build(
+                fileobj=io.BytesIO(b'FROM busybox'), progress=True
+            )
+            events = list(progress)
+        assert stream_helper.call_args[1] == {'decode': True}
+        assert isinstance(progress, docker.utils.BuildProgress)
+        assert events[-1].image_id == '032b8b2855fc'
+        assert [s.instruction for s in progress.profile.steps] == [
+            'FROM busybox', 'RUN true'
+        ]
+
+    def test_build_container_cache_from(self):
+        self.client._version = '1.25'
+        fake_request.side_effect = lambda *args, **kwargs: response(
+            content=b'Successfully built 032b8b2855fc'
+        )
+        try:
+            self.client.build(
+                fileobj=io.BytesIO(b'FROM busybox'),
+                cache_from=['app:latest', 'app:master']
+            )
+        finally:
+            fake_request.side_effect = fake_resp
+        params = fake_request.call_args[1]['params']
+        assert json.loads(params['cachefrom']) == ['app:latest', 'app:master']
+
+    def test_build_container_cache_from_version(self):
+        with pytest.raises(docker.errors.InvalidVersion):
+            self.client.build(
+                fileobj=io.BytesIO(b'FROM busybox'), cache_from=['app']
+            )
+
+    def test_pull_cache_images(self):
+        def pull(repository, tag=None, **kwargs):
+            if repository == 'missing':
+                raise docker.errors.NotFound(
+                    'Not found', response(404, {'message': 'not found'})
+                )
+            if repository == 'denied':
+                return iter([{'error': 'unauthorized'}])
+            pulled.append((repository, tag))
+            return iter([{'status': 'Downloaded newer image'}])
+
+        pulled = []
+        with mock.patch.object(self.client, 'pull', side_effect=pull):
+            failures = self.client.pull_cache_images([
+                'app', 'missing', 'denied', 'app', 'base@sha256:abc'
+            ])
+        assert sorted(pulled) == [('app', 'latest'), ('base', 'sha256:abc')]
+        assert sorted(failures) == ['denied', 'missing']
+        assert failures['denied'] == 'unauthorized'
+
+    def test_build_container_pull_cache_from(self):
+        self.client._version = '1.25'
+        fake_request.side_effect = lambda *args, **kwargs: response(
+            content=b'Successfully built 032b8b2855fc'
+        )
+        try:
+            with mock.patch.object(
+                    self.client, 'pull_cache_images') as pull_cache_images:
+                self.client.build(
+                    fileobj=io.BytesIO(b'FROM busybox'), cache_from=['app'],
+                    pull_cache_from=True
+                )
+        finally:
+            fake_request.side_effect = fake_resp
+        pull_cache_images.assert_called_once_with(['app'])
+
+    def test_build_images(self):
+        def build(**kwargs):
+            return iter([{'stream': 'Successfully built {0}\n'.format(
+                '1' * 12 if kwargs['tag'] == 'base' else '2' * 12
+            )}])
+
+        with mock.patch.object(self.client, 'build', side_effect=build):
+            graph_build = self.client.build_images([
+                {'tag': 'app', 'fileobj': {'Dockerfile': b'FROM base'}},
+                {'tag': 'base', 'fileobj': {'Dockerfile': b'FROM debian'}},
+            ], workers=2)
+            list(graph_build)
+        assert graph_build.results == {
+            'base:latest': '1' * 12, 'app:latest': '2' * 12
+        }
+
     def test_build_remote_with_registry_auth(self):
         self.client._auth_configs = {
             'https://example.com': {
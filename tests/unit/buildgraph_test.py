@@ -0,0 +1,151 @@
+import io
+import threading
+
+import pytest
+
+from docker import errors
+from docker.buildgraph import (
+    FAILED, SKIPPED, STARTED, SUCCEEDED, BuildGraph, GraphBuild, base_images,
+    normalize_image
+)
+
+from .. import base
+
+
+def spec(tag, dockerfile, **kwargs):
+    kwargs.update(tag=tag, fileobj=io.BytesIO(dockerfile.encode('utf-8')))
+    return kwargs
+
+
+class FakeClient(object):
+    """
+    Stands for a Client, building images whose Dockerfile contains "fail"
+    with an error.
+    """
+
+    def __init__(self):
+        self.built = []
+        self.running = 0
+        self.max_running = 0
+        self.lock = threading.Lock()
+
+    def build(self, tag, fileobj, stream, decode, **kwargs):
+        assert stream and decode
+        with self.lock:
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+        try:
+            yield {'stream': 'Step 1/1 : FROM base\n'}
+            if b'fail' in fileobj.getvalue():
+                yield {'error': 'The command returned a non-zero code: 1'}
+                return
+            with self.lock:
+                self.built.append(tag)
+            yield {'stream': 'Successfully built {0:012x}\n'.format(
+                abs(hash(tag)) % (1 << 48)
+            )}
+        finally:
+            with self.lock:
+                self.running -= 1
+
+
+class BuildGraphTest(base.BaseTestCase):
+    def test_normalize_image(self):
+        assert normalize_image('app') == 'app:latest'
+        assert normalize_image('localhost:5000/app') == (
+            'localhost:5000/app:latest'
+        )
+        assert normalize_image('app:1.0') == 'app:1.0'
+        assert normalize_image('app@sha256:abc') == 'app@sha256:abc'
+
+    def test_base_images(self):
+        dockerfile = '\n'.join([
+            'ARG BASE=base:1.0',
+            'ARG VERSION',
+            'FROM --platform=linux/amd64 ${BASE} AS builder',
+            'RUN make',
+            'FROM runtime:$VERSION',
+            'COPY --from=builder /app /app',
+            'FROM builder AS test',
+            'FROM scratch',
+        ])
+        assert base_images(dockerfile, {'VERSION': '2'}) == [
+            'base:1.0', 'runtime:2'
+        ]
+
+    def test_dependencies(self):
+        graph = BuildGraph([
+            spec('app:latest', 'FROM base\nFROM tools:1 AS t'),
+            spec('base', 'FROM debian'),
+            spec('tools:1', 'FROM base:latest'),
+            spec('other', 'FROM debian'),
+        ])
+        assert graph.dependencies == {
+            'app:latest': ['base:latest', 'tools:1'],
+            'base:latest': [],
+            'tools:1': ['base:latest'],
+            'other:latest': [],
+        }
+        assert sorted(graph.downstream('base:latest')) == [
+            'app:latest', 'tools:1'
+        ]
+
+    def test_memory_context(self):
+        graph = BuildGraph([
+            {'tag': 'a', 'fileobj': {'Dockerfile': b'FROM b'}},
+            {'tag': 'b', 'fileobj': {'Dockerfile': u'FROM debian'}},
+        ])
+        assert graph.dependencies['a:latest'] == ['b:latest']
+
+    def test_cycle(self):
+        with pytest.raises(errors.DockerException):
+            BuildGraph([spec('a', 'FROM b'), spec('b', 'FROM a')])
+
+    def test_missing_tag(self):
+        with pytest.raises(errors.DockerException):
+            BuildGraph([{'fileobj': io.BytesIO(b'FROM debian')}])
+
+
+class GraphBuildTest(base.BaseTestCase):
+    def test_build_order(self):
+        client = FakeClient()
+        graph = BuildGraph([
+            spec('app', 'FROM tools'),
+            spec('tools', 'FROM base'),
+            spec('base', 'FROM debian'),
+            spec('other', 'FROM debian'),
+        ])
+        build = GraphBuild(client, graph, workers=2)
+        events = list(build)
+        assert client.built.index('base') < client.built.index('tools')
+        assert client.built.index('tools') < client.built.index('app')
+        assert sorted(build.results) == [
+            'app:latest', 'base:latest', 'other:latest', 'tools:latest'
+        ]
+        assert client.max_running <= 2
+        statuses = [e.status for e in events if e.tag == 'app:latest']
+        assert statuses[0] == STARTED
+        assert statuses[-1] == SUCCEEDED
+
+    def test_failure_skips_dependents(self):
+        client = FakeClient()
+        graph = BuildGraph([
+            spec('base', 'FROM debian\nRUN fail'),
+            spec('tools', 'FROM base'),
+            spec('app', 'FROM tools'),
+            spec('other', 'FROM debian'),
+        ])
+        build = GraphBuild(client, graph)
+        events = list(build)
+        assert client.built == ['other']
+        assert list(build.failed) == ['base:latest']
+        assert isinstance(build.failed['base:latest'], errors.BuildError)
+        assert build.skipped == {
+            'tools:latest': 'base:latest', 'app:latest': 'base:latest'
+        }
+        assert [e.tag for e in events if e.status == FAILED] == [
+            'base:latest'
+        ]
+        assert sorted(e.tag for e in events if e.status == SKIPPED) == [
+            'app:latest', 'tools:latest'
+        ]
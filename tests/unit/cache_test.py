@@ -0,0 +1,332 @@
+import json
+import os
+import shutil
+import tempfile
+
+import docker
+from docker.cache import (
+    APIVersionCache, ImageIndex, InspectCache, LRUCache,
+    normalize_image_reference
+)
+
+from .. import base
+from . import fake_api
+from .api_test import DockerClientTest, fake_request, url_prefix
+
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+CONTAINER_ID = 'a' * 64
+IMAGE_ID = 'sha256:' + 'b' * 64
+
+
+class LRUCacheTest(base.BaseTestCase):
+    def test_get_set(self):
+        cache = LRUCache(2)
+        cache.set('a', 1)
+        assert cache.get('a') == 1
+        assert cache.get('b') is None
+        assert cache.get('b', 2) == 2
+        assert 'a' in cache
+        assert len(cache) == 1
+
+    def test_evicts_least_recently_used(self):
+        cache = LRUCache(2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+        assert sorted(cache.keys()) == ['a', 'c']
+        cache.set('a', 4)
+        cache.set('d', 5)
+        assert sorted(cache.keys()) == ['a', 'd']
+        assert cache.get('a') == 4
+
+    def test_ttl(self):
+        cache = LRUCache(2, ttl=-1)
+        cache.set('a', 1)
+        assert cache.get('a') is None
+        assert len(cache) == 0
+
+    def test_pop_and_clear(self):
+        cache = LRUCache(2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        assert cache.pop('a') == 1
+        assert cache.pop('a') is None
+        cache.set('c', 3)
+        cache.set('d', 4)
+        assert sorted(cache.keys()) == ['c', 'd']
+        cache.clear()
+        assert len(cache) == 0
+        cache.set('e', 5)
+        assert cache.keys() == ['e']
+
+
+class InspectCacheTest(base.BaseTestCase):
+    def setUp(self):
+        self.cache = InspectCache()
+        self.loads = 0
+
+    def load(self, kind, key, result=None):
+        def loader():
+            self.loads += 1
+            return result or {'Id': CONTAINER_ID, 'State': 'running'}
+        return self.cache.load(kind, key, loader)
+
+    def test_read_through(self):
+        assert self.load('container', 'aaaa')['State'] == 'running'
+        result = self.load('container', 'aaaa')
+        assert self.loads == 1
+        assert self.cache.stats() == {
+            'hits': 1, 'misses': 1, 'invalidations': 0, 'size': 1
+        }
+        # Callers get their own copy
+        result['State'] = 'exited'
+        assert self.load('container', 'aaaa')['State'] == 'running'
+
+    def test_event_invalidates_every_key(self):
+        self.load('container', 'aaaa')
+        self.load('container', 'web')
+        self.cache.handle_event({
+            'Type': 'container', 'Action': 'die',
+            'Actor': {'ID': CONTAINER_ID}
+        })
+        assert len(self.cache) == 0
+
+    def test_read_only_event(self):
+        self.load('container', 'aaaa')
+        self.cache.handle_event({
+            'Type': 'container', 'Action': 'resize',
+            'Actor': {'ID': CONTAINER_ID}
+        })
+        assert len(self.cache) == 1
+
+    def test_legacy_event(self):
+        self.load('container', 'aaaa')
+        self.cache.handle_event({
+            'status': 'exec_start: sh', 'id': CONTAINER_ID, 'from': 'busybox'
+        })
+        assert len(self.cache) == 0
+
+    def test_network_event_invalidates_container(self):
+        self.load('container', 'aaaa')
+        self.load('network', 'net', {'Id': 'c' * 64})
+        self.cache.handle_event({
+            'Type': 'network', 'Action': 'connect',
+            'Actor': {'ID': 'c' * 64, 'Attributes': {
+                'container': CONTAINER_ID
+            }}
+        })
+        assert len(self.cache) == 0
+
+    def test_image_references(self):
+        self.load('image', 'bbbb', {'Id': IMAGE_ID})
+        self.load('image', 'busybox', {'Id': IMAGE_ID})
+        self.load('image', 'ubuntu', {'Id': 'sha256:' + 'd' * 64})
+        self.cache.handle_event({
+            'Type': 'image', 'Action': 'tag',
+            'Actor': {'ID': 'sha256:' + 'e' * 64}
+        })
+        # Only the entry looked up by ID is kept
+        assert len(self.cache) == 1
+        self.load('image', 'bbbb')
+        assert self.loads == 3
+
+    def test_handle_request(self):
+        self.load('container', 'aaaa')
+        self.load('volume', 'data', {'Name': 'data'})
+        self.cache.handle_request('GET', '/v1.24/containers/aaaa/json')
+        assert len(self.cache) == 2
+        self.cache.handle_request('POST', '/v1.24/containers/aaaa/start')
+        self.cache.handle_request('DELETE', '/v1.24/volumes/data')
+        assert len(self.cache) == 0
+
+    def test_handle_network_request(self):
+        self.load('container', 'aaaa')
+        self.cache.handle_request(
+            'POST', '/v1.24/networks/net/connect',
+            json.dumps({'Container': CONTAINER_ID})
+        )
+        assert len(self.cache) == 0
+
+    def test_invalidation_during_load(self):
+        def loader():
+            self.cache.invalidate('container', CONTAINER_ID)
+            return {'Id': CONTAINER_ID}
+        self.cache.load('container', 'aaaa', loader)
+        assert len(self.cache) == 0
+
+
+class ClientInspectCacheTest(DockerClientTest):
+    def setUp(self):
+        super(ClientInspectCacheTest, self).setUp()
+        hub = mock.patch('docker.Client.event_hub')
+        self.event_hub = hub.start()
+        self.addCleanup(hub.stop)
+        self.cache = self.client.enable_inspect_cache()
+
+    def test_inspect_cached(self):
+        self.client.inspect_container(fake_api.FAKE_CONTAINER_ID)
+        self.client.inspect_container(fake_api.FAKE_CONTAINER_ID)
+        self.assertEqual(self.cache.hits, 1)
+        self.assertEqual(self.cache.misses, 1)
+        self.event_hub.return_value.add_listener.assert_called_with(
+            self.cache.handle_event, self.cache.clear
+        )
+
+    def test_write_invalidates(self):
+        self.client.inspect_container(fake_api.FAKE_CONTAINER_ID)
+        self.client.start(fake_api.FAKE_CONTAINER_ID)
+        self.client.inspect_container(fake_api.FAKE_CONTAINER_ID)
+        self.assertEqual(self.cache.misses, 2)
+        fake_request.assert_called_with(
+            'GET', url_prefix + 'containers/3cc2351ab11b/json',
+            timeout=docker.constants.DEFAULT_TIMEOUT_SECONDS
+        )
+
+    def test_disable(self):
+        self.client.disable_inspect_cache()
+        self.assertIsNone(self.client.inspect_cache)
+        self.client.inspect_container(fake_api.FAKE_CONTAINER_ID)
+
+
+class ImageIndexTest(base.BaseTestCase):
+    def setUp(self):
+        self.index = ImageIndex()
+        self.images = [{
+            'Id': IMAGE_ID,
+            'RepoTags': ['busybox:latest', 'example.com/app:1.0'],
+            'RepoDigests': ['busybox@sha256:' + 'c' * 64],
+        }, {
+            'Id': 'sha256:' + 'd' * 64,
+            'RepoTags': ['<none>:<none>'],
+            'RepoDigests': None,
+        }]
+        self.loader = mock.Mock(side_effect=lambda: self.images)
+
+    def test_normalize_image_reference(self):
+        assert normalize_image_reference('busybox') == 'busybox:latest'
+        assert normalize_image_reference(
+            'docker.io/library/busybox:1'
+        ) == 'busybox:1'
+        assert normalize_image_reference(
+            'localhost:5000/app'
+        ) == 'localhost:5000/app:latest'
+        assert normalize_image_reference('app@sha256:ab') == 'app@sha256:ab'
+
+    def test_resolve(self):
+        assert self.index.resolve('busybox', self.loader) == IMAGE_ID
+        assert self.index.resolve(
+            'example.com/app:1.0', self.loader
+        ) == IMAGE_ID
+        assert self.index.resolve(
+            'busybox@sha256:' + 'c' * 64, self.loader
+        ) == IMAGE_ID
+        assert self.index.resolve('bbbbbbbbbbbb', self.loader) == IMAGE_ID
+        assert self.index.resolve('dddd', self.loader) == 'sha256:' + 'd' * 64
+        assert self.index.resolve('debian', self.loader) is None
+        assert self.loader.call_count == 1
+        assert self.index.hits == 5
+        assert self.index.misses == 1
+
+    def test_image_event_invalidates(self):
+        self.index.resolve('busybox', self.loader)
+        self.index.handle_event({
+            'Type': 'image', 'Action': 'push', 'Actor': {'ID': 'busybox'}
+        })
+        self.index.resolve('busybox', self.loader)
+        assert self.loader.call_count == 1
+        self.index.handle_event({
+            'Type': 'image', 'Action': 'pull', 'Actor': {'ID': 'debian'}
+        })
+        self.index.resolve('busybox', self.loader)
+        assert self.loader.call_count == 2
+
+    def test_delete_event(self):
+        self.index.resolve('busybox', self.loader)
+        self.index.handle_event({
+            'Type': 'image', 'Action': 'delete', 'Actor': {'ID': IMAGE_ID}
+        })
+        assert self.index.resolve('busybox', self.loader) is None
+        assert self.loader.call_count == 1
+
+    def test_container_events(self):
+        self.index.resolve('busybox', self.loader)
+        self.index.handle_event({'status': 'start', 'id': CONTAINER_ID,
+                                 'from': 'busybox'})
+        self.index.resolve('busybox', self.loader)
+        assert self.loader.call_count == 1
+        self.index.handle_event({
+            'Type': 'container', 'Action': 'commit',
+            'Actor': {'ID': CONTAINER_ID}
+        })
+        self.index.resolve('busybox', self.loader)
+        assert self.loader.call_count == 2
+
+    def test_handle_request(self):
+        self.index.resolve('busybox', self.loader)
+        self.index.handle_request('POST', '/v1.24/images/busybox/push')
+        self.index.handle_request('POST', '/v1.24/containers/create')
+        self.index.resolve('busybox', self.loader)
+        assert self.loader.call_count == 1
+        self.index.handle_request('POST', '/v1.24/images/create')
+        self.index.resolve('busybox', self.loader)
+        assert self.loader.call_count == 2
+
+    def test_expired(self):
+        self.index = ImageIndex(ttl=-1)
+        self.index.resolve('busybox', self.loader)
+        self.index.resolve('busybox', self.loader)
+        assert self.loader.call_count == 2
+
+    def test_invalidation_during_load(self):
+        def loader():
+            self.index.invalidate()
+            return self.images
+        assert self.index.resolve('busybox', loader) == IMAGE_ID
+        assert self.index.stale
+
+
+class APIVersionCacheTest(base.BaseTestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+        self.path = os.path.join(self.tmpdir, 'docker-py', 'versions.json')
+
+    def test_set_get(self):
+        cache = APIVersionCache(self.path)
+        assert cache.get('tcp://a') is None
+        cache.set('tcp://a', '1.24', 'Docker/1.12.1 (linux)')
+        entry = APIVersionCache(self.path).get('tcp://a')
+        assert entry['ApiVersion'] == '1.24'
+        assert entry['Server'] == 'Docker/1.12.1 (linux)'
+        assert cache.get('tcp://b') is None
+
+    def test_expired(self):
+        cache = APIVersionCache(self.path, ttl=-1)
+        cache.set('tcp://a', '1.24')
+        assert cache.get('tcp://a') is None
+
+    def test_remove(self):
+        cache = APIVersionCache(self.path)
+        cache.set('tcp://a', '1.24')
+        cache.set('tcp://b', '1.23')
+        cache.remove('tcp://a')
+        assert cache.get('tcp://a') is None
+        assert cache.get('tcp://b')['ApiVersion'] == '1.23'
+
+    def test_corrupt_file(self):
+        os.makedirs(os.path.dirname(self.path))
+        with open(self.path, 'w') as f:
+            f.write('{not json')
+        cache = APIVersionCache(self.path)
+        assert cache.get('tcp://a') is None
+        cache.set('tcp://a', '1.24')
+        assert cache.get('tcp://a')['ApiVersion'] == '1.24'
+
+    def test_default_path(self):
+        with mock.patch.dict(os.environ, {'DOCKER_CONFIG': self.tmpdir}):
+            assert APIVersionCache().path.startswith(self.tmpdir)
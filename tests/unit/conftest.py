@@ -0,0 +1,7 @@
+import sys
+
+collect_ignore = []
+
+# The asyncio client relies on async generators
+if sys.version_info < (3, 6):
+    collect_ignore.append('aio_test.py')
@@ -1281,6 +1281,46 @@ class ContainerTest(DockerClientTest):
             'Flowering Nights\n(Sakuya Iyazoi)\n'.encode('ascii')
         )
 
+    def test_logs_demux(self):
+        with mock.patch('docker.Client.inspect_container',
+                        fake_inspect_container):
+            logs = self.client.logs(fake_api.FAKE_CONTAINER_ID, demux=True)
+
+        self.assertEqual(
+            logs, (b'Flowering Nights\n(Sakuya Iyazoi)\n', b'')
+        )
+
+    def test_logs_demux_tty(self):
+        with mock.patch('docker.Client.inspect_container',
+                        fake_inspect_container_tty):
+            logs = self.client.logs(fake_api.FAKE_CONTAINER_ID, demux=True)
+
+        self.assertEqual(logs[1], b'')
+
+    def test_logs_tty_is_cached(self):
+        m = mock.Mock(
+            side_effect=lambda c: fake_inspect_container(self.client, c)
+        )
+        with mock.patch('docker.Client.inspect_container', m):
+            self.client.logs(fake_api.FAKE_CONTAINER_ID)
+            self.client.logs(fake_api.FAKE_CONTAINER_ID)
+        self.assertEqual(m.call_count, 1)
+
+        with mock.patch('docker.Client.inspect_container', m):
+            self.client.remove_container(fake_api.FAKE_CONTAINER_ID)
+            self.client.logs(fake_api.FAKE_CONTAINER_ID)
+        self.assertEqual(m.call_count, 2)
+
+    def test_logs_tty_param(self):
+        m = mock.Mock()
+        with mock.patch('docker.Client.inspect_container', m):
+            logs = self.client.logs(fake_api.FAKE_CONTAINER_ID, tty=False)
+
+        self.assertFalse(m.called)
+        self.assertEqual(
+            logs, 'Flowering Nights\n(Sakuya Iyazoi)\n'.encode('ascii')
+        )
+
     def test_log_streaming(self):
         with mock.patch('docker.Client.inspect_container',
                         fake_inspect_container):
@@ -0,0 +1,170 @@
+import threading
+import time
+
+import docker
+from docker.events import EventHub, Subscription
+from six.moves import queue
+
+from .. import base
+from . import fake_api
+
+
+class FakeResponse(object):
+    def __init__(self, events):
+        self.events = events
+
+    def close(self):
+        pass
+
+
+class FakeClient(object):
+    """Serves one batch of events per /events request, then fails."""
+
+    def __init__(self, *batches):
+        self.batches = list(batches)
+        self.requests = []
+        self.ready = threading.Event()
+        self.ready.set()
+
+    def _url(self, path):
+        return path
+
+    def get(self, url, params=None, stream=False):
+        self.ready.wait(5)
+        self.requests.append((url, params))
+        if not self.batches:
+            raise docker.errors.DockerException('No more events')
+        return FakeResponse(self.batches.pop(0))
+
+    def _stream_helper(self, response, decode=False):
+        return iter(response.events)
+
+    def _get_raw_response_socket(self, response):
+        raise AttributeError
+
+
+def event(status, time_nano, container='abc'):
+    return {
+        'status': status, 'id': container, 'time': time_nano // 10,
+        'timeNano': time_nano
+    }
+
+
+class EventHubTest(base.BaseTestCase):
+    def setUp(self):
+        self.events = [
+            event('create', 10), event('start', 20), event('die', 30)
+        ]
+        self.client = FakeClient(self.events)
+        self.hub = EventHub(self.client, reconnect_delay=0.01)
+        self.addCleanup(self.hub.close)
+
+    def test_fan_out(self):
+        self.client.ready.clear()
+        every = self.hub.subscribe()
+        deaths = self.hub.subscribe(lambda e: e['status'] == 'die')
+        self.client.ready.set()
+
+        assert [every.get(timeout=5) for _ in range(3)] == self.events
+        assert deaths.get(timeout=5) == self.events[2]
+        self.hub.close()
+        assert list(every) == []
+        assert list(deaths) == []
+        assert self.client.requests[0] == (
+            '/events', {'since': self.hub.created}
+        )
+
+    def test_resume_after_reconnect(self):
+        self.client.batches.append([self.events[2], event('destroy', 40)])
+        subscription = self.hub.subscribe()
+
+        received = [subscription.get(timeout=5) for _ in range(4)]
+        assert [e['status'] for e in received] == [
+            'create', 'start', 'die', 'destroy'
+        ]
+        assert self.client.requests[1] == ('/events', {'since': 3})
+
+    def test_resume_from_creation(self):
+        self.client.batches = [[], self.events]
+        subscription = self.hub.subscribe()
+        subscription.get(timeout=5)
+
+        assert self.client.requests[0][1]['since'] == self.hub.created
+        assert self.client.requests[1][1]['since'] == self.hub.created
+        assert self.hub.created <= time.time()
+
+    def test_listener(self):
+        received = []
+        self.hub.add_listener(received.append)
+        deadline = time.time() + 5
+        while len(received) < 3 and time.time() < deadline:
+            time.sleep(0.01)
+        assert received == self.events
+
+    def test_listener_reset_on_reconnect(self):
+        self.client.batches.append([event('destroy', 40)])
+        received = []
+        resets = []
+        self.hub.add_listener(
+            received.append, lambda: resets.append(len(received))
+        )
+        deadline = time.time() + 5
+        while len(received) < 4 and time.time() < deadline:
+            time.sleep(0.01)
+        assert resets == [3]
+
+    def test_unsubscribe(self):
+        subscription = self.hub.subscribe()
+        with subscription:
+            subscription.get(timeout=5)
+        assert subscription.closed
+        assert self.hub._subscriptions == []
+
+    def test_subscribe_closed_hub(self):
+        self.hub.close()
+        with self.assertRaises(docker.errors.DockerException):
+            self.hub.subscribe()
+
+
+class SubscriptionTest(base.BaseTestCase):
+    def test_drop_newest(self):
+        subscription = Subscription(None, maxsize=2, overflow='drop_newest')
+        for i in range(4):
+            subscription._put(i)
+        assert subscription.dropped == 2
+        assert [subscription.get(), subscription.get()] == [0, 1]
+
+    def test_drop_oldest(self):
+        subscription = Subscription(None, maxsize=2, overflow='drop_oldest')
+        for i in range(4):
+            subscription._put(i)
+        assert subscription.dropped == 2
+        assert [subscription.get(), subscription.get()] == [2, 3]
+
+    def test_close_keeps_queued_events(self):
+        subscription = Subscription(None, maxsize=2)
+        subscription._put(0)
+        subscription._put(1)
+        subscription._close()
+        assert list(subscription) == [0, 1]
+        assert subscription.get() is None
+
+    def test_get_timeout(self):
+        subscription = Subscription(None)
+        with self.assertRaises(queue.Empty):
+            subscription.get(timeout=0.01)
+
+    def test_invalid_overflow_policy(self):
+        with self.assertRaises(docker.errors.DockerException):
+            Subscription(None, overflow='explode')
+
+
+class ClientEventHubTest(base.BaseTestCase):
+    def test_destroy_event_clears_tty_cache(self):
+        client = docker.Client()
+        client._tty_cache.set(fake_api.FAKE_CONTAINER_ID, True)
+        client._on_event({
+            'Type': 'container', 'Action': 'destroy',
+            'Actor': {'ID': fake_api.FAKE_CONTAINER_ID + 'f' * 52}
+        })
+        assert len(client._tty_cache) == 0
@@ -1,3 +1,8 @@
+import io
+import os
+import shutil
+import tempfile
+
 import docker
 import pytest
 
@@ -5,7 +10,7 @@ from . import fake_api
 from docker import auth
 from .api_test import (
     DockerClientTest, fake_request, DEFAULT_TIMEOUT_SECONDS, url_prefix,
-    fake_resolve_authconfig
+    fake_resolve_authconfig, response
 )
 
 try:
@@ -89,6 +94,75 @@ class ImageTest(DockerClientTest):
         )
         self.assertTrue(args[1]['stream'])
 
+    def test_ensure_image_present(self):
+        with mock.patch.object(self.client, 'inspect_image', return_value={
+            'Id': fake_api.FAKE_IMAGE_ID
+        }):
+            with mock.patch.object(self.client, 'pull') as pull:
+                image_id = self.client.ensure_image(fake_api.FAKE_IMAGE_NAME)
+        assert image_id == fake_api.FAKE_IMAGE_ID
+        assert not pull.called
+
+    def test_ensure_image_pulls_missing(self):
+        index = docker.cache.ImageIndex()
+        self.client.image_index = index
+        self.addCleanup(setattr, self.client, 'image_index', None)
+        images = [[], [{'Id': fake_api.FAKE_IMAGE_ID,
+                        'RepoTags': ['busybox:latest']}]]
+
+        def pull(repository, tag=None, **kwargs):
+            index.invalidate()
+            return iter([{'status': 'Pull complete', 'id': 'a' * 12}])
+
+        with mock.patch.object(self.client, 'images',
+                               side_effect=images) as list_images:
+            with mock.patch.object(self.client, 'pull',
+                                   side_effect=pull) as pull_mock:
+                image_id = self.client.ensure_image('busybox')
+                assert image_id == fake_api.FAKE_IMAGE_ID
+                assert self.client.ensure_image('busybox') == image_id
+        pull_mock.assert_called_once_with(
+            'busybox', tag='latest', stream=True, decode=True,
+            auth_config=None
+        )
+        assert list_images.call_count == 2
+
+    def test_ensure_image_pull_error(self):
+        self.client.image_index = docker.cache.ImageIndex()
+        self.addCleanup(setattr, self.client, 'image_index', None)
+        with mock.patch.object(self.client, 'images', return_value=[]):
+            with mock.patch.object(self.client, 'pull', return_value=iter([
+                {'error': 'manifest unknown'}
+            ])):
+                with pytest.raises(docker.errors.DockerException):
+                    self.client.ensure_image('busybox:nope')
+
+    def test_pull_images(self):
+        layer = 'a' * 12
+        pulls = []
+
+        def pull(repository, tag=None, **kwargs):
+            pulls.append((repository, tag, kwargs))
+            return iter([
+                {'status': 'Downloading', 'id': layer,
+                 'progressDetail': {'current': 100, 'total': 100}},
+                {'status': 'Pull complete', 'id': layer},
+            ])
+
+        with mock.patch.object(self.client, 'pull', side_effect=pull):
+            transfer = self.client.pull_images(
+                ['busybox', 'debian:jessie'], workers=2
+            )
+            assert transfer.wait() == {'busybox': None, 'debian:jessie': None}
+        assert sorted((r, t) for r, t, _ in pulls) == [
+            ('busybox', 'latest'), ('debian', 'jessie')
+        ]
+        assert pulls[0][2]['stream'] and pulls[0][2]['decode']
+        assert transfer.progress.transferred == 100
+        assert transfer.progress.layers[layer].images == set([
+            'busybox', 'debian:jessie'
+        ])
+
     def test_commit(self):
         self.client.commit(fake_api.FAKE_CONTAINER_ID)
 
@@ -305,6 +379,44 @@ class ImageTest(DockerClientTest):
             timeout=DEFAULT_TIMEOUT_SECONDS
         )
 
+    def test_push_images(self):
+        pushes = []
+        layers = {
+            'example.com/b': 'b' * 12, 'example.com/c': 'c' * 12,
+            'busybox': 'd' * 12
+        }
+
+        def push(repository, tag, headers, **kwargs):
+            pushes.append((repository, tag, headers))
+            return iter([
+                {'status': 'Layer already exists', 'id': 'a' * 12},
+                {'status': 'Pushing', 'id': layers[repository],
+                 'progressDetail': {'current': 50, 'total': 100}},
+                {'status': 'Pushed', 'id': layers[repository]},
+                {'status': '{0}: digest: sha256:{1} size: 1'.format(
+                    tag, 'f' * 64
+                )},
+            ])
+
+        images = ['example.com/b:1', 'example.com/c:2', 'busybox:latest']
+        with mock.patch('docker.auth.auth.get_config_header',
+                        return_value='auth') as get_config_header:
+            with mock.patch.object(self.client, '_push', side_effect=push):
+                transfer = self.client.push_images(images, workers=2)
+                results = transfer.wait()
+
+        assert get_config_header.call_count == 2
+        assert sorted(pushes) == [
+            ('busybox', 'latest', {'X-Registry-Auth': 'auth'}),
+            ('example.com/b', '1', {'X-Registry-Auth': 'auth'}),
+            ('example.com/c', '2', {'X-Registry-Auth': 'auth'}),
+        ]
+        assert results == dict((i, 'sha256:' + 'f' * 64) for i in images)
+        snapshot = transfer.progress.snapshot()
+        assert snapshot['layers_existing'] == 1
+        assert snapshot['layers_done'] == 4
+        assert snapshot['bytes'] == 300
+
     def test_tag_image(self):
         self.client.tag(fake_api.FAKE_IMAGE_ID, fake_api.FAKE_REPO_NAME)
 
@@ -362,6 +474,44 @@ class ImageTest(DockerClientTest):
             timeout=DEFAULT_TIMEOUT_SECONDS
         )
 
+    def test_save_image_to_file(self):
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+        path = os.path.join(tmpdir, 'image.tar')
+        raw = mock.Mock()
+        raw._fp.chunked = True
+        raw._fp.fp = io.BufferedReader(
+            io.BytesIO(b'4\r\ntar \r\n4\r\ndata\r\n0\r\n\r\n')
+        )
+        with mock.patch.object(self.client, '_get', return_value=response(
+            raw=raw
+        )) as get:
+            size = self.client.save_image_to_file(
+                fake_api.FAKE_IMAGE_ID, path
+            )
+        get.assert_called_once_with(
+            url_prefix + 'images/e9aa60c60128/get', stream=True
+        )
+        assert size == 8
+        with open(path, 'rb') as f:
+            assert f.read() == b'tar data'
+
+    def test_load_image_from_file(self):
+        fd, path = tempfile.mkstemp()
+        os.close(fd)
+        self.addCleanup(os.unlink, path)
+        res = response(
+            content=b'{"stream": "Loaded image: busybox:latest\\n"}\r\n'
+        )
+        with mock.patch.object(self.client, '_post_file',
+                               return_value=res) as post_file:
+            messages = self.client.load_image_from_file(path)
+        assert messages == [{'stream': 'Loaded image: busybox:latest\n'}]
+        args, kwargs = post_file.call_args
+        assert args[0] == url_prefix + 'images/load'
+        assert args[1].name == path
+        assert kwargs['headers'] == {'Content-Type': 'application/x-tar'}
+
     def test_load_image(self):
         self.client.load_image('Byte Stream....')
 
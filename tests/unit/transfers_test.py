@@ -0,0 +1,120 @@
+from docker import errors
+from docker.transfers import (
+    FAILED, STARTED, SUCCEEDED, ImageTransfer, TransferProgress
+)
+
+from .. import base
+
+LAYER_A = 'a' * 12
+LAYER_B = 'b' * 12
+LAYER_C = 'c' * 12
+DIGEST = 'sha256:' + 'd' * 64
+
+
+def downloading(layer, current, total):
+    return {
+        'status': 'Downloading', 'id': layer,
+        'progressDetail': {'current': current, 'total': total},
+    }
+
+
+def status(layer, text):
+    return {'status': text, 'progressDetail': {}, 'id': layer}
+
+
+class TransferProgressTest(base.BaseTestCase):
+    def setUp(self):
+        self.now = 0
+        self.progress = TransferProgress(clock=lambda: self.now, window=10)
+
+    def test_shared_layers_counted_once(self):
+        p = self.progress
+        p.update('app', status('latest', 'Pulling from library/app'))
+        p.update('app', status(LAYER_A, 'Pulling fs layer'))
+        p.update('tools', status(LAYER_A, 'Waiting'))
+        p.update('app', downloading(LAYER_A, 500, 1000))
+        p.update('tools', downloading(LAYER_A, 500, 1000))
+        assert p.transferred == 500
+        p.update('app', status(LAYER_A, 'Download complete'))
+        p.update('tools', status(LAYER_A, 'Waiting'))
+        p.update('tools', downloading(LAYER_B, 100, 400))
+        p.update('app', status(LAYER_A, 'Extracting'))
+        p.update('app', status(LAYER_A, 'Pull complete'))
+        p.update('tools', status(LAYER_C, 'Already exists'))
+
+        assert sorted(p.layers) == [LAYER_A, LAYER_B, LAYER_C]
+        assert p.layers[LAYER_A].images == set(['app', 'tools'])
+        assert p.layers[LAYER_A].status == 'Pull complete'
+        assert p.transferred == 1100
+        assert p.total == 1400
+        snapshot = p.snapshot()
+        assert snapshot['layers'] == 3
+        assert snapshot['layers_done'] == 2
+        assert snapshot['layers_existing'] == 1
+
+    def test_push_statuses(self):
+        p = self.progress
+        p.update('app', status(LAYER_A, 'Preparing'))
+        p.update('app', status(LAYER_B, 'Preparing'))
+        p.update('app', {
+            'status': 'Pushing', 'id': LAYER_A,
+            'progressDetail': {'current': 512, 'total': 2048},
+        })
+        p.update('app', status(LAYER_B, 'Layer already exists'))
+        p.update('app', status(LAYER_A, 'Pushed'))
+        assert p.transferred == 2048
+        assert p.snapshot()['layers_existing'] == 1
+
+    def test_bytes_per_second(self):
+        p = self.progress
+        assert p.bytes_per_second == 0
+        for second in range(4):
+            self.now = second
+            p.update('app', downloading(LAYER_A, 1000 * second, 10000))
+        assert p.bytes_per_second == 1000
+        # Only the last seconds count
+        self.now = 20
+        p.update('app', downloading(LAYER_A, 5000, 10000))
+        self.now = 22
+        p.update('app', downloading(LAYER_A, 9000, 10000))
+        assert p.bytes_per_second == 2000
+
+
+class ImageTransferTest(base.BaseTestCase):
+    def transfer(self, image):
+        if image == 'missing':
+            raise errors.InvalidRepository('Not found')
+        yield status(LAYER_A, 'Pulling fs layer')
+        if image == 'denied':
+            yield {'error': 'unauthorized'}
+            return
+        yield downloading(LAYER_A, 10, 10)
+        yield status(LAYER_A, 'Pull complete')
+        yield {'status': 'Digest: ' + DIGEST}
+
+    def test_transfer(self):
+        transfer = ImageTransfer(
+            self.transfer, ['app', 'missing', 'tools', 'denied', 'app'],
+            workers=2
+        )
+        events = list(transfer)
+        assert transfer.results == {'app': DIGEST, 'tools': DIGEST}
+        assert sorted(transfer.errors) == ['denied', 'missing']
+        assert isinstance(
+            transfer.errors['missing'], errors.InvalidRepository
+        )
+        assert str(transfer.errors['denied']) == 'unauthorized'
+        statuses = [e.status for e in events if e.image == 'tools']
+        assert statuses[0] == STARTED
+        assert statuses[-1] == SUCCEEDED
+        assert sorted(e.image for e in events if e.status == FAILED) == [
+            'denied', 'missing'
+        ]
+        snapshot = transfer.progress.snapshot()
+        assert snapshot['images'] == 4
+        assert snapshot['images_done'] == 2
+        assert snapshot['images_failed'] == 2
+        assert snapshot['bytes'] == 10
+
+    def test_no_images(self):
+        assert ImageTransfer(self.transfer, []).wait() == {}
@@ -1,13 +1,19 @@
 # -*- coding: utf-8 -*-
 
 import base64
+import gzip
+import io
 import json
 import os
 import os.path
 import shutil
+import socket
 import sys
 import tarfile
 import tempfile
+import threading
+import time
+import zlib
 
 import pytest
 import six
@@ -16,21 +22,48 @@ from docker.client import Client
 from docker.constants import (
     DEFAULT_DOCKER_API_VERSION, IS_WINDOWS_PLATFORM
 )
-from docker.errors import DockerException, InvalidVersion
+from docker.errors import (
+    DockerException, InvalidVersion, StreamParseError
+)
 from docker.utils import (
     parse_repository_tag, parse_host, convert_filters, kwargs_from_env,
     create_host_config, Ulimit, LogConfig, parse_bytes, parse_env_file,
     exclude_paths, convert_volume_binds, decode_json_header, tar,
     split_command, create_ipam_config, create_ipam_pool, parse_devices,
-    update_headers
+    update_headers, compare_version, parse_version, api_features, tar_stream,
+    memory_tar, memory_tar_stream, mkbuildcontext, ContextCache
 )
 
+from docker.utils.build import (
+    PREFETCH_FILE_SIZE, read_small_files, scan_context, scan_directory
+)
+from docker.utils.chunked import ChunkedDecoder, read_chunks
+from docker.utils.compression import gzip_stream, regroup
+from docker.utils.concurrency import ThreadPool, ordered_map
+from docker.utils import context_cache
+from docker.utils.dockerfile import context_sources, parse_instructions
+from docker.utils.dockerignore import PatternMatcher
+from docker.utils import fileio
+from docker.utils.progress import (
+    BuildFailed, BuildFinished, BuildOutput, BuildProfile, BuildProgress,
+    CacheHit, LayerCreated, StepFinished, StepStarted, StepTiming,
+    aggregate_profiles
+)
+from docker.utils.json_stream import JSONStreamDecoder, json_stream
+from docker.utils.socket import (
+    FrameReader, buffer_frames, consume_frames, demux_frames
+)
 from docker.utils.ports import build_port_bindings, split_port
 from docker.utils.utils import create_endpoint_config, format_environment
 
 from .. import base
 from ..helpers import make_tree
 
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
 
 TEST_CERT_DIR = os.path.join(
     os.path.dirname(__file__),
@@ -69,6 +102,41 @@ class DecoratorsTest(base.BaseTestCase):
         }
 
 
+class CompareVersionTest(base.BaseTestCase):
+    def test_compare_version(self):
+        self.assertEqual(compare_version('1.9', '1.10'), 1)
+        self.assertEqual(compare_version('1.10', '1.9'), -1)
+        self.assertEqual(compare_version('1.10', '1.10'), 0)
+        self.assertEqual(compare_version('1.10', '1.10.0'), 0)
+        self.assertEqual(compare_version('1.10.1', '1.10'), -1)
+
+    def test_compare_prerelease_version(self):
+        self.assertEqual(compare_version('1.10.0', '1.10.0b1'), -1)
+        self.assertEqual(compare_version('1.9', '1.10.0b1'), 1)
+
+    def test_compare_invalid_version(self):
+        with pytest.raises(ValueError):
+            compare_version('1.10', 'foo')
+
+    def test_parse_version(self):
+        self.assertEqual(parse_version('1.24'), (1, 24, 0))
+        self.assertEqual(parse_version('1.10.3'), (1, 10, 3))
+        self.assertTrue(parse_version('1.24') is parse_version('1.24'))
+
+    def test_api_features(self):
+        features = api_features('1.19')
+        self.assertTrue('logs_since' in features)
+        self.assertFalse('build_buildargs' in features)
+        self.assertTrue(api_features('1.19') is features)
+
+    def test_client_supports(self):
+        client = Client(version='1.18')
+        self.assertFalse(client._supports('logs_since'))
+        client._version = '1.19'
+        self.assertTrue(client._supports('logs_since'))
+        client.close()
+
+
 class HostConfigTest(base.BaseTestCase):
     def test_create_host_config_no_options(self):
         config = create_host_config(version='1.19')
@@ -998,6 +1066,70 @@ class ExcludePathsTest(base.BaseTestCase):
             self.all_paths - set(['foo/bar', 'foo/bar/a.py'])
         )
 
+    def test_double_wildcard(self):
+        assert self.exclude(['**/a.py']) == convert_paths(
+            self.all_paths - set([
+                'a.py', 'foo/a.py', 'foo/bar/a.py', 'bar/a.py'
+            ])
+        )
+
+    def test_double_wildcard_in_subdir(self):
+        assert self.exclude(['foo/**/*.py']) == convert_paths(
+            self.all_paths - set(['foo/a.py', 'foo/b.py', 'foo/bar/a.py'])
+        )
+
+    def test_double_wildcard_with_exception(self):
+        assert self.exclude(['**', '!**/b.py']) == set([
+            'Dockerfile', '.dockerignore', 'b.py', 'foo/b.py'
+        ])
+
+    def test_excluded_directory_is_not_walked(self):
+        scanned = []
+
+        def recording_scan(directory):
+            scanned.append(os.path.relpath(directory, self.base))
+            return scan_directory(directory)
+
+        with mock.patch('docker.utils.build.scan_directory', recording_scan):
+            paths = self.exclude(['foo', 'bar', '!foo/*.py'])
+        assert sorted(scanned) == ['.', 'foo']
+        assert convert_paths(set(['foo/a.py', 'foo/b.py'])) <= paths
+
+
+class PatternMatcherTest(base.BaseTestCase):
+    def test_prefix_match(self):
+        matcher = PatternMatcher(['foo/*'])
+        assert matcher.excludes('foo/a')
+        assert matcher.excludes('foo/a/b')
+        assert not matcher.excludes('foo')
+        assert not matcher.excludes('bar/foo/a')
+
+    def test_wildcards_dont_match_separators(self):
+        matcher = PatternMatcher(['a*b', 'x?y', '[!c]d'])
+        assert matcher.excludes('aXb')
+        assert not matcher.excludes('a/b')
+        assert not matcher.excludes('x/y')
+        assert not matcher.excludes('/d')
+
+    def test_exceptions(self):
+        matcher = PatternMatcher(['*.py'], ['b.py'])
+        assert not matcher.includes('a.py')
+        assert matcher.includes('b.py')
+        assert matcher.includes('c.go')
+
+    def test_can_prune(self):
+        matcher = PatternMatcher(['foo', 'bar'], ['foo/a/*.py', '*.go'])
+        assert not matcher.can_prune('foo')
+        assert not matcher.can_prune('foo/a')
+        assert matcher.can_prune('foo/b')
+        assert matcher.can_prune('bar')
+        assert not matcher.can_prune('baz')
+
+    def test_can_prune_double_wildcard_exception(self):
+        matcher = PatternMatcher(['foo'], ['**/*.py'])
+        assert not matcher.can_prune('foo')
+        assert not matcher.can_prune('foo/bar/baz')
+
 
 class TarTest(base.Cleanup, base.BaseTestCase):
     def test_tar_with_excludes(self):
@@ -1083,6 +1215,513 @@ class TarTest(base.Cleanup, base.BaseTestCase):
             )
 
 
+class GzipStreamTest(base.BaseTestCase):
+    def data(self):
+        return [
+            os.urandom(1000), b'a' * 300000, b'', b'abc' * 50000,
+            os.urandom(70000)
+        ]
+
+    def decompress(self, blocks):
+        decompressor = zlib.decompressobj(zlib.MAX_WBITS | 16)
+        data = decompressor.decompress(b''.join(blocks))
+        # A single gzip member
+        assert decompressor.unused_data == b''
+        return data
+
+    def test_regroup(self):
+        blocks = list(regroup([b'abc', b'defgh', b'', b'ijklmnopq'], 4))
+        assert blocks == [b'abcd', b'efgh', b'ijkl', b'mnop', b'q']
+        assert list(regroup([b'abcd'], 4)) == [b'abcd']
+        assert list(regroup([], 4)) == []
+
+    def test_serial(self):
+        data = self.data()
+        assert self.decompress(gzip_stream(iter(data))) == b''.join(data)
+
+    def test_parallel(self):
+        data = self.data()
+        with ThreadPool(4) as pool:
+            blocks = list(gzip_stream(
+                iter(data), level=6, pool=pool, block_size=65536
+            ))
+        assert self.decompress(blocks) == b''.join(data)
+        with gzip.GzipFile(fileobj=io.BytesIO(b''.join(blocks))) as f:
+            assert f.read() == b''.join(data)
+
+    def test_parallel_empty(self):
+        with ThreadPool(2) as pool:
+            assert self.decompress(gzip_stream(iter([]), pool=pool)) == b''
+
+    def test_parallel_ratio(self):
+        data = [b'0123456789abcdef' * 100000]
+        serial = b''.join(gzip_stream(iter(data)))
+        with ThreadPool(2) as pool:
+            parallel = b''.join(gzip_stream(iter(data), pool=pool))
+        assert len(parallel) < 2 * len(serial) + 1024
+
+    def test_tar_stream_gzip_workers(self):
+        base = make_tree(['foo'], ['Dockerfile', 'foo/a.py'])
+        self.addCleanup(shutil.rmtree, base)
+        with open(os.path.join(base, 'big'), 'wb') as f:
+            f.write(os.urandom(300000))
+        expected = b''.join(tar_stream(base))
+        blocks = tar_stream(base, gzip=True, gzip_level=1, gzip_workers=3)
+        assert self.decompress(blocks) == expected
+
+
+class MemoryTarTest(base.BaseTestCase):
+    def test_memory_tar(self):
+        big = tempfile.TemporaryFile()
+        self.addCleanup(big.close)
+        big.write(b'x' * 100000)
+        big.seek(0)
+        files = {
+            'Dockerfile': u'FROM busybox\nLABEL a=\u00e9\n',
+            'app/main.py': b'print(1)\n',
+            'data/big': big,
+            'data/small': io.BytesIO(b'small'),
+        }
+        archive = tarfile.open(fileobj=memory_tar(files))
+        assert archive.getnames() == [
+            'Dockerfile', 'app/main.py', 'data/big', 'data/small'
+        ]
+        assert archive.extractfile('Dockerfile').read() == (
+            u'FROM busybox\nLABEL a=\u00e9\n'.encode('utf-8')
+        )
+        assert archive.extractfile('data/big').read() == b'x' * 100000
+        assert archive.extractfile('data/small').read() == b'small'
+        member = archive.getmember('app/main.py')
+        assert member.mode == 0o644
+        assert member.mtime == 0
+
+    def test_memory_tar_stream_is_reproducible(self):
+        files = {'b': b'b', 'a': b'a' * 1000}
+        first = b''.join(memory_tar_stream(files, block_size=512))
+        assert first == b''.join(memory_tar_stream(dict(files)))
+
+    def test_memory_tar_gzip(self):
+        files = {'Dockerfile': b'FROM busybox'}
+        archive = tarfile.open(
+            fileobj=memory_tar(files, gzip=True, gzip_level=1), mode='r:gz'
+        )
+        assert archive.extractfile('Dockerfile').read() == b'FROM busybox'
+
+    def test_mkbuildcontext_in_memory(self):
+        context = mkbuildcontext(io.BytesIO(b'FROM busybox'))
+        assert isinstance(context, io.BytesIO)
+        archive = tarfile.open(fileobj=context)
+        assert archive.extractfile('Dockerfile').read() == b'FROM busybox'
+
+
+class BuildProgressTest(base.BaseTestCase):
+    OUTPUT = [
+        {'stream': 'Step 1/3 : FROM busybox\n'},
+        {'stream': ' ---> 47bcc53f74dc\n'},
+        {'stream': 'Step 2/3 : COPY a /a\n ---> Using cache\n'},
+        {'stream': ' ---> 1a2b3c4d5e6f\nStep 3/3 : RUN ma'},
+        {'stream': 'ke\n'},
+        {'stream': ' ---> Running in 0123456789ab\n'},
+        {'stream': 'compiling\n'},
+        {'stream': ' ---> 9e9b3ab3b8ad\n'},
+        {'stream': 'Removing intermediate container 0123456789ab\n'},
+        {'aux': {'ID': 'sha256:' + '9e9b3ab3b8ad' * 5 + 'abcd'}},
+        {'stream': 'Successfully built 9e9b3ab3b8ad\n'},
+    ]
+
+    def clock(self):
+        self.now += 1
+        return self.now
+
+    def setUp(self):
+        self.now = 0
+
+    def test_events(self):
+        progress = BuildProgress(iter(self.OUTPUT), clock=self.clock)
+        events = list(progress)
+        assert [type(e) for e in events] == [
+            StepStarted, LayerCreated, StepFinished,
+            StepStarted, CacheHit, LayerCreated, StepFinished,
+            StepStarted, BuildOutput, BuildOutput, LayerCreated, BuildOutput,
+            StepFinished, BuildOutput, BuildFinished,
+        ]
+        assert events[0] == StepStarted(1, 3, 'FROM busybox', 2)
+        assert events[6] == StepFinished(
+            2, 'COPY a /a', 3, True, '1a2b3c4d5e6f', 7
+        )
+        assert events[7].instruction == 'RUN make'
+        assert events[9].text == 'compiling'
+        assert events[12] == StepFinished(
+            3, 'RUN make', 6, False, '9e9b3ab3b8ad', 13
+        )
+        assert events[-1].image_id.startswith('sha256:9e9b3ab3b8ad')
+
+        profile = progress.profile
+        assert [s.step for s in profile.steps] == [1, 2, 3]
+        assert profile.duration == 13
+        assert [s.step for s in profile.slowest(2)] == [3, 2]
+        report = profile.report().splitlines()
+        assert len(report) == 5
+        assert 'RUN make' in report[1]
+        assert report[-1].split() == ['TOTAL', '13.000']
+
+    def test_error(self):
+        output = [
+            {'stream': 'Step 1 : FROM busybox\n'},
+            {'stream': 'Step 2 : RUN false\n'},
+            {'error': 'returned a non-zero code: 1',
+             'errorDetail': {'code': 1}},
+        ]
+        events = list(BuildProgress(iter(output), clock=self.clock))
+        assert events[3] == BuildFailed(
+            2, 'returned a non-zero code: 1', {'code': 1}, 4
+        )
+        assert isinstance(events[-1], StepFinished)
+        assert events[-1].step == 2
+
+    def test_aggregate_profiles(self):
+        profiles = [
+            BuildProfile([
+                StepTiming(1, 'FROM busybox', 0.5, True, None),
+                StepTiming(2, 'run make', 10.0, False, None),
+                StepTiming(3, 'COPY a /a', 2.0, False, None),
+            ]),
+            BuildProfile([
+                StepTiming(1, 'FROM busybox', 0.5, True, None),
+                StepTiming(2, 'RUN make test', 20.0, False, None),
+            ]),
+        ]
+        timings = aggregate_profiles(profiles)
+        assert [t.instruction for t in timings] == ['RUN', 'COPY', 'FROM']
+        assert timings[0].count == 2
+        assert timings[0].total == 30.0
+        assert timings[0].mean == 15.0
+        assert timings[0].max == 20.0
+        assert timings[2].cached == 2
+
+
+class DockerfileSourcesTest(base.BaseTestCase):
+    def test_parse_instructions(self):
+        dockerfile = '\n'.join([
+            '# comment',
+            'from busybox',
+            '',
+            'RUN echo a \\',
+            '    # comment in a continuation',
+            '    && echo b',
+            'COPY a b',
+        ])
+        assert parse_instructions(dockerfile) == [
+            ('FROM', 'busybox'),
+            ('RUN', 'echo a && echo b'),
+            ('COPY', 'a b'),
+        ]
+
+    def test_escape_directive(self):
+        dockerfile = '# escape=`\nCOPY src `\n  dst\nRUN dir c:\\'
+        assert parse_instructions(dockerfile) == [
+            ('COPY', 'src dst'), ('RUN', 'dir c:\\')
+        ]
+
+    def test_context_sources(self):
+        dockerfile = '\n'.join([
+            'FROM golang AS builder',
+            'COPY go.mod go.sum /src/',
+            'COPY --chown=1000 ["cmd/app", "/src/cmd/app"]',
+            'ADD https://example.com/a.tar.gz vendor.tar.gz /tmp/',
+            'FROM busybox',
+            'COPY --from=builder /go/bin/app /app',
+            'add config/*.yml /etc/app/',
+        ])
+        assert context_sources(dockerfile) == [
+            'go.mod', 'go.sum', 'cmd/app', 'vendor.tar.gz', 'config/*.yml'
+        ]
+
+    def test_unknown_sources(self):
+        assert context_sources('FROM busybox\nCOPY . /src') is None
+        assert context_sources('FROM busybox\nCOPY ./ /src') is None
+        assert context_sources('ARG DIR\nCOPY $DIR /src') is None
+        assert context_sources('FROM busybox\nRUN true') == []
+
+    def test_tar_stream_sources(self):
+        base = make_tree(
+            ['src', 'src/app', 'docs', 'config'],
+            ['Dockerfile', '.dockerignore', 'README', 'src/app/main.py',
+             'src/app/main.pyc', 'src/setup.py', 'docs/index.md',
+             'config/a.yml', 'config/b.json']
+        )
+        self.addCleanup(shutil.rmtree, base)
+        blocks = tar_stream(
+            base, exclude=['**/*.pyc'],
+            sources=['src/app', 'config/*.yml', 'missing']
+        )
+        archive = tarfile.open(fileobj=io.BytesIO(b''.join(blocks)))
+        assert sorted(archive.getnames()) == [
+            '.dockerignore', 'Dockerfile', 'config/a.yml', 'src/app',
+            'src/app/main.py'
+        ]
+
+
+class TarStreamTest(base.BaseTestCase):
+    def make_context(self):
+        base = make_tree(['foo', 'foo/bar', 'bar'], [
+            'Dockerfile', '.dockerignore', 'a.py', 'b.py', 'foo/a.py',
+            'foo/bar/a.py', 'bar/a.py'
+        ])
+        self.addCleanup(shutil.rmtree, base)
+        with open(os.path.join(base, 'big'), 'wb') as f:
+            f.write(b'x' * 200001)
+        return base
+
+    def open_stream(self, blocks, gzip=False):
+        return tarfile.open(
+            fileobj=io.BytesIO(b''.join(blocks)),
+            mode='r:gz' if gzip else 'r'
+        )
+
+    def test_file_grown_after_scan(self):
+        base = self.make_context()
+
+        def grow_then_read(root, entries, session=None):
+            with open(os.path.join(base, 'big'), 'ab') as f:
+                f.write(b'y')
+            return read_small_files(root, entries, session)
+
+        with mock.patch('docker.utils.build.read_small_files',
+                        grow_then_read):
+            blocks = list(tar_stream(base, workers=2))
+        with self.open_stream(blocks) as archive:
+            assert archive.extractfile('big').read() == b'x' * 200001
+
+    def test_tar_stream_matches_tar(self):
+        base = self.make_context()
+        exclude = ['*.py', '!b.py', 'foo']
+        with tar(base, exclude=exclude) as archive:
+            expected = sorted(tarfile.open(fileobj=archive).getnames())
+        blocks = list(tar_stream(base, exclude=exclude, block_size=4096))
+        assert len(blocks) > 1
+        with self.open_stream(blocks) as archive:
+            assert sorted(archive.getnames()) == expected
+            assert archive.extractfile('big').read() == b'x' * 200001
+            assert archive.extractfile('b.py').read() == b'content'
+
+    def test_tar_stream_gzip(self):
+        base = self.make_context()
+        blocks = list(tar_stream(base, gzip=True))
+        with self.open_stream(blocks, gzip=True) as archive:
+            assert archive.extractfile('big').read() == b'x' * 200001
+            assert 'foo/bar/a.py' in archive.getnames()
+
+    def test_tar_stream_is_lazy(self):
+        base = self.make_context()
+        with mock.patch('docker.utils.build.scan_directory') as scan:
+            scan.return_value = []
+            blocks = tar_stream(base)
+            assert not scan.called
+            list(blocks)
+            assert scan.called
+
+    def test_tar_stream_dockerfile_in_excluded_dir(self):
+        base = self.make_context()
+        os.rename(
+            os.path.join(base, 'Dockerfile'),
+            os.path.join(base, 'foo', 'Dockerfile')
+        )
+        blocks = list(tar_stream(
+            base, exclude=['foo'], dockerfile='foo/Dockerfile'
+        ))
+        with self.open_stream(blocks) as archive:
+            names = archive.getnames()
+        assert names.count('foo/Dockerfile') == 1
+        assert 'foo/a.py' not in names
+
+
+class ContextCacheTest(base.BaseTestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+        self.context = os.path.join(self.tmpdir, 'context')
+        os.makedirs(os.path.join(self.context, 'sub'))
+        self.write('Dockerfile', b'FROM busybox\n')
+        self.write('sub/a.txt', b'a' * 1000)
+        self.write('big', b'x' * 200001)
+        self.cache = ContextCache(os.path.join(self.tmpdir, 'cache'))
+
+    def write(self, name, content, age=60):
+        path = os.path.join(self.context, name)
+        with open(path, 'wb') as f:
+            f.write(content)
+        # Recently modified files aren't cached
+        mtime = int(time.time()) - age
+        os.utime(path, (mtime, mtime))
+
+    def archive(self, **kwargs):
+        return b''.join(tar_stream(self.context, cache=self.cache, **kwargs))
+
+    def test_rebuild_hits(self):
+        first = self.archive()
+        assert self.cache.stats() == {
+            'hits': 0, 'misses': 3, 'bytes_reused': 0
+        }
+        assert self.archive() == first
+        stats = self.cache.stats()
+        assert stats['hits'] == 3
+        assert stats['misses'] == 3
+        assert stats['bytes_reused'] > 200001
+
+    def test_same_as_uncached(self):
+        self.archive()
+        assert self.archive() == b''.join(tar_stream(self.context))
+        with tar(self.context, cache=self.cache) as archive:
+            names = tarfile.open(fileobj=archive).getnames()
+        assert sorted(names) == ['Dockerfile', 'big', 'sub', 'sub/a.txt']
+
+    def test_changed_file(self):
+        self.archive()
+        self.write('sub/a.txt', b'b' * 10)
+        blocks = self.archive()
+        assert self.cache.hits == 2
+        assert self.cache.misses == 4
+        with tarfile.open(fileobj=io.BytesIO(blocks)) as archive:
+            assert archive.extractfile('sub/a.txt').read() == b'b' * 10
+        # The new content is cached in turn
+        self.archive()
+        assert self.cache.hits == 5
+
+    def test_recent_file_not_cached(self):
+        self.write('sub/a.txt', b'b', age=0)
+        self.archive()
+        self.archive()
+        assert self.cache.hits == 2
+        assert self.cache.misses == 4
+
+    def test_gzip_and_workers(self):
+        self.archive(gzip=True)
+        blocks = self.archive(gzip=True, workers=4)
+        assert self.cache.hits == 3
+        with tarfile.open(fileobj=io.BytesIO(blocks), mode='r:gz') as archive:
+            assert archive.extractfile('big').read() == b'x' * 200001
+
+    def test_interrupted_archive(self):
+        self.archive()
+        blocks = tar_stream(self.context, cache=self.cache, block_size=512)
+        next(blocks)
+        blocks.close()
+        assert self.archive() == b''.join(tar_stream(self.context))
+        assert self.cache.hits >= 3
+
+    @pytest.mark.skipif(not context_cache.HAS_FILE_LOCKS,
+                        reason='Requires file locks')
+    def test_concurrent_archive(self):
+        self.archive()
+        session = self.cache.open(self.context)
+        try:
+            assert self.archive() == b''.join(tar_stream(self.context))
+            assert self.cache.hits == 0
+        finally:
+            session.close()
+
+    def test_corrupt_index(self):
+        self.archive()
+        session = self.cache.open(self.context)
+        session.close(complete=False)
+        with open(session.segments_path, 'ab') as f:
+            f.write(b'garbage')
+        assert self.archive() == b''.join(tar_stream(self.context))
+        assert self.cache.hits == 0
+
+
+class ContextWalkerTest(base.BaseTestCase):
+    def setUp(self):
+        self.base = make_tree(
+            ['foo', 'foo/bar', 'baz'],
+            ['Dockerfile', 'a.py', 'foo/b.py', 'foo/bar/c.py', 'baz/d.py']
+        )
+        self.addCleanup(shutil.rmtree, self.base)
+
+    def test_scan_context_stats(self):
+        matcher = PatternMatcher(['baz'])
+        entries = dict(scan_context(self.base, matcher))
+        assert set(entries) == convert_paths(set([
+            'Dockerfile', 'a.py', 'foo', 'foo/b.py', 'foo/bar',
+            'foo/bar/c.py'
+        ]))
+        st = os.lstat(os.path.join(self.base, 'a.py'))
+        assert entries['a.py'].st_size == st.st_size
+        assert entries['a.py'].st_ino == st.st_ino
+
+    def test_scan_context_in_pool(self):
+        matcher = PatternMatcher([])
+        with ThreadPool(4) as pool:
+            parallel = [p for p, _ in scan_context(self.base, matcher, pool)]
+        assert parallel == [p for p, _ in scan_context(self.base, matcher)]
+
+    def test_tar_stream_workers(self):
+        with open(os.path.join(self.base, 'big'), 'wb') as f:
+            f.write(b'x' * (PREFETCH_FILE_SIZE + 1))
+        expected = b''.join(tar_stream(self.base))
+        assert b''.join(tar_stream(self.base, workers=4)) == expected
+
+    @pytest.mark.skipif(IS_WINDOWS_PLATFORM, reason='No hard links on Windows')
+    def test_tar_stream_hard_link(self):
+        os.link(
+            os.path.join(self.base, 'a.py'),
+            os.path.join(self.base, 'foo', 'link.py')
+        )
+        archive = tarfile.open(
+            fileobj=io.BytesIO(b''.join(tar_stream(self.base)))
+        )
+        link = archive.getmember('foo/link.py')
+        assert link.islnk()
+        assert link.linkname == 'a.py'
+
+
+class ThreadPoolTest(base.BaseTestCase):
+    def test_ordered_map(self):
+        with ThreadPool(4) as pool:
+            results = list(ordered_map(pool, lambda x: x * 2, range(100), 8))
+        assert results == [x * 2 for x in range(100)]
+
+    def test_ordered_map_error(self):
+        def fail(x):
+            if x == 3:
+                raise ValueError(x)
+            return x
+
+        with ThreadPool(2) as pool:
+            results = ordered_map(pool, fail, range(10), 4)
+            assert [next(results) for _ in range(3)] == [0, 1, 2]
+            with pytest.raises(ValueError):
+                next(results)
+
+    def test_close_cancels_pending_tasks(self):
+        started = threading.Event()
+        release = threading.Event()
+        calls = []
+
+        def block():
+            started.set()
+            release.wait()
+
+        pool = ThreadPool(1)
+        pool.submit(block)
+        task = pool.submit(calls.append, 1)
+        started.wait()
+        closer = threading.Thread(target=pool.close)
+        closer.start()
+        # The pending task is cancelled before the pool waits for its thread
+        for _ in range(100):
+            if task.done():
+                break
+            time.sleep(0.01)
+        release.set()
+        closer.join()
+        assert task.done()
+        assert calls == []
+        with pytest.raises(RuntimeError):
+            pool.submit(calls.append, 2)
+
+
 class FormatEnvironmentTest(base.BaseTestCase):
     def test_format_env_binary_unicode_value(self):
         env_dict = {
@@ -1096,3 +1735,240 @@ class FormatEnvironmentTest(base.BaseTestCase):
             'BAR': '',
         }
         assert sorted(format_environment(env_dict)) == ['BAR=', 'FOO']
+
+
+class ChunkedDecoderTest(base.BaseTestCase):
+    def test_decode_whole_chunks(self):
+        decoder = ChunkedDecoder()
+        chunks = decoder.feed(b'5\r\nhello\r\n6\r\n world\r\n0\r\n\r\n')
+        assert chunks == [b'hello', b' world']
+        assert decoder.done
+
+    def test_decode_split_across_feeds(self):
+        data = b'5\r\nhello\r\na;ext=1\r\n0123456789\r\n0\r\nX-Foo: 1\r\n\r\n'
+        decoder = ChunkedDecoder()
+        chunks = []
+        for i in range(len(data)):
+            chunks += decoder.feed(data[i:i + 1])
+        assert chunks == [b'hello', b'0123456789']
+        assert decoder.done
+
+    def test_invalid_chunk_size(self):
+        with pytest.raises(DockerException):
+            ChunkedDecoder().feed(b'zz\r\nhello\r\n')
+
+    def test_read_chunks_stops_at_last_chunk(self):
+        fp = io.BufferedReader(
+            io.BytesIO(b'3\r\nfoo\r\n3\r\nbar\r\n0\r\n\r\ntrailing garbage')
+        )
+        assert list(read_chunks(fp)) == [b'foo', b'bar']
+
+
+class FileIOTest(base.BaseTestCase):
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp()
+        self.file = os.fdopen(fd, 'wb')
+        self.addCleanup(os.unlink, self.path)
+        self.addCleanup(self.file.close)
+
+    def contents(self):
+        with open(self.path, 'rb') as f:
+            return f.read()
+
+    def socket_reader(self, data):
+        reader, writer = socket.socketpair()
+        self.addCleanup(reader.close)
+
+        def send():
+            writer.sendall(data)
+            writer.close()
+        thread = threading.Thread(target=send)
+        thread.start()
+        self.addCleanup(thread.join)
+        return reader
+
+    def test_write_all(self):
+        fileio.write_all(self.file.fileno(), b'foo')
+        with mock.patch.object(fileio, 'HAS_MEMORYVIEW', False):
+            fileio.write_all(self.file.fileno(), b'bar')
+        assert self.contents() == b'foobar'
+
+    def test_copy_chunked(self):
+        fp = io.BufferedReader(io.BytesIO(
+            b'3\r\nfoo\r\n6;ext=1\r\nbarbaz\r\n0\r\nX-Foo: 1\r\n\r\nnext'
+        ))
+        size = fileio.copy_chunked(fp, self.file.fileno())
+        assert size == 9
+        assert self.contents() == b'foobarbaz'
+        assert fp.read() == b'next'
+
+    def test_copy_chunked_invalid(self):
+        fp = io.BufferedReader(io.BytesIO(b'3\r\nfooXX0\r\n\r\n'))
+        with pytest.raises(DockerException):
+            fileio.copy_chunked(fp, self.file.fileno())
+
+    def test_copy_exact_truncated(self):
+        fp = io.BufferedReader(io.BytesIO(b'foo'))
+        with pytest.raises(DockerException):
+            fileio.copy_exact(fp, self.file.fileno(), 4)
+
+    @pytest.mark.skipif(not fileio.HAS_SPLICE, reason='requires splice')
+    def test_copy_chunked_spliced(self):
+        payload = os.urandom(3 * fileio.COPY_BUFFER_SIZE // 2)
+        data = b''.join([
+            '{0:x}\r\n'.format(len(payload)).encode('ascii'), payload,
+            b'\r\n3\r\nend\r\n0\r\n\r\n'
+        ])
+        sock = self.socket_reader(data)
+        sock.settimeout(5)
+        fp = sock.makefile('rb')
+        self.addCleanup(fp.close)
+        size = fileio.copy_chunked(
+            fp, self.file.fileno(), sock.fileno(), timeout=5
+        )
+        assert size == len(payload) + 3
+        assert self.contents() == payload + b'end'
+
+    def test_send_file(self):
+        payload = os.urandom(100000)
+        self.file.write(payload)
+        self.file.close()
+        reader, writer = socket.socketpair()
+        self.addCleanup(reader.close)
+        received = []
+
+        def receive():
+            data = reader.recv(65536)
+            while data:
+                received.append(data)
+                data = reader.recv(65536)
+        thread = threading.Thread(target=receive)
+        thread.start()
+        with open(self.path, 'rb') as f:
+            assert fileio.send_file(writer, f) == len(payload)
+        writer.close()
+        thread.join()
+        assert b''.join(received) == payload
+
+
+class JSONStreamTest(base.BaseTestCase):
+    def test_documents_split_across_blocks(self):
+        data = b'{"status": "a"}\r\n{"status": "b", "progressDetail": {}}\n'
+        blocks = [data[i:i + 3] for i in range(0, len(data), 3)]
+        assert list(json_stream(blocks)) == [
+            {'status': 'a'}, {'status': 'b', 'progressDetail': {}}
+        ]
+
+    def test_several_documents_in_one_block(self):
+        assert list(json_stream([b'{"a": 1}{"b": 2}\n{"c": 3}'])) == [
+            {'a': 1}, {'b': 2}, {'c': 3}
+        ]
+
+    def test_multibyte_character_split_across_blocks(self):
+        data = u'{"status": "\u00e9t\u00e9"}'.encode('utf-8')
+        split = data.index(b'\xc3') + 1
+        assert list(json_stream([data[:split], data[split:]])) == [
+            {'status': u'\u00e9t\u00e9'}
+        ]
+
+    def test_trailing_scalar_waits_for_more_data(self):
+        decoder = JSONStreamDecoder()
+        assert decoder.feed(b'12') == []
+        assert decoder.feed(b'3 ') == [123]
+        assert decoder.feed(b'45') == []
+        assert decoder.close() == [45]
+
+    def test_invalid_trailing_data(self):
+        with pytest.raises(StreamParseError):
+            list(json_stream([b'{"a": 1}\n{"b": ']))
+
+    def test_truncated_string_and_literal_wait_for_more_data(self):
+        decoder = JSONStreamDecoder()
+        assert decoder.feed(b'{"a": "b') == []
+        assert decoder.feed(b'c", "d": tr') == []
+        assert decoder.feed(b'ue}\n') == [{'a': 'bc', 'd': True}]
+
+    def test_escape_split_across_blocks(self):
+        data = b'{"stream": " ---\\u003e Running in dba30f2a1a7e\\n"}\r\n'
+        for split in range(1, len(data)):
+            assert list(json_stream([data[:split], data[split:]])) == [
+                {'stream': u' ---> Running in dba30f2a1a7e\n'}
+            ], split
+
+    def test_number_split_across_blocks(self):
+        data = b'{"a": -1.5e-3, "b": [0.25]}\n'
+        for split in range(1, len(data)):
+            assert list(json_stream([data[:split], data[split:]])) == [
+                {'a': -1.5e-3, 'b': [0.25]}
+            ], split
+
+    def test_invalid_line_raises_without_more_data(self):
+        decoder = JSONStreamDecoder()
+        with pytest.raises(StreamParseError):
+            decoder.feed(b'{"a": oops}\r\n')
+
+    def test_invalid_data_followed_by_more_data(self):
+        decoder = JSONStreamDecoder()
+        assert decoder.feed(b'{"a": 1}\n{"b": 1 2') == [{'a': 1}]
+        with pytest.raises(StreamParseError):
+            decoder.feed(b'}\n')
+
+
+class BufferFramesTest(base.BaseTestCase):
+    def test_buffer_frames(self):
+        buf = (
+            b'\x01\x00\x00\x00\x00\x00\x00\x03foo'
+            b'\x02\x00\x00\x00\x00\x00\x00\x00'
+            b'\x02\x00\x00\x00\x00\x00\x00\x04barz'
+        )
+        assert [(i, bytes(f)) for i, f in buffer_frames(buf)] == [
+            (1, b'foo'), (2, b''), (2, b'barz')
+        ]
+
+    def test_buffer_frames_truncated(self):
+        buf = b'\x01\x00\x00\x00\x00\x00\x00\x03foo\x01\x00\x00'
+        assert [(i, bytes(f)) for i, f in buffer_frames(buf)] == [(1, b'foo')]
+
+
+class FrameReaderTest(base.BaseTestCase):
+    def frames(self, data, **kwargs):
+        read_sock, write_sock = socket.socketpair()
+        self.addCleanup(read_sock.close)
+        write_sock.sendall(data)
+        write_sock.close()
+        return list(FrameReader(read_sock, **kwargs))
+
+    def test_read_frames(self):
+        data = (
+            b'\x01\x00\x00\x00\x00\x00\x00\x03foo'
+            b'\x02\x00\x00\x00\x00\x00\x00\x00'
+            b'\x02\x00\x00\x00\x00\x00\x00\x04barz'
+        )
+        assert self.frames(data) == [(1, b'foo'), (2, b'barz')]
+
+    def test_frames_larger_than_buffer(self):
+        payload = b'x' * 100
+        data = b'\x01\x00\x00\x00\x00\x00\x00\x64' + payload
+        assert self.frames(data * 3, bufsize=16) == [(1, payload)] * 3
+
+    def test_eof_in_frame(self):
+        data = b'\x01\x00\x00\x00\x00\x00\x00\x03foo\x01\x00\x00\x00'
+        assert self.frames(data + b'\x00\x00\x00\x04ba') == [(1, b'foo')]
+
+
+class DemuxFramesTest(base.BaseTestCase):
+    frames = [(1, b'out1'), (2, b'err1'), (1, b'out2')]
+
+    def test_demux_frames(self):
+        assert list(demux_frames(self.frames)) == [
+            (b'out1', None), (None, b'err1'), (b'out2', None)
+        ]
+
+    def test_consume_frames(self):
+        assert consume_frames(self.frames) == b'out1err1out2'
+
+    def test_consume_frames_demux(self):
+        assert consume_frames(self.frames, demux=True) == (
+            b'out1out2', b'err1'
+        )
+        assert consume_frames([], demux=True) == (b'', b'')